@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Throughput benchmarks for the engine, parser, importer filters and the full analyze pipeline
+on deterministic synthetic chat logs, with JSON baselines and regression detection
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / 'src'))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from synthetic_chatlog import generate_message_list, random_hands
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'baselines.json'
+RESULTS_FILE = Path(__file__).resolve().parent / 'latest_results.json'
+
+SIZE_ALIASES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+
+
+def parse_size(text):
+    """Parse 10k / 1M / 10M / plain integers"""
+    return SIZE_ALIASES.get(text, None) or int(text.replace('_', ''))
+
+
+def size_label(size):
+    """Human-readable size label used in baseline keys"""
+    for label, value in SIZE_ALIASES.items():
+        if value == size:
+            return label
+    return str(size)
+
+
+# Benchmark cases: each takes the shared message list and returns (items processed, callable)
+
+def bench_engine(messages, size):
+    """NiuNiuEngine.calculate_result over random hands"""
+    from niu_niu_engine import NiuNiuEngine
+    engine = NiuNiuEngine()
+    hands = random_hands(size)
+
+    def run():
+        for hand in hands:
+            engine.calculate_result(hand)
+    return len(hands), run
+
+
+def bench_dice_parser(messages, size):
+    """DiceParser gameext parsing over type-47 messages"""
+    from dice_parser import DiceParser
+    parser = DiceParser()
+    dice_like = [msg for msg in messages if msg['msg_type'] == 47]
+
+    def run():
+        for msg in dice_like:
+            parser.parse_dice_message(msg)
+    return len(dice_like), run
+
+
+def bench_prefilter(messages, size):
+    """OptimizedChatlogImporter._pre_filter_dice_messages"""
+    from optimized_chatlog_importer import OptimizedChatlogImporter
+    importer = OptimizedChatlogImporter()
+
+    def run():
+        importer._pre_filter_dice_messages(messages)
+    return len(messages), run
+
+
+def bench_smart_filter(messages, size):
+    """OptimizedChatlogImporter._apply_smart_filter"""
+    from optimized_chatlog_importer import OptimizedChatlogImporter
+    importer = OptimizedChatlogImporter()
+    dice_messages = importer._pre_filter_dice_messages(messages)
+
+    def run():
+        importer._apply_smart_filter(list(dice_messages), 0.7)
+    return len(dice_messages), run
+
+
+def bench_pipeline(messages, size):
+    """Full analyze pipeline: dice extraction, assembly, evaluation, battles, stats"""
+    from niu_niu_analysis import analyze_messages
+
+    def run():
+        analyze_messages(messages)
+    return len(messages), run
+
+
+BENCHMARKS = {
+    'engine_calculate_result': bench_engine,
+    'dice_parser_gameext': bench_dice_parser,
+    'importer_prefilter': bench_prefilter,
+    'importer_smart_filter': bench_smart_filter,
+    'analyze_pipeline': bench_pipeline,
+}
+
+
+def run_case(name, messages, size, repeats):
+    """Run one case and return its best throughput"""
+    items, run = BENCHMARKS[name](messages, size)
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        'items': items,
+        'seconds': round(best, 6),
+        'items_per_sec': round(items / best, 1) if best > 0 else None,
+    }
+
+
+def missing_baselines(results, baselines):
+    """Result keys that have no baseline entry to compare against"""
+    return [key for key in results if key not in baselines]
+
+
+def compare(results, baselines, threshold):
+    """Return the list of regressions beyond threshold"""
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if not baseline or not result.get('items_per_sec'):
+            continue
+        ratio = result['items_per_sec'] / baseline['items_per_sec']
+        result['baseline_items_per_sec'] = baseline['items_per_sec']
+        result['ratio'] = round(ratio, 3)
+        if ratio < 1 - threshold:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Niu Niu Statistics Benchmark Suite")
+    parser.add_argument("--sizes", default="10k,1M", help="Comma-separated message counts (10k, 1M, 10M or integers); "
+                        "each size is held in memory as a message list, so 10M needs several GB")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeats per case at sizes up to 100k (best is kept)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Fail when throughput drops more than this fraction below baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="Fail when a case has no baseline to compare against")
+    parser.add_argument("--output", default=str(RESULTS_FILE), help="Results JSON file")
+
+    args = parser.parse_args()
+
+    sizes = [parse_size(s.strip()) for s in args.sizes.split(',') if s.strip()]
+    names = [n.strip() for n in args.only.split(',')] if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    print(f'🏁 Niu Niu Benchmark Suite')
+    print(f'📏 Sizes: {", ".join(size_label(s) for s in sizes)}')
+    print('=' * 80)
+
+    results = {}
+    errors = {}
+    for size in sizes:
+        start = time.perf_counter()
+        messages = generate_message_list(size)
+        print(f'\n🧪 {size_label(size)} messages (generated in {time.perf_counter() - start:.1f}s)')
+        repeats = args.repeats if size <= 100_000 else 1
+
+        for name in names:
+            key = f'{name}@{size_label(size)}'
+            try:
+                result = run_case(name, messages, size, repeats)
+            except Exception as e:
+                errors[key] = f'{type(e).__name__}: {e}'
+                print(f'  ❌ {name:26} {errors[key]}')
+                continue
+            results[key] = result
+            print(f'  {name:28} {result["items"]:>12,d} items {result["seconds"]:10.3f}s {result["items_per_sec"]:>14,.0f}/s')
+
+        del messages
+        gc.collect()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f).get('results', {})
+
+    regressions = compare(results, baselines, args.threshold)
+    unbaselined = [] if args.update_baseline else missing_baselines(results, baselines)
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'threshold': args.threshold,
+        'results': results,
+        'errors': errors,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'\n📁 Results: {args.output}')
+
+    if args.update_baseline:
+        merged = {**baselines, **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': report['python'], 'platform': report['platform'], 'results': merged},
+                      f, ensure_ascii=False, indent=2)
+        print(f'📌 Baseline updated: {args.baseline}')
+    elif not baselines:
+        print(f'ℹ️  No baseline at {args.baseline} (run with --update-baseline to record one)')
+    elif unbaselined:
+        print(f'ℹ️  No baseline for: {", ".join(unbaselined)}')
+
+    if regressions:
+        print(f'\n⚠️ Throughput regressions (> {args.threshold:.0%} below baseline):')
+        for key, ratio in regressions:
+            print(f'  {key}: {ratio:.2f}x baseline')
+    if errors:
+        print(f'\n❌ {len(errors)} benchmark(s) failed to run')
+
+    if unbaselined and args.require_baseline:
+        print(f'\n❌ {len(unbaselined)} case(s) have no baseline; the regression check cannot pass without one')
+
+    return 1 if regressions or errors or (unbaselined and args.require_baseline) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup Budget Check
+Measures CLI import cost with `python -X importtime` and fails when it exceeds the budget
+or when heavy optional dependencies are imported by analyze-only code paths
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must only load in the modes that use them
+HEAVY_MODULES = ['requests', 'urllib3', 'pandas', 'numpy', 'matplotlib', 'plotly', 'flask', 'streamlit']
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into [(module, self_us, cumulative_us, depth)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        self_us, cumulative_us, raw_name = int(parts[0]), int(parts[1]), parts[2]
+        depth = (len(raw_name) - len(raw_name.lstrip(' ')) - 1) // 2
+        rows.append((raw_name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter and return parsed importtime rows"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr[-2000:]}')
+    return parse_importtime(result.stderr)
+
+
+def measure_wall(args, runs):
+    """Median wall time (ms) of running the CLI with the given arguments"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup time budget check")
+    parser.add_argument("--module", default="universal_niu_niu_analyzer", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=80.0, help="Max cumulative import time of the module (ms)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs for the wall-clock measurement")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports")
+
+    args = parser.parse_args()
+
+    rows = measure_import(args.module)
+    target = next((r for r in rows if r[0] == args.module), None)
+    if target is None:
+        print(f'❌ {args.module} not found in importtime output')
+        return 1
+
+    cumulative_ms = target[2] / 1000
+    loaded = {name.split('.')[0] for name, _, _, _ in rows}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    wall_ms = measure_wall(['universal_niu_niu_analyzer.py', '--help'], args.runs)
+
+    print(f'🚀 Startup budget: {args.module}')
+    print('=' * 60)
+    print(f'  import cumulative: {cumulative_ms:8.1f} ms (budget {args.budget_ms:.0f} ms)')
+    print(f'  `--help` wall time: {wall_ms:7.1f} ms (median of {args.runs})')
+    print(f'\n  Slowest imports (self time):')
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f'    {name:40} {self_us / 1000:7.2f} ms (cumulative {cumulative_us / 1000:7.2f} ms)')
+
+    failed = False
+    if heavy:
+        print(f'\n❌ Heavy dependencies imported at startup: {", ".join(heavy)}')
+        failed = True
+    if cumulative_ms > args.budget_ms:
+        print(f'\n❌ Import time {cumulative_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms')
+        failed = True
+    if not failed:
+        print(f'\n✅ Within budget')
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
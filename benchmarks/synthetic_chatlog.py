@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+合成微信群聊记录生成器
+按固定随机种子生成与_standardize_message输出格式一致的消息：
+type=47 gameext骰子动画成组出现（每人5颗、间隔数秒，偶尔中断或超时），
+夹杂文字聊天、表情（带MD5）和系统消息等噪声
+"""
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+# 骰子点数到微信gameext content值的映射
+DICE_TO_CONTENT = {1: '4', 2: '5', 3: '6', 4: '7', 5: '8', 6: '9'}
+
+TEXT_NOISE = [
+    '来一局', '再来', '牛牛！', '今天手气不错', '哈哈哈', '又没牛', '谁来对战',
+    '吃饭了吗', '明天见', '测试一下', '随便玩玩', '这把稳了', '🎲', '[旺柴]',
+]
+
+TZ = timezone(timedelta(hours=8))
+
+
+def generate_messages(count: int, seed: int = 20250623, players: int = 12,
+                      talker: str = 'bench@chatroom',
+                      start: datetime = datetime(2025, 1, 1, 9, 0, 0)) -> Iterator[Dict[str, Any]]:
+    """
+    生成确定性的合成消息流
+
+    Args:
+        count: 消息条数
+        seed: 随机种子（相同参数生成完全相同的消息）
+        players: 群成员数量
+        talker: 群聊ID
+        start: 第一条消息的本地时间（UTC+8）
+
+    Yields:
+        Dict: 标准化格式的消息
+    """
+    rng = random.Random(seed)
+    members = [(f'wxid_bench{i:03d}', f'玩家{i:03d}') for i in range(players)]
+    current = start.replace(tzinfo=TZ)
+    seq = 1_000_000
+    produced = 0
+
+    def make(sender, sender_name, msg_type, content):
+        nonlocal seq, produced
+        seq += 1
+        produced += 1
+        iso = current.isoformat()
+        return {
+            'seq': seq,
+            'time': iso,
+            'timestamp': int(current.timestamp() * 1000),
+            'datetime': current.strftime('%Y-%m-%d %H:%M:%S'),
+            'talker': talker,
+            'talker_name': '基准测试群',
+            'sender': sender,
+            'sender_name': sender_name,
+            'msg_type': msg_type,
+            'sub_type': 0,
+            'content': content,
+            'contents': {}
+        }
+
+    while produced < count:
+        roll = rng.random()
+
+        if roll < 0.2:
+            # 一轮对战：2~4名玩家依次投5颗骰子
+            for sender, name in rng.sample(members, rng.randint(2, 4)):
+                dice_count = 5 if rng.random() > 0.05 else rng.randint(1, 4)  # 偶尔中途放弃
+                for _ in range(dice_count):
+                    if produced >= count:
+                        return
+                    # 偶尔停顿过久导致超出30秒窗口
+                    current += timedelta(seconds=rng.randint(1, 4) if rng.random() > 0.02 else 40)
+                    content = (f'<msg><gameext type="2" content="{DICE_TO_CONTENT[rng.randint(1, 6)]}">'
+                               f'</gameext></msg>')
+                    yield make(sender, name, 47, content)
+                current += timedelta(seconds=rng.randint(2, 20))
+        elif roll < 0.75:
+            sender, name = rng.choice(members)
+            current += timedelta(seconds=rng.randint(1, 120))
+            yield make(sender, name, 1, rng.choice(TEXT_NOISE))
+        elif roll < 0.95:
+            # 普通表情消息：同为type=47但不是骰子，带有32位MD5
+            sender, name = rng.choice(members)
+            current += timedelta(seconds=rng.randint(1, 60))
+            md5 = hashlib.md5(str(rng.random()).encode()).hexdigest()
+            yield make(sender, name, 47, f'<msg><emoji md5="{md5}" len="1024" type="2"></emoji></msg>')
+        else:
+            current += timedelta(minutes=rng.randint(10, 600))
+            yield make('', '', 10000, '"玩家" 加入了群聊')
+
+
+def generate_message_list(count: int, seed: int = 20250623, **kwargs) -> List[Dict[str, Any]]:
+    """生成合成消息列表"""
+    return list(generate_messages(count, seed, **kwargs))
+
+
+def random_hands(count: int, seed: int = 20250623) -> List[List[int]]:
+    """生成确定性的随机5骰子手牌"""
+    rng = random.Random(seed)
+    return [[rng.randint(1, 6) for _ in range(5)] for _ in range(count)]
@@ -31,6 +31,7 @@ def main():
     parser = argparse.ArgumentParser(description="Niu Niu Statistics Test Runner")
     parser.add_argument("--unit", action="store_true", help="Run unit tests only")
     parser.add_argument("--all", action="store_true", help="Run all tests")
+    parser.add_argument("--bench", action="store_true", help="Also run the benchmark suite at 10k messages against stored baselines")
     
     args = parser.parse_args()
     
@@ -42,6 +43,30 @@ def main():
         unit_tests = [
             (["python3", "tests/test_dice_parser.py"], "Dice Parser Unit Test"),
             (["python3", "tests/test_niu_niu_engine.py"], "Niu Niu Engine Unit Test"),
+            (["python3", "tests/test_game_assembler.py"], "Game Assembler Unit Test"),
+            (["python3", "tests/test_niu_niu_analysis.py"], "Analysis Pipeline Unit Test"),
+            (["python3", "tests/test_result_cache.py"], "Result Cache Unit Test"),
+            (["python3", "tests/test_time_index.py"], "Time Index Unit Test"),
+            (["python3", "tests/test_player_registry.py"], "Player Registry Tests"),
+            (["python3", "tests/test_matchup_matrix.py"], "Matchup Matrix Tests"),
+            (["python3", "tests/test_elo_ratings.py"], "Elo Rating Tests"),
+            (["python3", "tests/test_player_form.py"], "Player Form Tests"),
+            (["python3", "tests/test_dice_fairness.py"], "Dice Fairness Tests"),
+            (["python3", "tests/test_analysis_cache.py"], "Analysis Cache Tests"),
+            (["python3", "tests/test_rule_sets.py"], "Rule Set Tests"),
+            (["python3", "tests/test_parameter_sweep.py"], "Parameter Sweep Tests"),
+            (["python3", "tests/test_chunked_analysis.py"], "Chunked Analysis Tests"),
+            (["python3", "tests/test_fetch_pipeline.py"], "Fetch Pipeline Tests"),
+            (["python3", "tests/test_sharded_fetch.py"], "Sharded Fetch Tests"),
+            (["python3", "tests/test_seq_tracker.py"], "Seq Tracker Tests"),
+            (["python3", "tests/test_sqlite_export.py"], "SQLite Export Tests"),
+            (["python3", "tests/test_records.py"], "Record Type Tests"),
+            (["python3", "tests/test_stream_stats.py"], "Streaming Stats Tests"),
+            (["python3", "tests/test_html_report.py"], "HTML Report Tests"),
+            (["python3", "tests/test_dashboard.py"], "Dashboard Snapshot Tests"),
+            (["python3", "tests/test_backfill.py"], "Backfill Tests"),
+            (["python3", "tests/test_checkpoint.py"], "Checkpoint Tests"),
+            (["python3", "tests/test_stage_profiler.py"], "Stage Profiler Tests"),
         ]
         
         print(f"\n🔧 Running unit tests...")
@@ -50,6 +75,16 @@ def main():
             if run_command(cmd, desc):
                 success_count += 1
     
+    # Benchmarks (regression check against benchmarks/baselines.json)
+    if args.bench:
+        print(f"\n🏁 Running benchmarks...")
+        total_count += 1
+        if run_command(["python3", "benchmarks/run_benchmarks.py", "--sizes", "10k", "--require-baseline"], "Benchmark Suite (10k)"):
+            success_count += 1
+        total_count += 1
+        if run_command(["python3", "benchmarks/startup_budget.py"], "CLI Startup Budget"):
+            success_count += 1
+    
     # Summary
     print(f"\n{'='*60}")
     print(f"📊 Test Summary")
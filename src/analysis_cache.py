@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+分析结果磁盘缓存（按内容寻址）
+缓存键由输入数据的内容摘要、分析参数和分析代码版本共同决定，
+输入和参数不变时直接返回上次的分析结果；按最近使用时间淘汰，
+限制条目数和总大小
+"""
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+from checkpoint import atomic_open
+
+DEFAULT_CACHE_DIR = '.analysis_cache'
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+ENTRY_SUFFIX = '.pkl'
+FINGERPRINT_FILE = 'fingerprints.json'
+
+
+def source_fingerprint(module_names: List[str]) -> str:
+    """
+    分析代码的摘要（任意相关模块源码变化都会使缓存失效）
+
+    Args:
+        module_names: src/下的模块名
+
+    Returns:
+        str: sha256摘要
+    """
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(module_names):
+        with open(os.path.join(src_dir, f'{name}.py'), 'rb') as f:
+            digest.update(name.encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """按内容寻址的分析结果缓存"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_entries: 最多保留的条目数
+            max_bytes: 所有条目的最大总字节数
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(input_fingerprint: str, params: Dict[str, Any]) -> str:
+        """
+        生成缓存键
+
+        Args:
+            input_fingerprint: 输入数据摘要（文件内容摘要或数据高水位）
+            params: 分析参数和代码版本（需可JSON序列化）
+
+        Returns:
+            str: sha256缓存键
+        """
+        payload = json.dumps({'input': input_fingerprint, 'params': params},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def fingerprint_file(self, path: str) -> str:
+        """
+        文件内容的sha256摘要
+        以(路径, 大小, 修改时间)记住已计算的摘要，文件未变时不再重新读取
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            str: sha256摘要
+        """
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        known = self._load_fingerprints()
+        entry = known.get(os.path.abspath(path))
+        if entry and entry['signature'] == signature:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        known[os.path.abspath(path)] = {'signature': signature, 'sha256': digest.hexdigest()}
+        with atomic_open(os.path.join(self.cache_dir, FINGERPRINT_FILE), 'w', encoding='utf-8') as f:
+            json.dump(known, f, ensure_ascii=False)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存条目，命中时刷新其最近使用时间
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的值，未命中时返回None
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # 损坏或与当前代码不兼容的条目直接丢弃
+            os.remove(path)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # 读取后被另一个进程淘汰，值仍然有效
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        写入缓存条目并按LRU淘汰超出限制的条目
+
+        Args:
+            key: 缓存键
+            value: 可pickle的值
+        """
+        with atomic_open(self._entry_path(key), 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._evict()
+
+    def clear(self):
+        """删除所有缓存条目"""
+        for entry in self._entries():
+            os.remove(entry['path'])
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存使用情况"""
+        entries = self._entries()
+        return {
+            'entries': len(entries),
+            'bytes': sum(entry['size'] for entry in entries),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}{ENTRY_SUFFIX}')
+
+    def _entries(self) -> List[Dict[str, Any]]:
+        """所有条目，按最近使用时间从旧到新排序"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # 另一个进程刚刚淘汰了该条目
+            entries.append({'path': path, 'size': stat.st_size, 'used': stat.st_mtime_ns})
+        entries.sort(key=lambda entry: entry['used'])
+        return entries
+
+    def _evict(self):
+        """淘汰最久未使用的条目直到满足条目数和总大小限制"""
+        entries = self._entries()
+        total = sum(entry['size'] for entry in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            oldest = entries.pop(0)
+            try:
+                os.remove(oldest['path'])
+            except FileNotFoundError:
+                pass
+            total -= oldest['size']
+
+    def _load_fingerprints(self) -> Dict[str, Any]:
+        path = os.path.join(self.cache_dir, FINGERPRINT_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+历史原始消息归档的并行批量重新分析
+把目录或通配符匹配到的 raw_messages_*.json 分配到进程池中分析（大文件先分配），
+每个文件的结果按内容写入分析缓存（与分析器共用缓存键），未变化的文件直接命中缓存；
+各文件的游戏和对战按seq去重后合并为一份玩家统计，解析失败的文件汇总在文件清单中
+
+运行: python src/backfill.py archive/ --out-dir backfill
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis_cache import AnalysisCache, source_fingerprint, DEFAULT_CACHE_DIR
+from checkpoint import atomic_open
+from niu_niu_analysis import (
+    AnalysisResult, analyze_messages, analysis_parameters, build_player_stats, rank_players, ANALYSIS_MODULES
+)
+from player_form import attach_form, DEFAULT_FORM_WINDOW
+from player_registry import PlayerRegistry
+from records import Game, Battle
+
+ARCHIVE_PATTERN = 'raw_messages_*.json'
+FILES_CSV = 'backfill_files.csv'
+STATS_CSV = 'backfill_stats.csv'
+
+
+def find_archives(sources: List[str], pattern: str = ARCHIVE_PATTERN) -> List[str]:
+    """
+    展开归档来源
+
+    Args:
+        sources: 目录（匹配其中的pattern）、通配符或文件路径
+        pattern: 目录中的归档文件名模式
+
+    Returns:
+        List[str]: 去重并排序的文件路径
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(glob.glob(os.path.join(source, pattern)))
+        elif glob.has_magic(source):
+            paths.update(path for path in glob.glob(source) if os.path.isfile(path))
+        else:
+            paths.add(source)
+    return sorted(paths)
+
+
+def cache_params(form_window: int) -> Dict[str, Any]:
+    """分析缓存参数（与分析器的analyze模式相同，两边可以互相命中）"""
+    return {**analysis_parameters(), 'form_window': form_window, 'code': source_fingerprint(ANALYSIS_MODULES)}
+
+
+def analyze_archive(path: str, cache_dir: Optional[str], cache_key: Optional[str],
+                    form_window: int = DEFAULT_FORM_WINDOW) -> Dict[str, Any]:
+    """
+    分析一个归档文件（在工作进程中运行，异常不向外抛出）
+
+    Args:
+        path: 归档文件
+        cache_dir: 分析缓存目录（None为不使用缓存）
+        cache_key: 该文件的缓存键
+        form_window: 近期状态的滚动窗口
+
+    Returns:
+        Dict: path、status（ok/failed）、cached、message_count、analysis、error、seconds
+    """
+    started = time.perf_counter()
+    outcome = {'path': path, 'status': 'ok', 'cached': False, 'message_count': 0,
+               'analysis': None, 'error': ''}
+    try:
+        cache = AnalysisCache(cache_dir) if cache_dir and cache_key else None
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached is not None:
+            outcome.update(cached=True, message_count=cached['message_count'], analysis=cached['analysis'])
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                messages = json.load(f)
+            if not isinstance(messages, list):
+                raise ValueError(f'expected a JSON array of messages, got {type(messages).__name__}')
+            analysis = analyze_messages(messages)
+            attach_form(analysis.player_stats, analysis.valid_games, analysis.battles, form_window)
+            outcome.update(message_count=len(messages), analysis=analysis)
+            if cache is not None:
+                cache.put(cache_key, {'message_count': len(messages), 'analysis': analysis, 'outputs': {}})
+    except Exception as e:  # 单个文件的任何错误都只记录到清单，不中断整批
+        outcome.update(status='failed', error=f'{type(e).__name__}: {e}')
+    outcome['seconds'] = round(time.perf_counter() - started, 3)
+    return outcome
+
+
+class BackfillMerger:
+    """
+    合并各文件的游戏和对战：玩家ID映射到统一的登记表，
+    按seq去重（归档的时间段可能重叠）
+    """
+
+    def __init__(self):
+        """初始化空的合并结果"""
+        self.registry = PlayerRegistry()
+        self.games: Dict[int, Game] = {}
+        self.battles: Dict[int, Battle] = {}
+
+    def add(self, analysis: AnalysisResult):
+        """
+        加入一个文件的分析结果（记录的玩家ID被原地改写为统一ID）
+
+        Args:
+            analysis: 该文件的分析结果
+        """
+        ids = self.registry.merge(analysis.registry)
+        for game in analysis.valid_games:
+            if game.seq not in self.games:
+                game.player_id = ids[game.player_id]
+                self.games[game.seq] = game
+        for battle in analysis.battles:
+            if battle.player1_seq not in self.battles:
+                battle.player1_id, battle.player2_id = ids[battle.player1_id], ids[battle.player2_id]
+                if battle.winner_id is not None:
+                    battle.winner_id = ids[battle.winner_id]
+                self.battles[battle.player1_seq] = battle
+
+    def merged(self) -> Tuple[List[Game], List[Battle]]:
+        """
+        按时间排序的合并结果，显示名统一为合并后登记表的显示名
+
+        Returns:
+            Tuple: (有效游戏, 对战记录)
+        """
+        labels = self.registry.labels()
+        games = sorted(self.games.values(), key=attrgetter('date', 'start_time', 'seq'))
+        position = {game.seq: i for i, game in enumerate(games)}
+        battles = sorted(self.battles.values(), key=lambda battle: position[battle.player1_seq])
+        for game in games:
+            game.player_name = labels[game.player_id]
+        for battle in battles:
+            battle.player1, battle.player2 = labels[battle.player1_id], labels[battle.player2_id]
+            battle.winner = labels[battle.winner_id] if battle.winner_id is not None else 'draw'
+        return games, battles
+
+    def player_stats(self, form_window: int = DEFAULT_FORM_WINDOW) -> Dict[str, Dict[str, Any]]:
+        """合并后的玩家统计（含近期状态）"""
+        games, battles = self.merged()
+        player_stats = build_player_stats(games, battles)
+        attach_form(player_stats, games, battles, form_window)
+        return player_stats
+
+
+def run_backfill(paths: List[str], workers: Optional[int] = None, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 form_window: int = DEFAULT_FORM_WINDOW, on_result=None) -> Dict[str, Any]:
+    """
+    并行分析多个归档文件并合并结果
+
+    Args:
+        paths: 归档文件
+        workers: 并行进程数，默认CPU核数，1为不并行
+        cache_dir: 分析缓存目录（None为不使用缓存）
+        form_window: 近期状态的滚动窗口
+        on_result: 每个文件完成时调用on_result(outcome)（在主进程中，如导出SQLite）
+
+    Returns:
+        Dict: files（每个文件的结果，不含analysis，按路径排序）、player_stats、games、battles
+    """
+    cache = AnalysisCache(cache_dir) if cache_dir else None
+    params = cache_params(form_window) if cache is not None else None
+    tasks, files = [], []
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+            key = cache.make_key(cache.fingerprint_file(path), params) if cache is not None else None
+        except OSError as e:
+            files.append({'path': path, 'status': 'failed', 'cached': False, 'message_count': 0,
+                          'analysis': None, 'error': f'{type(e).__name__}: {e}', 'seconds': 0})
+            continue
+        tasks.append((size, path, key))
+    # 大文件先分配，避免最后只剩一个大文件在跑
+    tasks.sort(key=lambda task: -task[0])
+
+    analyses: Dict[str, AnalysisResult] = {}
+
+    def collect(outcome: Dict[str, Any]):
+        if on_result is not None:
+            on_result(outcome)
+        if outcome['analysis'] is not None:
+            analyses[outcome['path']] = outcome['analysis']
+        outcome['analysis'] = None
+        files.append(outcome)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers <= 1:
+        for _, path, key in tasks:
+            collect(analyze_archive(path, cache_dir, key, form_window))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(analyze_archive, path, cache_dir, key, form_window): path
+                       for _, path, key in tasks}
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:  # 工作进程异常退出
+                    outcome = {'path': futures[future], 'status': 'failed', 'cached': False, 'message_count': 0,
+                               'analysis': None, 'error': f'{type(e).__name__}: {e}', 'seconds': 0}
+                collect(outcome)
+
+    # 按路径顺序合并，结果与完成顺序无关
+    merger = BackfillMerger()
+    for path in sorted(analyses):
+        merger.add(analyses.pop(path))
+    files.sort(key=lambda outcome: outcome['path'])
+    return {'files': files, 'player_stats': merger.player_stats(form_window),
+            'games': len(merger.games), 'battles': len(merger.battles)}
+
+
+def write_files_csv(path: str, files: List[Dict[str, Any]]):
+    """写出每个文件的处理结果"""
+    with atomic_open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['path', 'status', 'cached', 'message_count', 'seconds', 'error'],
+                                extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(files)
+
+
+def write_merged_stats_csv(path: str, player_stats: Dict[str, Dict[str, Any]]):
+    """写出合并后的玩家统计"""
+    with atomic_open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['player_name', 'total_games', 'total_points', 'avg_points', 'win_rate', 'battles_won',
+                         'battles_lost', 'battles_draw', 'niu_niu_count', 'baozi_count', 'no_niu_count',
+                         'longest_win_streak'])
+        for player, stats in rank_players(player_stats):
+            counts = stats['result_counts']
+            writer.writerow([player, stats['total_games'], stats['total_points'], round(stats['avg_points'], 2),
+                             round(stats['win_rate'], 1), stats['battles_won'], stats['battles_lost'],
+                             stats['battles_draw'], counts['牛牛'], counts['豹子'], counts['没牛'],
+                             stats.get('longest_win_streak', '')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel re-analysis of archived raw message dumps")
+    parser.add_argument("sources", nargs='+', help=f"Directories (matching {ARCHIVE_PATTERN}), globs or files")
+    parser.add_argument("--out-dir", default='.', help=f"Where to write {STATS_CSV} and {FILES_CSV}")
+    parser.add_argument("--workers", type=int, help="Parallel worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Analysis result cache directory (shared with the analyzer)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-analyze every file")
+    parser.add_argument("--form-window", type=int, default=DEFAULT_FORM_WINDOW, help="Rolling window for recent form stats")
+    parser.add_argument("--sqlite", help="Also upsert every file's dice, games and battles into this SQLite database")
+    parser.add_argument("--group", default="21998085218@chatroom", help="Group chat ID for --sqlite")
+
+    args = parser.parse_args()
+
+    paths = find_archives(args.sources)
+    if not paths:
+        parser.error(f'no archives found in: {" ".join(args.sources)}')
+    os.makedirs(args.out_dir, exist_ok=True)
+    print(f'🗃️  Backfill: {len(paths)}个归档, {args.workers or os.cpu_count()}个进程')
+
+    export = None
+    if args.sqlite:
+        from sqlite_export import SqliteExport
+        export = SqliteExport(args.sqlite, args.group)
+
+    def on_result(outcome: Dict[str, Any]):
+        analysis = outcome['analysis']
+        if outcome['status'] != 'ok':
+            print(f'  ❌ {outcome["path"]}: {outcome["error"]}')
+            return
+        source = '缓存' if outcome['cached'] else f'{outcome["seconds"]:.1f}s'
+        print(f'  📦 {outcome["path"]}: {outcome["message_count"]}条消息, '
+              f'{len(analysis.valid_games)}局, {len(analysis.battles)}轮 ({source})')
+        if export is not None:
+            export.write_dice(analysis.dice_records, analysis.registry)
+            export.write_games(analysis.valid_games, analysis.registry)
+            export.write_battles(analysis.battles, analysis.registry)
+            export.write_players(analysis.registry)
+
+    started = time.perf_counter()
+    try:
+        result = run_backfill(paths, args.workers, None if args.no_cache else args.cache_dir,
+                              args.form_window, on_result)
+    finally:
+        if export is not None:
+            export.close()
+
+    files_path = os.path.join(args.out_dir, FILES_CSV)
+    stats_path = os.path.join(args.out_dir, STATS_CSV)
+    write_files_csv(files_path, result['files'])
+    write_merged_stats_csv(stats_path, result['player_stats'])
+
+    failed = [outcome for outcome in result['files'] if outcome['status'] != 'ok']
+    cached = sum(1 for outcome in result['files'] if outcome['cached'])
+    print(f'\n✅ 完成: {len(paths) - len(failed)}/{len(paths)}个文件 (缓存 {cached}), '
+          f'合并后 {result["games"]}局, {result["battles"]}轮, 耗时 {time.perf_counter() - started:.1f}s')
+    print(f'📈 合并统计: {stats_path}')
+    print(f'📋 文件清单: {files_path}')
+    if export is not None:
+        print(f'🗄️  SQLite: {export.rows}行 → {args.sqlite}')
+    if failed:
+        print(f'\n⚠️ {len(failed)}个文件解析失败:')
+        for outcome in failed:
+            print(f'  {outcome["path"]}: {outcome["error"]}')
+
+
+if __name__ == "__main__":
+    main()
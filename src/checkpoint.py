@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+长时间运行的检查点和原子写出
+输出文件先写入同目录的临时文件，fsync后再原子替换，进程中途退出不会留下写了一半的文件；
+检查点保存分块分析的全部跨块状态（pickle），同样原子替换。
+检查点带有运行标识（输入文件签名、分组和分析参数），标识不一致的检查点不会被恢复
+"""
+import os
+import pickle
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, Optional
+
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 60.0   # 两次检查点之间的最短间隔（秒）
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', **kwargs) -> Iterator[IO]:
+    """
+    以临时文件写出，正常结束时替换为目标文件，出错时删除临时文件
+
+    Args:
+        path: 目标文件
+        mode: 写入模式（'w' 或 'wb'）
+        **kwargs: 传给open的参数（encoding、newline等）
+
+    Yields:
+        IO: 临时文件
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def file_signature(path: str) -> Optional[list]:
+    """文件的[大小, 修改时间]，不存在时为None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def save_checkpoint(path: str, run: Dict[str, Any], state: Dict[str, Any]):
+    """
+    原子写出检查点
+
+    Args:
+        path: 检查点文件
+        run: 运行标识（恢复时必须完全一致）
+        state: 需要恢复的状态（可pickle）
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with atomic_open(path, 'wb') as f:
+        pickle.dump({'version': CHECKPOINT_VERSION, 'run': run, 'state': state}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_checkpoint(path: str, run: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    读取检查点
+
+    Args:
+        path: 检查点文件
+        run: 当前运行的标识
+
+    Returns:
+        Optional[Dict]: 保存的状态；文件不存在、损坏或标识不一致时为None
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except Exception:  # 不存在或无法读取（如写入时磁盘已满）时从头开始
+        return None
+    if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION or data.get('run') != run:
+        return None
+    return data['state']
+
+
+def remove_checkpoint(path: str):
+    """删除检查点（运行正常完成后）"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def truncate_outputs(sizes: Dict[str, int]):
+    """
+    把追加写出的文件截回检查点时的大小（丢弃检查点之后写入的行）
+
+    Args:
+        sizes: 文件 -> 检查点时的字节数
+    """
+    for path, size in sizes.items():
+        with open(path, 'r+b') as f:
+            f.truncate(size)
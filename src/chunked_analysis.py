@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+大时间范围的分块分析（内存有上限）
+原始消息JSON数组按元素流式读取，按天或按周切块（块超过内存预算时提前切分）；
+块之间只保留组局器中未成局的骰子、尚未能确定先后顺序的游戏和最后一局游戏（用于对战配对）。
+每块的骰子、游戏和对战直接输出，玩家统计的部分结果溢出到磁盘，最后逐个合并；
+这些跨块状态可以整体pickle为检查点，中断后从最后一个检查点继续。
+已输出行的玩家ID另存一份，之后改名或出现重名的玩家在结束时改写为最终显示名
+"""
+import json
+import os
+import shutil
+from array import array
+from collections import Counter
+from datetime import date
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from checkpoint import atomic_open
+from game_assembler import GameAssembler
+from niu_niu_engine import NiuNiuEngine
+from niu_niu_analysis import (
+    extract_dice_records, build_game, decide_battle, is_battle_pair, finalize_player_stats,
+    GAME_WINDOW_SECONDS, BATTLE_WINDOW_SECONDS
+)
+from player_form import FormTracker, DEFAULT_FORM_WINDOW
+from player_registry import PlayerRegistry
+from records import DiceThrow, Game, Battle
+from stream_stats import StreamAccumulator, summarize_games
+
+DEFAULT_MAX_MEMORY_MB = 256
+CHUNK_UNITS = ('day', 'week')
+
+# 原始JSON文本解析成消息字典、再生成骰子/游戏记录后的大致内存放大倍数，
+# 每块读入的JSON文本不超过 内存上限 / MEMORY_EXPANSION
+MEMORY_EXPANSION = 8
+
+# 溢出目录中已输出游戏/对战行的玩家ID（每局1个，每轮对战3个：先手、后手、胜者或-1）
+GAME_IDS = 'games.ids'
+BATTLE_IDS = 'battles.ids'
+
+
+def iter_json_array(path: str, read_size: int = 1 << 20) -> Iterator[Tuple[Any, int]]:
+    """
+    流式读取JSON数组文件，逐个返回元素，内存中只保留当前读取缓冲区
+
+    Args:
+        path: JSON数组文件
+        read_size: 每次读取的字符数
+
+    Yields:
+        Tuple: (元素, 元素的JSON文本长度)
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def skip_whitespace():
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                chunk = f.read(read_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+        skip_whitespace()
+        if buffer[pos:pos + 1] != '[':
+            raise ValueError(f"{path} is not a JSON array")
+        pos += 1
+        skip_whitespace()
+        if buffer[pos:pos + 1] == ']':
+            return
+
+        while True:
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    chunk = f.read(read_size)
+                    buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            yield value, end - pos
+            pos = end
+
+            skip_whitespace()
+            separator = buffer[pos:pos + 1]
+            pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Malformed JSON array in {path}")
+            skip_whitespace()
+
+
+def chunk_label(message: Dict[str, Any], unit: str) -> str:
+    """消息所属的块：日期（day）或ISO周（week），时间无法解析的消息归入上一块"""
+    day = str(message.get('time', ''))[:10]
+    if unit == 'day':
+        return day
+    try:
+        year, week, _ = date.fromisoformat(day).isocalendar()
+    except ValueError:
+        return day
+    return f'{year}-W{week:02d}'
+
+
+def iter_chunks(path: str, unit: str = 'day',
+                max_chunk_bytes: int = DEFAULT_MAX_MEMORY_MB * 1024 * 1024 // MEMORY_EXPANSION
+                ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    把原始消息文件切成按天/按周的块，单块的JSON文本超过预算时提前切分
+
+    Args:
+        path: raw_messages_*.json
+        unit: 'day' 或 'week'
+        max_chunk_bytes: 单块JSON文本的字符数上限
+
+    Yields:
+        Tuple: (块标签, 消息列表)
+    """
+    if unit not in CHUNK_UNITS:
+        raise ValueError(f"Chunk unit must be one of {CHUNK_UNITS}")
+    label, messages, size = None, [], 0
+    # 读取缓冲区也计入预算
+    read_size = max(4096, min(1 << 20, max_chunk_bytes // 4))
+    for message, length in iter_json_array(path, read_size):
+        current = chunk_label(message, unit) or label
+        if messages and (current != label or size + length > max_chunk_bytes):
+            yield label, messages
+            messages, size = [], 0
+        label = current
+        messages.append(message)
+        size += length
+    if messages:
+        yield label, messages
+
+
+class ChunkedAnalysis:
+    """跨块保留组局和对战配对状态的分块分析"""
+
+    def __init__(self, spill_dir: str, engine: Optional[NiuNiuEngine] = None,
+                 form_window: int = DEFAULT_FORM_WINDOW,
+                 game_window: int = GAME_WINDOW_SECONDS,
+                 battle_window: int = BATTLE_WINDOW_SECONDS):
+        """
+        初始化
+
+        Args:
+            spill_dir: 部分统计结果的溢出目录（开始时清空）
+            engine: 牛牛规则引擎
+            form_window: 近期状态的滚动窗口
+            game_window: 组局时间窗口（秒）
+            battle_window: 对战时间窗口（秒）
+        """
+        self.spill_dir = spill_dir
+        self.engine = engine or NiuNiuEngine()
+        self.battle_window = battle_window
+        self.registry = PlayerRegistry()
+        self.assembler = GameAssembler(window_seconds=game_window)
+        self.form = FormTracker(form_window)
+
+        self.held: List[Game] = []          # 已成局但之前可能还有未成局游戏的局
+        self.last_game: Optional[Game] = None
+        self.chunks = 0
+        self.message_count = 0
+        self.dice_count = 0
+        self.game_count = 0
+        self.battle_count = 0
+        self.summary = StreamAccumulator()  # 各块的结果分布和每日局数，逐块合并
+        self.written: Dict[int, Set[str]] = {}  # 玩家ID -> 已输出行中使用过的显示名
+
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        os.makedirs(spill_dir)
+
+    def process_chunk(self, label: str, messages: List[Dict[str, Any]]
+                      ) -> Tuple[List[DiceThrow], List[Game], List[Battle]]:
+        """
+        处理一块消息
+
+        Args:
+            label: 块标签（用于溢出文件名）
+            messages: 该块的原始消息
+
+        Returns:
+            Tuple: (骰子记录, 已确定顺序的游戏, 对战记录)
+        """
+        dice_records = extract_dice_records(messages, self.registry)
+        dice_records.sort(key=attrgetter('seq'))
+        for record in dice_records:
+            game_dice = self.assembler.push(record.player_id, record.timestamp, record)
+            if game_dice is not None:
+                self.held.append(build_game(game_dice, self.engine, self.registry.label(record.player_id)))
+
+        games, battles = self._release(self.assembler.earliest_pending())
+        self.chunks += 1
+        self.message_count += len(messages)
+        self.dice_count += len(dice_records)
+        self._spill(label, games, battles)
+        return dice_records, games, battles
+
+    def finish(self) -> Tuple[List[Game], List[Battle]]:
+        """全部块处理完后释放剩余的游戏（之后不会再有成局）"""
+        games, battles = self._release(None)
+        self._spill('final', games, battles)
+        return games, battles
+
+    def _release(self, cutoff: Optional[int]) -> Tuple[List[Game], List[Battle]]:
+        """输出开始时间早于所有未成局骰子的游戏，并与上一局配对"""
+        self.held.sort(key=attrgetter('date', 'start_time'))
+        count = len(self.held)
+        if cutoff is not None:
+            count = 0
+            while count < len(self.held) and self.held[count].timestamp < cutoff:
+                count += 1
+        games, self.held = self.held[:count], self.held[count:]
+
+        battles = []
+        for game in games:
+            if self.last_game is not None and is_battle_pair(self.last_game, game, self.battle_window):
+                battles.append(decide_battle(self.last_game, game))
+            self.last_game = game
+        self.form.feed(games, battles)
+        self.summary.merge(summarize_games(games))
+        self._record_ids(games, battles)
+        self.game_count += len(games)
+        self.battle_count += len(battles)
+        return games, battles
+
+    def _record_ids(self, games: List[Game], battles: List[Battle]):
+        """追加已输出行的玩家ID，并记录行中使用的显示名（对战的名字来自游戏）"""
+        for game in games:
+            self.written.setdefault(game.player_id, set()).add(game.player_name)
+        with open(os.path.join(self.spill_dir, GAME_IDS), 'ab') as f:
+            array('i', (game.player_id for game in games)).tofile(f)
+        with open(os.path.join(self.spill_dir, BATTLE_IDS), 'ab') as f:
+            array('i', (player_id for battle in battles for player_id in (
+                battle.player1_id, battle.player2_id, -1 if battle.winner_id is None else battle.winner_id
+            ))).tofile(f)
+
+    def needs_relabel(self) -> bool:
+        """已输出的行中是否有玩家的名字与最终显示名不同（改名，或之后出现了重名玩家）"""
+        labels = self.registry.labels()
+        return any(names != {labels[player_id]} for player_id, names in self.written.items())
+
+    def game_labels(self) -> Iterator[List[str]]:
+        """按输出顺序逐行返回游戏行的最终显示名：[玩家]"""
+        labels = self.registry.labels()
+        for (player_id,) in self._read_ids(GAME_IDS, 1):
+            yield [labels[player_id]]
+
+    def battle_labels(self) -> Iterator[List[str]]:
+        """按输出顺序逐行返回对战行的最终显示名：[先手, 后手, 胜者或draw]"""
+        labels = self.registry.labels()
+        for player1, player2, winner in self._read_ids(BATTLE_IDS, 3):
+            yield [labels[player1], labels[player2], 'draw' if winner < 0 else labels[winner]]
+
+    def _read_ids(self, name: str, width: int, block: int = 1 << 16) -> Iterator[Tuple[int, ...]]:
+        """分批读取ID文件，每次返回一行的width个ID"""
+        path = os.path.join(self.spill_dir, name)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            while True:
+                ids = array('i')
+                try:
+                    ids.fromfile(f, block * width)
+                except EOFError:
+                    pass  # 最后一批不足block行，已读到的ID仍保留在ids中
+                if not ids:
+                    return
+                for start in range(0, len(ids), width):
+                    yield tuple(ids[start:start + width])
+
+    def _spill(self, label: str, games: List[Game], battles: List[Battle]):
+        """把该块的玩家统计写入溢出目录：玩家键 -> [局数, 得分, 胜, 负, 平, 结果计数]"""
+        partial: Dict[str, List[Any]] = {}
+        key = self.registry.key
+
+        def row(player_id: int) -> List[Any]:
+            return partial.setdefault(key(player_id), [0, 0, 0, 0, 0, {}])
+
+        for game in games:
+            stats = row(game.player_id)
+            stats[0] += 1
+            stats[1] += game.score_points
+            stats[5][game.result_type] = stats[5].get(game.result_type, 0) + 1
+        for battle in battles:
+            p1, p2, winner = battle.player1_id, battle.player2_id, battle.winner_id
+            if winner is None:
+                row(p1)[4] += 1
+                row(p2)[4] += 1
+            else:
+                row(winner)[2] += 1
+                row(p2 if winner == p1 else p1)[3] += 1
+
+        path = os.path.join(self.spill_dir, f'{self.chunks:06d}_{label}.json')
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(partial, f, ensure_ascii=False)
+
+    def rollback(self):
+        """从检查点恢复后，删除检查点之后写出的溢出文件（以及未完成的临时文件），ID文件截回检查点时的行数"""
+        itemsize = array('i').itemsize
+        for name, size in ((GAME_IDS, self.game_count * itemsize), (BATTLE_IDS, self.battle_count * 3 * itemsize)):
+            path = os.path.join(self.spill_dir, name)
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        for name in os.listdir(self.spill_dir):
+            if name in (GAME_IDS, BATTLE_IDS):
+                continue
+            index = name.split('_', 1)[0]
+            if (not name.endswith('.json') or name.endswith('_final.json')
+                    or not index.isdigit() or int(index) > self.chunks):
+                os.remove(os.path.join(self.spill_dir, name))
+
+    def merge_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        逐个读取溢出的部分结果合并为玩家统计（格式同build_player_stats，并含近期状态）
+
+        Returns:
+            Dict: 玩家显示名 -> 统计数据
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.spill_dir, name), 'r', encoding='utf-8') as f:
+                partial = json.load(f)
+            for key, (games, points, won, lost, draw, counts) in partial.items():
+                stats = totals.setdefault(key, {
+                    'total_games': 0, 'total_points': 0, 'avg_points': 0,
+                    'battles_won': 0, 'battles_lost': 0, 'battles_draw': 0,
+                    'win_rate': 0, 'result_counts': Counter()
+                })
+                stats['total_games'] += games
+                stats['total_points'] += points
+                stats['battles_won'] += won
+                stats['battles_lost'] += lost
+                stats['battles_draw'] += draw
+                stats['result_counts'].update(counts)
+
+        ids = {key: player_id for player_id, key in enumerate(self.registry.keys())}
+        labels = self.registry.labels()
+        player_stats = {}
+        for key, stats in totals.items():
+            player_id = ids[key]
+            finalize_player_stats(stats)
+            if player_id in self.form.players:
+                stats.update(self.form.players[player_id].summary())
+            player_stats[labels[player_id]] = stats
+        return player_stats
+
+    def cleanup(self):
+        """删除溢出目录"""
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+牛牛统计面板（Streamlit）
+面板只读取一个预先汇总的快照：每个玩家按日的前缀和、每对玩家按日的胜负平前缀和以及每日局数。
+快照按文件修改时间和大小缓存，任意时间段、玩家筛选和排行都由快照两次查找算出，
+交互时不访问chatlog API，也不重新解析原始消息。
+快照中的玩家和玩家对都以发送者ID为键，改名后历史不拆分，展示时换成最近的显示名
+
+运行: streamlit run src/dashboard.py -- --snapshot dashboard_snapshot.json
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from checkpoint import atomic_open
+from html_report import downsample
+from niu_niu_analysis import RESULT_ORDER, rank_players
+from records import Game, Battle
+from time_index import PlayerTimeIndex, PairTimeIndex
+
+SNAPSHOT_VERSION = 2
+DEFAULT_SNAPSHOT = 'dashboard_snapshot.json'
+
+# 排行依据（显示名 → 表格列）
+RANKING_METRICS = {
+    '平均得分': 'avg_points',
+    '胜率': 'win_rate',
+    '游戏数': 'total_games',
+    '总得分': 'total_points',
+    '胜场': 'battles_won',
+    '牛牛': '牛牛',
+    '豹子': '豹子',
+}
+
+
+class DashboardSnapshot:
+    """面板快照：玩家索引、玩家对索引和每日局数，可按周期增量更新"""
+
+    def __init__(self):
+        """初始化空快照"""
+        self.index = PlayerTimeIndex()
+        self.pairs = PairTimeIndex()
+        self.daily: Dict[str, int] = {}
+
+    def update(self, period_start: str, period_end: str, valid_games: List[Game], battles: List[Battle],
+               keys: List[str], labels: List[str]):
+        """
+        用一个分析周期的结果更新快照（周期内已有的天被替换）
+
+        Args:
+            period_start: 周期起始日期（YYYY-MM-DD）
+            period_end: 周期结束日期（YYYY-MM-DD）
+            valid_games: 周期内的有效游戏
+            battles: 周期内的对战记录
+            keys: 玩家ID -> 发送者ID
+            labels: 玩家ID -> 显示名
+        """
+        self.index.update(period_start, period_end, valid_games, battles, keys, labels)
+        self.pairs.update(period_start, period_end, battles, keys)
+        daily = Counter({day: count for day, count in self.daily.items()
+                         if not period_start <= day <= period_end})
+        for game in valid_games:
+            if game.date and period_start <= game.date <= period_end:
+                daily[game.date] += 1
+        self.daily = dict(sorted(daily.items()))
+
+    def date_range(self) -> Optional[Tuple[str, str]]:
+        """快照覆盖的最早和最晚日期，空快照为None"""
+        covered = self.index.covered_ranges()
+        if not covered:
+            return None
+        return covered[0][0], covered[-1][1]
+
+    def query(self, start: str, end: str, players: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        计算一个时间段（可按玩家筛选）的面板数据
+
+        Args:
+            start: 起始日期（YYYY-MM-DD）
+            end: 结束日期（YYYY-MM-DD）
+            players: 只看这些玩家（为空时全部）
+
+        Returns:
+            Dict: players（表格行，按平均得分排序）、head_to_head、results、daily（降采样后的x/y/桶长度）
+        """
+        selected = set(players)
+        player_stats = self.index.player_stats(start, end)
+        if selected:
+            player_stats = {p: s for p, s in player_stats.items() if p in selected}
+        rows = [player_row(player, stats) for player, stats in rank_players(player_stats)]
+
+        # 玩家对以发送者ID为键，展示时换成当前显示名
+        labels = self.index.labels()
+        pairs = []
+        for a, b, wins, losses, draws in self.pairs.query(start, end):
+            a, b = labels.get(a, a), labels.get(b, b)
+            if not selected or a in selected or b in selected:
+                pairs.append({'player1': a, 'player2': b, 'player1_wins': wins, 'player2_wins': losses,
+                              'draws': draws, 'battles': wins + losses + draws})
+
+        results = Counter()
+        for stats in player_stats.values():
+            results.update(stats['result_counts'])
+
+        days = [day for day in self.daily if start <= day <= end]
+        x, y, size = downsample(days, [self.daily[day] for day in days])
+        return {
+            'players': rows,
+            'head_to_head': pairs,
+            'results': {r: results[r] for r in RESULT_ORDER if results[r]},
+            'daily': {'x': x, 'y': y, 'bucket_days': size},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典"""
+        return {'version': SNAPSHOT_VERSION, 'index': self.index.to_dict(),
+                'pairs': self.pairs.to_dict(), 'daily': self.daily}
+
+    def save(self, path: str):
+        """保存快照（紧凑JSON，原子替换）"""
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'DashboardSnapshot':
+        """
+        从文件加载快照，文件不存在时返回空快照
+
+        Args:
+            path: 快照文件
+
+        Returns:
+            DashboardSnapshot: 快照
+        """
+        snapshot = cls()
+        if not os.path.exists(path):
+            return snapshot
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"快照版本不匹配，请删除后重建: {path}")
+        snapshot.index = PlayerTimeIndex.from_dict(data['index'], path)
+        snapshot.pairs = PairTimeIndex.from_dict(data['pairs'])
+        snapshot.daily = data['daily']
+        return snapshot
+
+
+def snapshot_signature(path: str) -> Optional[Tuple[int, int]]:
+    """快照文件的(修改时间, 大小)，用作缓存键；文件不存在时为None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def player_row(player: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    """玩家统计展开为一行表格"""
+    counts = stats['result_counts']
+    return {
+        'player': player,
+        'total_games': stats['total_games'],
+        'total_points': stats['total_points'],
+        'avg_points': round(stats['avg_points'], 2),
+        'battles_won': stats['battles_won'],
+        'battles_lost': stats['battles_lost'],
+        'battles_draw': stats['battles_draw'],
+        'win_rate': round(stats['win_rate'], 1),
+        '牛牛': counts['牛牛'],
+        '豹子': counts['豹子'],
+        '没牛': counts['没牛'],
+    }
+
+
+def rank_rows(rows: List[Dict[str, Any]], metric: str, min_games: int = 0) -> List[Dict[str, Any]]:
+    """按指定列从高到低排行（只保留至少min_games局的玩家）"""
+    return sorted((row for row in rows if row['total_games'] >= min_games),
+                  key=lambda row: row[metric], reverse=True)
+
+
+def main():
+    import streamlit as st
+
+    parser = argparse.ArgumentParser(description="Niu Niu Stats Dashboard")
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT,
+                        help="Snapshot written by universal_niu_niu_analyzer.py --snapshot")
+    args = parser.parse_args()
+
+    @st.cache_resource(max_entries=1)
+    def load_snapshot(path: str, signature: Tuple[int, int]) -> DashboardSnapshot:
+        # signature变化（快照被重新生成）时重新加载
+        return DashboardSnapshot.load(path)
+
+    @st.cache_data(max_entries=64)
+    def query(_snapshot: DashboardSnapshot, signature: Tuple[int, int],
+              start: str, end: str, players: Tuple[str, ...]) -> Dict[str, Any]:
+        return _snapshot.query(start, end, players)
+
+    st.set_page_config(page_title='牛牛统计面板', layout='wide')
+    st.title('🎲 牛牛统计面板')
+
+    signature = snapshot_signature(args.snapshot)
+    if signature is None:
+        st.error(f'快照不存在: {args.snapshot}（先运行 universal_niu_niu_analyzer.py --snapshot {args.snapshot}）')
+        st.stop()
+    snapshot = load_snapshot(args.snapshot, signature)
+    date_range = snapshot.date_range()
+    if date_range is None:
+        st.warning('快照为空')
+        st.stop()
+    first_day, last_day = date.fromisoformat(date_range[0]), date.fromisoformat(date_range[1])
+
+    with st.sidebar:
+        period = st.date_input('时间范围', (first_day, last_day), min_value=first_day, max_value=last_day)
+        players = st.multiselect('玩家', sorted(snapshot.index.players()))
+        metric = st.selectbox('排行依据', list(RANKING_METRICS))
+        min_games = st.number_input('最少局数', min_value=0, value=0, step=5)
+    if len(period) != 2:
+        st.stop()
+
+    view = query(snapshot, signature, period[0].isoformat(), period[1].isoformat(), tuple(sorted(players)))
+    rows = view['players']
+
+    columns = st.columns(4)
+    columns[0].metric('有效游戏', sum(row['total_games'] for row in rows))
+    columns[1].metric('对战轮次', sum(pair['battles'] for pair in view['head_to_head']))
+    columns[2].metric('玩家', len(rows))
+    columns[3].metric('天数', sum(1 for day in snapshot.daily if period[0].isoformat() <= day <= period[1].isoformat()))
+
+    st.subheader(f'🏆 排行榜（{metric}）')
+    st.dataframe(rank_rows(rows, RANKING_METRICS[metric], min_games), use_container_width=True, hide_index=True)
+
+    daily = view['daily']
+    left, right = st.columns(2)
+    with left:
+        st.subheader('📅 每日游戏数量' if daily['bucket_days'] == 1 else f'📅 游戏数量（每{daily["bucket_days"]}天合计）')
+        st.line_chart({'日期': daily['x'], '局数': daily['y']}, x='日期', y='局数')
+    with right:
+        st.subheader('✨ 结果分布')
+        st.bar_chart({'结果': list(view['results']), '次数': list(view['results'].values())}, x='结果', y='次数')
+
+    st.subheader('⚔️ 对战组合')
+    st.dataframe(view['head_to_head'], use_container_width=True, hide_index=True)
+
+
+if __name__ == "__main__":
+    main()
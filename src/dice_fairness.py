@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+骰子公平性检测
+每个玩家维护流式计数器（6个点数计数、6×6相邻点数转移计数、
+大小序列游程和相邻点数乘积和），每颗骰子O(1)更新，随时可计算：
+- 点数分布卡方检验（对均匀分布，自由度5）
+- 相邻点数独立性卡方检验（自由度25）
+- 大(4-6)/小(1-3)游程检验
+- 一阶序列相关
+计数器可保存到文件，历史数据增长时只需处理新的骰子。
+seq只在同一个群内有序，已计入的seq区间按群记录
+"""
+import json
+import math
+import os
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional
+
+from checkpoint import atomic_open
+
+FACES = 6
+DEFAULT_ALPHA = 0.001       # 判定异常的显著性水平
+MIN_THROWS = 60             # 少于该投掷数时不判定
+
+
+def chi2_sf(x: float, df: int) -> float:
+    """
+    卡方分布的上尾概率（整数自由度的闭式解）
+
+    Args:
+        x: 卡方统计量
+        df: 自由度
+
+    Returns:
+        float: P(X >= x)
+    """
+    if x <= 0:
+        return 1.0
+    half = x / 2
+    if df % 2 == 0:
+        term = total = 1.0
+        for i in range(1, df // 2):
+            term *= half / i
+            total += term
+        return min(1.0, math.exp(-half) * total)
+
+    term = total = 0.0
+    if df > 1:
+        term = total = 1.0
+        for i in range(2, (df + 1) // 2):
+            term *= x / (2 * i - 1)
+            total += term
+    return min(1.0, math.erfc(math.sqrt(half)) + math.sqrt(2 * x / math.pi) * math.exp(-half) * total)
+
+
+def normal_two_sided_p(z: float) -> float:
+    """标准正态分布的双侧p值"""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+class DiceStream:
+    """单个玩家的流式骰子计数器"""
+
+    __slots__ = ('faces', 'transitions', 'last', 'runs', 'pairs',
+                 'sum_a', 'sum_b', 'sum_aa', 'sum_bb', 'sum_ab')
+
+    def __init__(self):
+        self.faces = [0] * FACES
+        self.transitions = [0] * (FACES * FACES)  # 上一颗 -> 下一颗
+        self.last = 0                            # 上一颗点数（0表示还没有）
+        self.runs = 0                            # 大/小序列的游程数
+        self.pairs = 0                           # 相邻骰子对数
+        self.sum_a = self.sum_b = 0              # 相邻对的前/后点数之和
+        self.sum_aa = self.sum_bb = self.sum_ab = 0
+
+    def add(self, value: int):
+        """记录一颗骰子（1-6）"""
+        self.faces[value - 1] += 1
+        last = self.last
+        if last:
+            self.transitions[(last - 1) * FACES + value - 1] += 1
+            self.pairs += 1
+            self.sum_a += last
+            self.sum_b += value
+            self.sum_aa += last * last
+            self.sum_bb += value * value
+            self.sum_ab += last * value
+            if (last > 3) != (value > 3):
+                self.runs += 1
+        else:
+            self.runs = 1
+        self.last = value
+
+    @property
+    def throws(self) -> int:
+        """投掷总数"""
+        return sum(self.faces)
+
+    def face_chi2(self) -> float:
+        """点数分布对均匀分布的卡方统计量"""
+        n = self.throws
+        if n == 0:
+            return 0.0
+        expected = n / FACES
+        return sum((count - expected) ** 2 / expected for count in self.faces)
+
+    def transition_chi2(self) -> float:
+        """相邻点数独立性（6×6列联表）的卡方统计量"""
+        if self.pairs == 0:
+            return 0.0
+        rows = [sum(self.transitions[i * FACES:(i + 1) * FACES]) for i in range(FACES)]
+        cols = [sum(self.transitions[j::FACES]) for j in range(FACES)]
+        chi2 = 0.0
+        for i in range(FACES):
+            for j in range(FACES):
+                expected = rows[i] * cols[j] / self.pairs
+                if expected > 0:
+                    chi2 += (self.transitions[i * FACES + j] - expected) ** 2 / expected
+        return chi2
+
+    def runs_z(self) -> float:
+        """大/小游程检验的z值（游程过少说明点数聚集，过多说明交替）"""
+        high = sum(self.faces[3:])
+        low = self.throws - high
+        n = high + low
+        if high == 0 or low == 0 or n < 3:
+            return 0.0
+        mean = 2 * high * low / n + 1
+        variance = (mean - 1) * (mean - 2) / (n - 1)
+        return (self.runs - mean) / math.sqrt(variance) if variance > 0 else 0.0
+
+    def serial_correlation(self) -> float:
+        """相邻点数的一阶相关系数"""
+        n = self.pairs
+        if n < 2:
+            return 0.0
+        cov = n * self.sum_ab - self.sum_a * self.sum_b
+        var_a = n * self.sum_aa - self.sum_a ** 2
+        var_b = n * self.sum_bb - self.sum_b ** 2
+        if var_a <= 0 or var_b <= 0:
+            return 0.0
+        return cov / math.sqrt(var_a * var_b)
+
+    def report(self, alpha: float = DEFAULT_ALPHA, min_throws: int = MIN_THROWS) -> Dict[str, Any]:
+        """
+        计算全部检验
+
+        Args:
+            alpha: 判定异常的显著性水平
+            min_throws: 少于该投掷数时不判定
+
+        Returns:
+            Dict: 检验统计量、p值和异常标记
+        """
+        face_chi2 = self.face_chi2()
+        transition_chi2 = self.transition_chi2()
+        runs_z = self.runs_z()
+        serial = self.serial_correlation()
+        p_values = {
+            'face_p': chi2_sf(face_chi2, FACES - 1),
+            'transition_p': chi2_sf(transition_chi2, (FACES - 1) ** 2),
+            'runs_p': normal_two_sided_p(runs_z),
+            'serial_p': normal_two_sided_p(serial * math.sqrt(self.pairs)),
+        }
+        flags = [name[:-2] for name, p in p_values.items() if p < alpha]
+        return {
+            'throws': self.throws,
+            **{f'face_{i + 1}': count for i, count in enumerate(self.faces)},
+            'face_chi2': face_chi2,
+            'transition_chi2': transition_chi2,
+            'runs': self.runs,
+            'runs_z': runs_z,
+            'serial_corr': serial,
+            **p_values,
+            'suspicious': '|'.join(flags) if self.throws >= min_throws else '',
+        }
+
+
+class FairnessTracker:
+    """所有玩家的骰子计数器，按群和seq去重，只处理尚未计入的骰子"""
+
+    def __init__(self):
+        """初始化空计数器"""
+        self.players: Dict[str, DiceStream] = {}
+        self.names: Dict[str, str] = {}
+        self.counted: Dict[str, List[List[int]]] = {}  # 群 -> 已计入的seq闭区间（已排序合并）
+        self.skipped = 0       # 上次update中因seq已计入而跳过的骰子
+        self.out_of_order = 0  # 上次update中早于本群已计入位置、但此前未计入的骰子
+
+    def update(self, dice_records: Iterable[Dict[str, Any]], keys: List[str], labels: List[str],
+               group: str = '') -> int:
+        """
+        按seq顺序送入一个群的骰子记录
+        seq落在本群已计入区间内的骰子跳过；早于已计入位置但未计入的骰子（先分析了较晚的时间段）
+        仍然计入并记在out_of_order中，这些骰子与相邻时间段之间的转移和游程会有偏差
+
+        Args:
+            dice_records: 骰子记录（带seq、player_id、dice_value）
+            keys: 玩家ID -> 稳定的玩家键（PlayerRegistry.key）
+            labels: 玩家ID -> 显示名
+            group: 群ID（seq只在群内有序）
+
+        Returns:
+            int: 新处理的骰子数
+        """
+        records = sorted(dice_records, key=lambda r: r.seq)
+        intervals = self.counted.get(group, [])
+        starts = [lo for lo, _ in intervals]
+        high = intervals[-1][1] if intervals else None
+
+        added = skipped = out_of_order = 0
+        for record in records:
+            position = bisect_right(starts, record.seq) - 1
+            if position >= 0 and record.seq <= intervals[position][1]:
+                skipped += 1
+                continue
+            if high is not None and record.seq < high:
+                out_of_order += 1
+            key = keys[record.player_id]
+            stream = self.players.get(key)
+            if stream is None:
+                stream = self.players[key] = DiceStream()
+            stream.add(record.dice_value)
+            self.names[key] = labels[record.player_id]
+            added += 1
+
+        if records:
+            self.counted[group] = _merge_interval(intervals, records[0].seq, records[-1].seq)
+        self.skipped = skipped
+        self.out_of_order = out_of_order
+        return added
+
+    def reports(self, alpha: float = DEFAULT_ALPHA, min_throws: int = MIN_THROWS) -> List[Dict[str, Any]]:
+        """
+        每个玩家的检验结果，可疑玩家在前，其余按投掷数从多到少
+
+        Returns:
+            List[Dict]: 带player_name的检验结果
+        """
+        rows = [{'player_name': self.names.get(key, key), **stream.report(alpha, min_throws)}
+                for key, stream in self.players.items()]
+        rows.sort(key=lambda r: (not r['suspicious'], -r['throws']))
+        return rows
+
+    def save(self, path: str):
+        """保存计数器到JSON文件"""
+        data = {
+            'counted': self.counted,
+            'names': self.names,
+            'players': {key: [getattr(stream, slot) for slot in DiceStream.__slots__]
+                        for key, stream in self.players.items()},
+        }
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'FairnessTracker':
+        """从JSON文件加载计数器，文件不存在时返回空计数器；不分群记录seq的旧文件抛出ValueError"""
+        tracker = cls()
+        if not path or not os.path.exists(path):
+            return tracker
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if 'counted' not in data:
+            raise ValueError(f"公平性计数器格式不匹配（未按群记录seq），请删除后重建: {path}")
+        tracker.counted = data['counted']
+        tracker.names = data['names']
+        for key, values in data['players'].items():
+            stream = DiceStream()
+            for slot, value in zip(DiceStream.__slots__, values):
+                setattr(stream, slot, value)
+            tracker.players[key] = stream
+        return tracker
+
+
+def _merge_interval(intervals: List[List[int]], lo: int, hi: int) -> List[List[int]]:
+    """把[lo, hi]并入已排序的不相交区间列表"""
+    merged: List[List[int]] = []
+    for interval in sorted(intervals + [[lo, hi]]):
+        if merged and interval[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], interval[1])
+        else:
+            merged.append(list(interval))
+    return merged
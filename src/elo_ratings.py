@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Elo等级分
+按时间顺序逐场处理对战，每场O(1)更新双方等级分；
+每天结束时记录当天变化的玩家作为检查点，分析任意周期时
+从周期开始前的检查点继续计算，无需重放全部历史对战；
+每天的对战结果也随检查点保存，重新分析较早的周期后按记录向后重算之后的检查点
+"""
+import json
+import os
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpoint import atomic_open
+
+DEFAULT_RATING = 1500.0
+DEFAULT_K_FACTOR = 32.0
+
+# 每个玩家的状态字段
+RATING, BATTLES, WINS, LOSSES, DRAWS = range(5)
+
+
+class EloRatings:
+    """Elo等级分引擎：玩家键 -> [等级分, 对战数, 胜, 负, 平]"""
+
+    def __init__(self, k_factor: float = DEFAULT_K_FACTOR, initial_rating: float = DEFAULT_RATING,
+                 state: Optional[Dict[str, List[float]]] = None):
+        """
+        初始化引擎
+
+        Args:
+            k_factor: 每场对战的最大等级分变化
+            initial_rating: 新玩家的初始等级分
+            state: 已有的玩家状态（从检查点恢复）
+        """
+        self.k_factor = k_factor
+        self.initial_rating = initial_rating
+        self.state: Dict[str, List[float]] = {key: list(row) for key, row in (state or {}).items()}
+
+    @staticmethod
+    def expected_score(rating: float, opponent: float) -> float:
+        """rating对opponent的期望得分"""
+        return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+    def _row(self, player: str) -> List[float]:
+        row = self.state.get(player)
+        if row is None:
+            row = self.state[player] = [self.initial_rating, 0, 0, 0, 0]
+        return row
+
+    def rate(self, player1: str, player2: str, score1: float):
+        """
+        记录一场对战
+
+        Args:
+            player1: 玩家1
+            player2: 玩家2
+            score1: 玩家1的得分（胜1、平0.5、负0）
+        """
+        row1, row2 = self._row(player1), self._row(player2)
+        change = self.k_factor * (score1 - self.expected_score(row1[RATING], row2[RATING]))
+        row1[RATING] += change
+        row2[RATING] -= change
+        row1[BATTLES] += 1
+        row2[BATTLES] += 1
+        if score1 == 1:
+            row1[WINS] += 1
+            row2[LOSSES] += 1
+        elif score1 == 0:
+            row1[LOSSES] += 1
+            row2[WINS] += 1
+        else:
+            row1[DRAWS] += 1
+            row2[DRAWS] += 1
+
+    def rating(self, player: str) -> float:
+        """玩家当前等级分（未出现过的玩家为初始分）"""
+        row = self.state.get(player)
+        return row[RATING] if row else self.initial_rating
+
+
+class RatingHistory:
+    """按日的等级分检查点（每天只保存当天发生变化的玩家）"""
+
+    def __init__(self, k_factor: float = DEFAULT_K_FACTOR, initial_rating: float = DEFAULT_RATING):
+        """
+        初始化空历史
+
+        Args:
+            k_factor: Elo K值
+            initial_rating: 初始等级分
+        """
+        self.k_factor = k_factor
+        self.initial_rating = initial_rating
+        self.days: List[str] = []
+        self.snapshots: Dict[str, Dict[str, List[float]]] = {}
+        self.results: Dict[str, List[List[Any]]] = {}  # 日期 -> [[玩家1键, 玩家2键, 玩家1得分], ...]
+        self.names: Dict[str, str] = {}  # 玩家键 -> 最近的显示名
+
+    def state_before(self, day: str) -> Dict[str, List[float]]:
+        """
+        day之前最后一个检查点时所有玩家的状态
+
+        Args:
+            day: 日期（YYYY-MM-DD）
+
+        Returns:
+            Dict: 玩家键 -> 状态
+        """
+        state: Dict[str, List[float]] = {}
+        for past in self.days[:bisect_left(self.days, day)]:
+            state.update(self.snapshots[past])
+        return state
+
+    def run_period(self, period_start: str, period_end: str, battles: List[Dict[str, Any]],
+                   keys: List[str], labels: List[str]) -> Tuple[EloRatings, Dict[str, List[float]]]:
+        """
+        从周期开始前的检查点继续，按顺序处理周期内的对战并记录每日检查点；
+        周期之后已有的检查点依赖旧的历史，按保存的对战结果从周期结束时的状态重算
+
+        Args:
+            period_start: 周期起始日期（YYYY-MM-DD）
+            period_end: 周期结束日期（YYYY-MM-DD）
+            battles: 按时间排序的对战记录（带player1_id/player2_id/winner_id）
+            keys: 玩家ID -> 稳定的玩家键（PlayerRegistry.key）
+            labels: 玩家ID -> 显示名
+
+        Returns:
+            Tuple: (周期结束时的引擎, 周期开始时的状态)
+
+        Raises:
+            ValueError: 周期之后的检查点缺少对战结果（旧版本的检查点文件），无法重算
+        """
+        later = [day for day in self.days if day > period_end]
+        missing = [day for day in later if day not in self.results]
+        if missing:
+            raise ValueError(f"{period_end}之后已有{len(later)}天的等级分检查点，但{missing[0]}起缺少对战结果，"
+                             f"无法重算；请删除检查点文件后按时间顺序重建")
+
+        start_state = self.state_before(period_start)
+        elo = EloRatings(self.k_factor, self.initial_rating, start_state)
+
+        # 丢弃周期开始及之后的检查点（之后的天稍后重算），替换周期内的对战结果
+        del_from = bisect_left(self.days, period_start)
+        for day in self.days[del_from:]:
+            del self.snapshots[day]
+        del self.days[del_from:]
+        for day in [day for day in self.results if period_start <= day <= period_end]:
+            del self.results[day]
+
+        current_day, changed = None, set()
+        for battle in battles:
+            day = battle.date
+            if not day or not period_start <= day <= period_end:
+                continue
+            if day != current_day:
+                self._checkpoint(current_day, changed, elo)
+                current_day, changed = day, set()
+
+            p1, p2 = keys[battle.player1_id], keys[battle.player2_id]
+            winner = battle.winner_id
+            score1 = 0.5 if winner is None else (1.0 if winner == battle.player1_id else 0.0)
+            elo.rate(p1, p2, score1)
+            self.results.setdefault(day, []).append([p1, p2, score1])
+            changed.add(p1)
+            changed.add(p2)
+        self._checkpoint(current_day, changed, elo)
+
+        # 周期之后的天从周期结束时的状态重放
+        replay = EloRatings(self.k_factor, self.initial_rating, elo.state)
+        for day in later:
+            changed = set()
+            for p1, p2, score1 in self.results[day]:
+                replay.rate(p1, p2, score1)
+                changed.add(p1)
+                changed.add(p2)
+            self._checkpoint(day, changed, replay)
+
+        for player_id, key in enumerate(keys):
+            if key in elo.state:
+                self.names[key] = labels[player_id]
+        return elo, start_state
+
+    def _checkpoint(self, day: Optional[str], changed: set, elo: EloRatings):
+        """记录一天结束时发生变化的玩家状态"""
+        if day is None or not changed:
+            return
+        if not self.days or self.days[-1] != day:
+            self.days.append(day)
+        self.snapshots.setdefault(day, {}).update((key, list(elo.state[key])) for key in changed)
+
+    def save(self, path: str):
+        """保存检查点到JSON文件"""
+        data = {
+            'k_factor': self.k_factor,
+            'initial_rating': self.initial_rating,
+            'names': self.names,
+            'snapshots': {day: self.snapshots[day] for day in self.days},
+            'results': self.results,
+        }
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, k_factor: float = DEFAULT_K_FACTOR,
+             initial_rating: float = DEFAULT_RATING) -> 'RatingHistory':
+        """
+        从JSON文件加载检查点，文件不存在时返回空历史
+
+        Args:
+            path: 检查点文件路径
+            k_factor: 新建历史时使用的K值
+            initial_rating: 新建历史时使用的初始等级分
+
+        Returns:
+            RatingHistory: 等级分历史
+        """
+        history = cls(k_factor, initial_rating)
+        if not os.path.exists(path):
+            return history
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data['k_factor'] != k_factor or data['initial_rating'] != initial_rating:
+            raise ValueError(f"等级分参数不匹配，请删除后重建: {path}")
+
+        history.names = data['names']
+        history.snapshots = data['snapshots']
+        history.days = sorted(history.snapshots)
+        history.results = data.get('results', {})
+        return history
+
+
+def rating_table(elo: EloRatings, start_state: Dict[str, List[float]],
+                 names: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    周期内有对战的玩家按等级分从高到低排行
+
+    Args:
+        elo: 周期结束时的引擎
+        start_state: 周期开始时的状态
+        names: 玩家键 -> 显示名
+
+    Returns:
+        List[Dict]: 排行行（player_name, rating, change, battles, wins, losses, draws），
+                    change和对战数均为本周期内的变化
+    """
+    rows = []
+    for key, row in elo.state.items():
+        before = start_state.get(key, [elo.initial_rating, 0, 0, 0, 0])
+        if row[BATTLES] == before[BATTLES]:
+            continue
+        rows.append({
+            'player_name': names.get(key, key),
+            'rating': round(row[RATING], 1),
+            'change': round(row[RATING] - before[RATING], 1),
+            'battles': int(row[BATTLES] - before[BATTLES]),
+            'wins': int(row[WINS] - before[WINS]),
+            'losses': int(row[LOSSES] - before[LOSSES]),
+            'draws': int(row[DRAWS] - before[DRAWS]),
+        })
+    rows.sort(key=lambda r: r['rating'], reverse=True)
+    return rows
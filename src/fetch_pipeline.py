@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+边获取边分析的流水线
+逐页获取作为生产者，经有界队列交给分析线程（骰子提取、组局和结果判定）；
+队列满时生产者等待（背压），内存中最多只有 队列长度+2 页未处理的消息。
+网络等待与分析互相重叠，总耗时接近 max(获取, 分析) 而不是两者之和
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from chunked_analysis import ChunkedAnalysis
+from niu_niu_analysis import AnalysisResult
+from player_form import DEFAULT_FORM_WINDOW
+from records import DiceThrow, Game, Battle, json_default
+from stage_profiler import StageProfiler, NULL_PROFILER
+
+DEFAULT_QUEUE_PAGES = 4
+
+_DONE = object()
+
+
+async def pipeline(pages: Iterator[Any], consume: Callable[[Any], None],
+                   queue_pages: int = DEFAULT_QUEUE_PAGES) -> int:
+    """
+    生产者在获取线程中逐页调用next(pages)，消费者在分析线程中处理每页
+
+    Args:
+        pages: 阻塞的分页迭代器
+        consume: 处理一页的函数（在分析线程中调用，按页的顺序）
+        queue_pages: 队列中最多缓存的页数
+
+    Returns:
+        int: 处理的页数
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_pages)
+    consumed = 0
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='fetch') as fetch_pool, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix='analyze') as analyze_pool:
+
+        async def produce():
+            try:
+                while True:
+                    page = await loop.run_in_executor(fetch_pool, next, pages, _DONE)
+                    if page is _DONE:
+                        break
+                    await queue.put(page)  # 队列满时在此等待
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                await queue.put(_DONE)  # 获取出错时让消费者处理完已获取的页后结束
+                raise
+            await queue.put(_DONE)
+
+        async def consume_all():
+            nonlocal consumed
+            while True:
+                page = await queue.get()
+                if page is _DONE:
+                    return
+                await loop.run_in_executor(analyze_pool, consume, page)
+                consumed += 1
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            await consume_all()
+        finally:
+            if not producer.done():
+                producer.cancel()
+            # 分析失败时生产者可能阻塞在已满的队列上，需要取消
+            await asyncio.gather(producer, return_exceptions=True)
+        producer.result()
+    return consumed
+
+
+class RawJsonWriter:
+    """
+    逐页写出raw_messages_*.json，格式与json.dump(messages, indent=2)一致；
+    先写入临时文件，close时才替换目标文件，中途失败不会留下不完整的原始数据
+    """
+
+    def __init__(self, path: str):
+        """
+        打开输出文件
+
+        Args:
+            path: 原始消息文件
+        """
+        self.path = path
+        self.count = 0
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+
+    def write_page(self, messages: List[Dict[str, Any]]):
+        """追加一页消息"""
+        for message in messages:
+            text = json.dumps(message, ensure_ascii=False, indent=2, default=json_default).replace('\n', '\n  ')
+            self._file.write(('[\n  ' if self.count == 0 else ',\n  ') + text)
+            self.count += 1
+
+    def close(self):
+        """写入数组结尾，关闭并替换目标文件"""
+        self._file.write('\n]' if self.count else '[]')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """关闭并删除临时文件，保留原有的目标文件"""
+        self._file.close()
+        os.remove(self._tmp_path)
+
+
+class PagedAnalysis:
+    """按页增量分析，保留全部骰子/游戏/对战以生成与一次性分析相同的结果"""
+
+    def __init__(self, raw_filename: str, spill_dir: str, form_window: int = DEFAULT_FORM_WINDOW,
+                 profiler: Optional[StageProfiler] = None):
+        """
+        初始化
+
+        Args:
+            raw_filename: 原始消息输出文件
+            spill_dir: 每页部分统计的溢出目录
+            form_window: 近期状态的滚动窗口
+            profiler: 分阶段计时器
+        """
+        self.writer = RawJsonWriter(raw_filename)
+        self.chunks = ChunkedAnalysis(spill_dir, form_window=form_window)
+        self.profiler = profiler or NULL_PROFILER
+        self.dice_records: List[DiceThrow] = []
+        self.valid_games: List[Game] = []
+        self.battles: List[Battle] = []
+
+    def consume(self, messages: List[Dict[str, Any]]):
+        """处理一页消息（分析线程中调用）"""
+        with self.profiler.stage('write_raw_json', items=len(messages)):
+            self.writer.write_page(messages)
+        with self.profiler.stage('pipeline_analyze', items=len(messages)):
+            dice_records, games, battles = self.chunks.process_chunk(f'page{self.chunks.chunks + 1}', messages)
+        self.dice_records += dice_records
+        self.valid_games += games
+        self.battles += battles
+
+    def finish(self) -> Tuple[int, AnalysisResult]:
+        """
+        结束流水线，合并统计
+
+        Returns:
+            Tuple: (消息数, 分析结果)
+        """
+        if self.writer.count:
+            self.writer.close()
+        else:
+            # 没有获取到任何消息（连接失败或时间段为空）时不覆盖已有的原始数据
+            self.writer.abort()
+        games, battles = self.chunks.finish()
+        self.valid_games += games
+        self.battles += battles
+        player_stats = self.chunks.merge_stats()
+        self.chunks.cleanup()
+
+        # 与一次性分析一致：游戏和对战中的玩家名统一使用最终的显示名
+        registry = self.chunks.registry
+        labels = registry.labels()
+        for game in self.valid_games:
+            game.player_name = labels[game.player_id]
+        for battle in self.battles:
+            battle.player1 = labels[battle.player1_id]
+            battle.player2 = labels[battle.player2_id]
+            if battle.winner_id is not None:
+                battle.winner = labels[battle.winner_id]
+
+        result = AnalysisResult(self.dice_records, self.valid_games, self.battles, player_stats, registry)
+        return self.writer.count, result
+
+
+def run_fetch_pipeline(pages: Iterator[List[Dict[str, Any]]], raw_filename: str, spill_dir: str,
+                       form_window: int = DEFAULT_FORM_WINDOW, queue_pages: int = DEFAULT_QUEUE_PAGES,
+                       profiler: Optional[StageProfiler] = None) -> Tuple[int, AnalysisResult]:
+    """
+    边获取边分析
+
+    Args:
+        pages: 分页消息迭代器（OptimizedChatlogImporter.iter_message_pages）
+        raw_filename: 原始消息输出文件
+        spill_dir: 部分统计的溢出目录
+        form_window: 近期状态的滚动窗口
+        queue_pages: 队列中最多缓存的页数
+        profiler: 分阶段计时器
+
+    Returns:
+        Tuple: (消息数, 分析结果)
+    """
+    analysis = PagedAnalysis(raw_filename, spill_dir, form_window, profiler)
+    try:
+        asyncio.run(pipeline(pages, analysis.consume, queue_pages))
+    except BaseException:
+        analysis.writer.abort()
+        analysis.chunks.cleanup()
+        raise
+    return analysis.finish()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+牛牛游戏组局器
+按seq顺序逐个接收骰子投掷，同一玩家5颗骰子落在时间窗口内即组成一局有效游戏
+批量分析和流式消费共用同一个状态机，内存只保留每个玩家尚未成局的骰子
+"""
+from collections import OrderedDict, deque
+from typing import Any, Deque, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+
+GAME_DICE_COUNT = 5          # 一局游戏的骰子数量
+DEFAULT_GAME_WINDOW = 30     # 5颗骰子必须在30秒内投完
+
+
+class GameAssembler:
+    """在线组局状态机（每个玩家一个环形缓冲区）"""
+
+    def __init__(self, window_seconds: int = DEFAULT_GAME_WINDOW,
+                 max_players: Optional[int] = None):
+        """
+        初始化组局器
+
+        Args:
+            window_seconds: 第1颗与第5颗骰子之间允许的最大时间差（秒）
+            max_players: 同时保留未成局骰子的玩家上限，None表示只按时间淘汰
+        """
+        self.window_seconds = window_seconds
+        self.max_players = max_players
+
+        # 玩家 -> 未成局骰子的环形缓冲区，按最近投掷时间排序（最久未活动的在最前）
+        self._pending: 'OrderedDict[Hashable, Deque[Tuple[int, Any]]]' = OrderedDict()
+        self._latest_timestamp = 0
+
+        self.games_emitted = 0
+        self.evicted_dice = 0
+
+    def push(self, player: Hashable, timestamp: int, item: Any) -> Optional[List[Any]]:
+        """
+        接收一次骰子投掷
+
+        Args:
+            player: 玩家标识
+            timestamp: 投掷时间戳（秒）
+            item: 骰子记录，成局时原样返回
+
+        Returns:
+            List: 成局时返回该局5颗骰子的记录，否则返回None
+        """
+        buffer = self._pending.get(player)
+        if buffer is None:
+            buffer = deque(maxlen=GAME_DICE_COUNT)
+            self._pending[player] = buffer
+        else:
+            self._pending.move_to_end(player)
+
+        # 缓冲区已满时append会自动丢弃最早的骰子（该骰子无法再作为一局的起点）
+        if len(buffer) == GAME_DICE_COUNT:
+            self.evicted_dice += 1
+        buffer.append((timestamp, item))
+
+        if timestamp > self._latest_timestamp:
+            self._latest_timestamp = timestamp
+            self._evict_stale()
+
+        if len(buffer) < GAME_DICE_COUNT:
+            self._enforce_player_limit()
+            return None
+
+        if buffer[-1][0] - buffer[0][0] <= self.window_seconds:
+            del self._pending[player]
+            self.games_emitted += 1
+            return [entry[1] for entry in buffer]
+
+        return None
+
+    def feed(self, throws: Iterable[Tuple[Hashable, int, Any]]) -> Iterator[List[Any]]:
+        """
+        流式处理投掷序列
+
+        Args:
+            throws: 按seq排序的(玩家, 时间戳, 记录)序列
+
+        Yields:
+            List: 每局游戏的5颗骰子记录
+        """
+        for player, timestamp, item in throws:
+            game = self.push(player, timestamp, item)
+            if game is not None:
+                yield game
+
+    def pending_players(self) -> int:
+        """当前有未成局骰子的玩家数量"""
+        return len(self._pending)
+
+    def pending_dice(self) -> int:
+        """当前缓存的未成局骰子总数"""
+        return sum(len(buffer) for buffer in self._pending.values())
+
+    def earliest_pending(self) -> Optional[int]:
+        """未成局骰子中最早的投掷时间戳（之后成局的游戏不会早于它开始），没有时为None"""
+        return min((buffer[0][0] for buffer in self._pending.values()), default=None)
+
+    def _evict_stale(self):
+        """淘汰整段过期的未成局序列（最后一次投掷已超出时间窗口的玩家）"""
+        cutoff = self._latest_timestamp - self.window_seconds
+        while self._pending:
+            player, buffer = next(iter(self._pending.items()))
+            if buffer[-1][0] >= cutoff:
+                break
+            self.evicted_dice += len(buffer)
+            del self._pending[player]
+
+    def _enforce_player_limit(self):
+        """超过玩家上限时淘汰最久未活动的玩家"""
+        if self.max_players is None:
+            return
+        while len(self._pending) > self.max_players:
+            _, buffer = self._pending.popitem(last=False)
+            self.evicted_dice += len(buffer)
\ No newline at end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+静态HTML报告
+由已汇总的数据（玩家统计、单遍游戏汇总、对战矩阵）生成一个独立的HTML文件，
+图表为plotly.js的图表JSON，不经过原始游戏记录，也不需要导入plotly的Python包；
+长时间序列按桶合并降采样，一整年的报告也只有几十KB
+"""
+import html
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from checkpoint import atomic_open
+from niu_niu_analysis import RESULT_ORDER
+from stream_stats import StreamAccumulator, summarize_players
+
+PLOTLY_JS_URL = 'https://cdn.plot.ly/plotly-2.35.2.min.js'
+MAX_POINTS = 180           # 时间序列最多保留的点数
+MAX_HEATMAP_PLAYERS = 30   # 热力图只画对战最多的玩家
+TOP_N = 15                 # 排行榜长度
+
+
+def downsample(labels: Sequence[str], values: Sequence[float],
+               max_points: int = MAX_POINTS) -> Tuple[List[str], List[float], int]:
+    """
+    把连续的点按等长的桶求和，点数不超过max_points
+
+    Args:
+        labels: 按时间排序的标签（日期）
+        values: 对应的值
+        max_points: 最多保留的点数
+
+    Returns:
+        Tuple: (每桶第一个标签, 每桶的和, 桶长度)
+    """
+    size = max(1, math.ceil(len(labels) / max_points))
+    if size == 1:
+        return list(labels), list(values), 1
+    return ([labels[i] for i in range(0, len(labels), size)],
+            [sum(values[i:i + size]) for i in range(0, len(values), size)], size)
+
+
+def _bar(name: str, x: List[Any], y: List[Any], title: str, **layout) -> Dict[str, Any]:
+    """单序列柱状图"""
+    return {'data': [{'type': 'bar', 'name': name, 'x': x, 'y': y}],
+            'layout': dict(title={'text': title}, **layout)}
+
+
+def leaderboard_figures(sorted_players: List[Tuple[str, Dict[str, Any]]],
+                        leaders: Optional[StreamAccumulator] = None,
+                        top_n: int = TOP_N) -> List[Dict[str, Any]]:
+    """平均得分、胜率和活跃度排行榜"""
+    leaders = leaders or summarize_players(sorted_players)
+    by_avg = sorted_players[:top_n]
+    by_games = leaders.top('activity').items()[:top_n]
+    qualified = sorted((entry for entry in sorted_players
+                        if entry[1]['battles_won'] + entry[1]['battles_lost'] >= 5),
+                       key=lambda entry: entry[1]['win_rate'], reverse=True)[:top_n]
+    return [
+        _bar('平均得分', [p for p, _ in by_avg], [round(s['avg_points'], 2) for _, s in by_avg],
+             f'平均得分 Top {top_n}'),
+        _bar('胜率', [p for p, _ in qualified], [round(s['win_rate'], 1) for _, s in qualified],
+             f'胜率 Top {top_n}（至少5场对战）', yaxis={'ticksuffix': '%'}),
+        _bar('游戏数', [p for p, _ in by_games], [s['total_games'] for _, s in by_games],
+             f'活跃度 Top {top_n}'),
+    ]
+
+
+def result_figures(sorted_players: List[Tuple[str, Dict[str, Any]]], game_summary: StreamAccumulator,
+                   top_n: int = TOP_N) -> List[Dict[str, Any]]:
+    """整体结果分布和活跃玩家的结果构成"""
+    results = game_summary.hist('result_type')
+    order = [r for r in RESULT_ORDER if results[r]]
+    players = sorted_players[:top_n]
+    names = [p for p, _ in players]
+    stacked = [{'type': 'bar', 'name': r, 'x': names, 'y': [s['result_counts'][r] for _, s in players]}
+               for r in order]
+    return [
+        _bar('局数', order, [results[r] for r in order], '结果分布'),
+        {'data': stacked, 'layout': {'title': {'text': f'玩家结果构成（平均得分 Top {top_n}）'},
+                                     'barmode': 'stack'}},
+    ]
+
+
+def daily_figure(game_summary: StreamAccumulator, max_points: int = MAX_POINTS) -> Optional[Dict[str, Any]]:
+    """每日（或每N天）游戏数量"""
+    daily = game_summary.hist('date')
+    if not daily:
+        return None
+    days = sorted(daily)
+    x, y, size = downsample(days, [daily[d] for d in days], max_points)
+    title = '每日游戏数量' if size == 1 else f'游戏数量（每{size}天合计）'
+    return {'data': [{'type': 'scatter', 'mode': 'lines', 'name': '局数', 'x': x, 'y': y}],
+            'layout': {'title': {'text': title}, 'xaxis': {'type': 'date'}}}
+
+
+def heatmap_figure(matrix: Any, max_players: int = MAX_HEATMAP_PLAYERS) -> Optional[Dict[str, Any]]:
+    """
+    对战胜率热力图（行玩家对列玩家的胜率，只画对战最多的max_players个玩家）
+
+    Args:
+        matrix: MatchupMatrix
+
+    Returns:
+        Optional[Dict]: 图表，没有对战时为None
+    """
+    games = matrix.games
+    played = games.sum(axis=1).tolist()
+    games = games.tolist()
+    keep = sorted((i for i in range(matrix.size) if played[i]), key=lambda i: -played[i])[:max_players]
+    if not keep:
+        return None
+    wins = matrix.wins.tolist()
+    rates, counts = [], []
+    for i in keep:
+        row_rates, row_counts = [], []
+        for j in keep:
+            decisive = wins[i][j] + wins[j][i]
+            row_rates.append(round(wins[i][j] / decisive * 100, 1) if decisive else None)
+            row_counts.append(games[i][j])
+        rates.append(row_rates)
+        counts.append(row_counts)
+    labels = [matrix.labels[i] for i in keep]
+    return {'data': [{'type': 'heatmap', 'x': labels, 'y': labels, 'z': rates, 'customdata': counts,
+                      'zmin': 0, 'zmax': 100, 'colorscale': 'RdBu',
+                      'hovertemplate': '%{y} 对 %{x}<br>胜率 %{z}%<br>%{customdata}轮<extra></extra>'}],
+            'layout': {'title': {'text': '对战胜率（行玩家对列玩家）'}, 'yaxis': {'autorange': 'reversed'},
+                       'height': 300 + 18 * len(labels)}}
+
+
+def render_report(title: str, overview: Dict[str, Any], figures: List[Dict[str, Any]],
+                  plotly_js_url: str = PLOTLY_JS_URL) -> str:
+    """
+    拼出HTML
+
+    Args:
+        title: 报告标题
+        overview: 概览数字（名称 → 值）
+        figures: plotly.js图表（data/layout）
+        plotly_js_url: plotly.js脚本地址
+
+    Returns:
+        str: HTML文本
+    """
+    rows = ''.join(f'<tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>'
+                   for k, v in overview.items())
+    divs = ''.join(f'<div id="fig{i}" class="fig"></div>' for i in range(len(figures)))
+    # 紧凑JSON；转义"</"，玩家昵称不会提前结束<script>
+    payload = json.dumps(figures, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return f'''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script src="{html.escape(plotly_js_url)}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1100px; }}
+table {{ border-collapse: collapse; }}
+th, td {{ padding: 4px 12px; text-align: left; border-bottom: 1px solid #ddd; }}
+.fig {{ margin-top: 2em; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<table>{rows}</table>
+{divs}
+<script>
+const figures = {payload};
+figures.forEach((fig, i) => Plotly.newPlot('fig' + i, fig.data, fig.layout, {{responsive: true}}));
+</script>
+</body>
+</html>
+'''
+
+
+def write_html_report(path: str, title: str, overview: Dict[str, Any],
+                      sorted_players: List[Tuple[str, Dict[str, Any]]], game_summary: StreamAccumulator,
+                      matrix: Any = None, leaders: Optional[StreamAccumulator] = None,
+                      max_points: int = MAX_POINTS) -> int:
+    """
+    生成HTML报告（先写临时文件再替换）
+
+    Args:
+        path: 输出文件
+        title: 报告标题
+        overview: 概览数字
+        sorted_players: rank_players的结果
+        game_summary: summarize_games的结果
+        matrix: MatchupMatrix（没有时不画热力图）
+        leaders: summarize_players的结果（没有时重新汇总）
+        max_points: 时间序列最多保留的点数
+
+    Returns:
+        int: 文件字节数
+    """
+    figures = leaderboard_figures(sorted_players, leaders) + result_figures(sorted_players, game_summary)
+    for figure in (daily_figure(game_summary, max_points),
+                   heatmap_figure(matrix) if matrix is not None else None):
+        if figure is not None:
+            figures.append(figure)
+    data = render_report(title, overview, figures).encode('utf-8')
+    with atomic_open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+对战矩阵
+以整数玩家ID为下标的N×N NumPy矩阵记录每对玩家的胜/负/平，
+由对战列表批量更新，支持导出完整矩阵CSV、赛程强度和Top-K对战组合。
+另记录每对玩家第一次对战的序号，Top-K在对战次数相同时按首次出现排序（与head_to_head一致）
+"""
+import csv
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from checkpoint import atomic_open
+
+
+NOT_SEEN = np.iinfo(np.int64).max
+
+
+class MatchupMatrix:
+    """N×N对战矩阵：wins[i, j]为i战胜j的次数，draws对称"""
+
+    def __init__(self, labels: List[str]):
+        """
+        初始化矩阵
+
+        Args:
+            labels: 按玩家ID排列的显示名（PlayerRegistry.labels()）
+        """
+        self.labels = list(labels)
+        size = len(self.labels)
+        self.wins = np.zeros((size, size), dtype=np.int64)
+        self.draws = np.zeros((size, size), dtype=np.int64)
+        self.first_seen = np.full((size, size), NOT_SEEN, dtype=np.int64)  # 上三角：该组合第一次对战的序号
+        self.battle_count = 0
+
+    @classmethod
+    def from_battles(cls, battles: List[Dict[str, Any]], labels: List[str]) -> 'MatchupMatrix':
+        """由对战列表创建矩阵"""
+        matrix = cls(labels)
+        matrix.update(battles)
+        return matrix
+
+    @property
+    def size(self) -> int:
+        """玩家数量"""
+        return len(self.labels)
+
+    def resize(self, labels: List[str]):
+        """玩家登记表增长后扩展矩阵（已有玩家的ID不变）"""
+        if len(labels) < self.size:
+            raise ValueError("Player labels can only grow")
+        grow = len(labels) - self.size
+        self.labels = list(labels)
+        if grow:
+            self.wins = np.pad(self.wins, ((0, grow), (0, grow)))
+            self.draws = np.pad(self.draws, ((0, grow), (0, grow)))
+            self.first_seen = np.pad(self.first_seen, ((0, grow), (0, grow)), constant_values=NOT_SEEN)
+
+    def update(self, battles: List[Dict[str, Any]]):
+        """
+        批量累加对战结果
+
+        Args:
+            battles: 带player1_id/player2_id/winner_id的对战记录
+        """
+        if not battles:
+            return
+        p1 = np.fromiter((b.player1_id for b in battles), dtype=np.int64, count=len(battles))
+        p2 = np.fromiter((b.player2_id for b in battles), dtype=np.int64, count=len(battles))
+        winner = np.fromiter((-1 if b.winner_id is None else b.winner_id for b in battles),
+                             dtype=np.int64, count=len(battles))
+
+        if max(int(p1.max()), int(p2.max())) >= self.size:
+            raise ValueError("Battle references a player ID outside the matrix; call resize() first")
+
+        decisive = winner >= 0
+        loser = np.where(winner == p1, p2, p1)
+        np.add.at(self.wins, (winner[decisive], loser[decisive]), 1)
+
+        drawn = ~decisive
+        np.add.at(self.draws, (p1[drawn], p2[drawn]), 1)
+        np.add.at(self.draws, (p2[drawn], p1[drawn]), 1)
+
+        order = np.arange(self.battle_count, self.battle_count + len(battles), dtype=np.int64)
+        np.minimum.at(self.first_seen, (np.minimum(p1, p2), np.maximum(p1, p2)), order)
+        self.battle_count += len(battles)
+
+    @property
+    def losses(self) -> np.ndarray:
+        """losses[i, j]为i负于j的次数"""
+        return self.wins.T
+
+    @property
+    def games(self) -> np.ndarray:
+        """每对玩家的对战总数（对称）"""
+        return self.wins + self.wins.T + self.draws
+
+    def win_rates(self) -> np.ndarray:
+        """每个玩家的胜率（胜/(胜+负)），没有分出胜负的对战时为NaN"""
+        won = self.wins.sum(axis=1)
+        decisive = won + self.wins.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(decisive > 0, won / decisive, np.nan)
+
+    def strength_of_schedule(self, strength: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        赛程强度：按对战次数加权的对手平均实力
+
+        Args:
+            strength: 每个玩家的实力值（默认使用胜率，没有胜负记录的对手按0.5计）
+
+        Returns:
+            np.ndarray: 每个玩家的赛程强度，没有对战时为NaN
+        """
+        if strength is None:
+            strength = np.nan_to_num(self.win_rates(), nan=0.5)
+        games = self.games
+        played = games.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(played > 0, games @ strength / played, np.nan)
+
+    def top_pairs(self, k: int = 3) -> List[Tuple[str, int, Dict[str, int]]]:
+        """
+        对战次数最多的k个组合
+
+        Args:
+            k: 返回的组合数量
+
+        Returns:
+            List[Tuple]: (对战组合, 对战次数, 战绩)，格式与niu_niu_analysis.head_to_head一致
+        """
+        rows, cols = np.triu_indices(self.size, k=1)
+        counts = self.games[rows, cols]
+        played = np.flatnonzero(counts)
+        if k <= 0 or played.size == 0:
+            return []
+
+        # 排序键：对战次数从多到少，相同时按首次对战先后（每个组合的首次序号唯一，排序确定）；
+        # 先用argpartition选出前k个，再只对这k个排序
+        first = self.first_seen[rows, cols]
+        rank = -counts[played] * (self.battle_count + 1) + first[played]
+        if played.size > k:
+            selected = np.argpartition(rank, k - 1)[:k]
+            played, rank = played[selected], rank[selected]
+        played = played[np.argsort(rank)]
+
+        pairs = []
+        for index in played:
+            i, j = int(rows[index]), int(cols[index])
+            if self.labels[j] < self.labels[i]:
+                i, j = j, i
+            pairs.append((f'{self.labels[i]} vs {self.labels[j]}', int(counts[index]), {
+                'p1_wins': int(self.wins[i, j]),
+                'p2_wins': int(self.wins[j, i]),
+                'draws': int(self.draws[i, j]),
+            }))
+        return pairs
+
+    def write_csv(self, path: str):
+        """
+        导出完整矩阵：第i行第j列为"胜-负-平"（行玩家对列玩家），
+        末尾附加胜率和赛程强度两列
+
+        Args:
+            path: CSV文件路径
+        """
+        win_rates = self.win_rates()
+        schedule = self.strength_of_schedule()
+        with atomic_open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['player'] + self.labels + ['win_rate', 'strength_of_schedule'])
+            for i, label in enumerate(self.labels):
+                cells = [
+                    '' if i == j else f'{self.wins[i, j]}-{self.wins[j, i]}-{self.draws[i, j]}'
+                    for j in range(self.size)
+                ]
+                writer.writerow([label] + cells + [_format_rate(win_rates[i]), _format_rate(schedule[i])])
+
+
+def _format_rate(value: float) -> str:
+    """CSV中的比率，NaN输出为空"""
+    return '' if np.isnan(value) else f'{value:.3f}'
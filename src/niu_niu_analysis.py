@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+牛牛数据分析核心
+从原始消息中提取骰子、组局、匹配对战并汇总玩家统计
+命令行分析器、HTTP服务等入口共用这里的各个阶段
+"""
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from niu_niu_engine import NiuNiuEngine
+from game_assembler import GameAssembler, DEFAULT_GAME_WINDOW
+from player_registry import PlayerRegistry
+from records import DiceThrow, Game, Battle
+
+
+GAME_WINDOW_SECONDS = DEFAULT_GAME_WINDOW   # 5颗骰子组成一局的时间窗口
+BATTLE_WINDOW_SECONDS = 300                 # 相邻两局构成对战的时间窗口
+
+# 微信骰子content值到骰子点数的映射
+CONTENT_TO_DICE_MAP = {'4': 1, '5': 2, '6': 3, '7': 4, '8': 5, '9': 6}
+GAMEEXT_PATTERN = re.compile(r'<gameext[^>]*type="2"[^>]*content="([^"]*)"[^>]*></gameext>')
+
+# 结果类型从大到小的顺序
+RESULT_ORDER = ['豹子', '牛牛', '牛9', '牛8', '牛7', '牛6', '牛5', '牛4', '牛3', '牛2', '牛1', '没牛']
+
+# 分析结果的格式或规则变化时递增（使已缓存的分析结果失效）
+ENGINE_VERSION = 1
+
+# 决定分析结果的模块（源码摘要作为分析缓存键的一部分）
+ANALYSIS_MODULES = ['niu_niu_engine', 'niu_niu_analysis', 'game_assembler', 'player_registry', 'player_form',
+                    'records']
+
+
+@dataclass
+class AnalysisResult:
+    """一次分析的完整结果"""
+    dice_records: List[DiceThrow]
+    valid_games: List[Game]
+    battles: List[Battle]
+    player_stats: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    registry: PlayerRegistry = field(default_factory=PlayerRegistry)
+
+
+def calculate_score_points(result_type, result_value):
+    """Score system: Baozi=5, NiuNiu=3, Niu7/8/9=2, NoNiu=0, Others=1"""
+    if result_type == "豹子":
+        return 5
+    elif result_type == "牛牛":
+        return 3
+    elif result_type in ["牛7", "牛8", "牛9"]:
+        return 2
+    elif result_type == "没牛":
+        return 0
+    else:
+        return 1
+
+
+def analysis_parameters() -> Dict[str, Any]:
+    """影响分析结果的参数（分析缓存键的一部分）"""
+    return {
+        'engine_version': ENGINE_VERSION,
+        'game_window_seconds': GAME_WINDOW_SECONDS,
+        'battle_window_seconds': BATTLE_WINDOW_SECONDS,
+        'scoring': {result_type: calculate_score_points(result_type, 0) for result_type in RESULT_ORDER},
+    }
+
+
+def parse_time_range(time_param):
+    """Parse time parameter: 2025-06-23(day), 2025-06(month), 2025-Q2(quarter), 2025-H1(half), 2025(year), custom range"""
+    if ',' in time_param:
+        start_date, end_date = time_param.split(',')
+        return 'custom', start_date.strip(), end_date.strip()
+
+    # 季度/半年与月份同为7个字符，需先于月份判断
+    if 'Q' in time_param:
+        year, quarter = time_param.split('-Q')
+        return 'quarter', time_param, time_param
+
+    if 'H' in time_param:
+        year, half = time_param.split('-H')
+        return 'half', time_param, time_param
+
+    if len(time_param) == 4:
+        return 'year', time_param, time_param
+
+    if len(time_param) == 7:
+        return 'month', time_param, time_param
+
+    if len(time_param) == 10:
+        return 'day', time_param, time_param
+
+    raise ValueError(f"Unsupported time format: {time_param}")
+
+
+def get_filename_suffix(time_type, time_param):
+    """Generate filename suffix"""
+    if time_type == 'day':
+        return time_param.replace('-', '_')
+    elif time_type == 'month':
+        return time_param.replace('-', '_')
+    elif time_type == 'year':
+        return time_param
+    elif time_type == 'quarter':
+        return time_param.replace('-', '_')
+    elif time_type == 'half':
+        return time_param.replace('-', '_')
+    elif time_type == 'custom':
+        start, end = time_param.split(',')
+        return f"{start.strip().replace('-', '_')}_to_{end.strip().replace('-', '_')}"
+    else:
+        return time_param.replace('-', '_').replace(',', '_to_')
+
+
+def time_range_bounds(time_param: str) -> Tuple[date, date]:
+    """
+    将时间参数转换为闭区间日期范围
+
+    Args:
+        time_param: parse_time_range支持的任意时间参数
+
+    Returns:
+        Tuple[date, date]: (起始日期, 结束日期)
+    """
+    time_type, start, end = parse_time_range(time_param)
+
+    if time_type in ('day', 'custom'):
+        return date.fromisoformat(start), date.fromisoformat(end)
+
+    if time_type == 'month':
+        year, month = map(int, start.split('-'))
+        return date(year, month, 1), _month_end(year, month)
+
+    if time_type == 'year':
+        year = int(start)
+        return date(year, 1, 1), date(year, 12, 31)
+
+    if time_type == 'quarter':
+        year, quarter = start.split('-Q')
+        first_month = (int(quarter) - 1) * 3 + 1
+        return date(int(year), first_month, 1), _month_end(int(year), first_month + 2)
+
+    # half
+    year, half = start.split('-H')
+    first_month = 1 if int(half) == 1 else 7
+    return date(int(year), first_month, 1), _month_end(int(year), first_month + 5)
+
+
+def _month_end(year: int, month: int) -> date:
+    """某月的最后一天"""
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def extract_dice_records(messages: List[Dict[str, Any]],
+                         registry: Optional[PlayerRegistry] = None) -> List[DiceThrow]:
+    """
+    从原始消息中提取骰子投掷记录（type=47的gameext骰子动画）
+
+    Args:
+        messages: 标准化后的原始消息列表
+        registry: 玩家登记表（按发送者ID分配整数玩家ID）
+
+    Returns:
+        List[DiceThrow]: 骰子记录列表
+    """
+    registry = registry if registry is not None else PlayerRegistry()
+    dice_records = []
+    for msg in messages:
+        if msg.get('msg_type') != 47:
+            continue
+        content = msg.get('content', '')
+        if 'gameext' not in content or 'type="2"' not in content:
+            continue
+
+        match = GAMEEXT_PATTERN.search(content)
+        if not match:
+            continue
+        content_value = match.group(1)
+        dice_value = CONTENT_TO_DICE_MAP.get(content_value)
+        if not dice_value:
+            continue
+
+        # 解析时间
+        time_str = msg.get('time', '')
+        try:
+            dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+            date_only = dt.strftime('%Y-%m-%d')
+            time_only = dt.strftime('%H:%M:%S')
+            timestamp = int(dt.timestamp())
+        except (ValueError, TypeError, AttributeError):
+            date_only = ''
+            time_only = time_str
+            timestamp = 0
+
+        player_name = msg.get('sender_name', '未知')
+        dice_records.append(DiceThrow(
+            msg.get('seq', 0), date_only, time_only, timestamp,
+            registry.intern(msg.get('sender', ''), player_name, timestamp),
+            player_name, content_value, dice_value
+        ))
+
+    return dice_records
+
+
+def build_game(game_dice: List[DiceThrow], engine: NiuNiuEngine,
+               player_name: Optional[str] = None) -> Game:
+    """
+    由组局器输出的5颗骰子记录生成一局游戏
+
+    Args:
+        game_dice: 同一玩家的5条骰子记录
+        engine: 牛牛规则引擎
+        player_name: 输出用的玩家显示名（默认使用第一颗骰子的昵称）
+
+    Returns:
+        Game: 游戏记录
+    """
+    first, last = game_dice[0], game_dice[-1]
+    dice_values = tuple([record.dice_value for record in game_dice])
+    result = engine.calculate_result(list(dice_values))
+
+    return Game(
+        first.seq, first.player_id, player_name or first.player_name, first.date,
+        first.time, last.time, first.timestamp, dice_values,
+        result.type, result.value, calculate_score_points(result.type, result.value)
+    )
+
+
+def assemble_games(dice_records: List[DiceThrow],
+                   engine: Optional[NiuNiuEngine] = None,
+                   window_seconds: int = GAME_WINDOW_SECONDS,
+                   registry: Optional[PlayerRegistry] = None) -> List[Game]:
+    """
+    将骰子记录按seq顺序送入组局器，得到按开始时间排序的有效游戏
+
+    Args:
+        dice_records: 骰子记录列表
+        engine: 牛牛规则引擎
+        window_seconds: 组局时间窗口（秒）
+        registry: 提取骰子时使用的玩家登记表（用于解析显示名）
+
+    Returns:
+        List[Game]: 有效游戏列表
+    """
+    return evaluate_games(group_throws(dice_records, window_seconds), engine, registry)
+
+
+def group_throws(dice_records: List[DiceThrow],
+                 window_seconds: int = GAME_WINDOW_SECONDS) -> List[List[DiceThrow]]:
+    """
+    组局阶段：按seq顺序送入组局器，返回每局的5条骰子记录
+
+    Args:
+        dice_records: 骰子记录列表
+        window_seconds: 组局时间窗口（秒）
+
+    Returns:
+        List[List[DiceThrow]]: 每局的骰子记录
+    """
+    assembler = GameAssembler(window_seconds=window_seconds)
+    throws = ((record.player_id, record.timestamp, record)
+              for record in sorted(dice_records, key=attrgetter('seq')))
+    return list(assembler.feed(throws))
+
+
+def evaluate_games(game_groups: List[List[DiceThrow]],
+                   engine: Optional[NiuNiuEngine] = None,
+                   registry: Optional[PlayerRegistry] = None) -> List[Game]:
+    """
+    判定阶段：用规则引擎计算每局结果，并按开始时间排序
+
+    Args:
+        game_groups: 每局的骰子记录
+        engine: 牛牛规则引擎
+        registry: 提取骰子时使用的玩家登记表（改名的玩家统一使用最新昵称）
+
+    Returns:
+        List[Game]: 有效游戏列表
+    """
+    engine = engine or NiuNiuEngine()
+    if registry is not None:
+        labels = registry.labels()
+        valid_games = [build_game(game_dice, engine, labels[game_dice[0].player_id])
+                       for game_dice in game_groups]
+    else:
+        valid_games = [build_game(game_dice, engine) for game_dice in game_groups]
+    valid_games.sort(key=attrgetter('date', 'start_time'))
+    return valid_games
+
+
+def decide_battle(current: Game, next_game: Game) -> Battle:
+    """
+    两局相邻游戏构成一轮对战，按得分判定胜负
+
+    Args:
+        current: 先手游戏
+        next_game: 后手游戏
+
+    Returns:
+        Battle: 对战记录
+    """
+    winner, winner_id = 'draw', None
+    if current.score_points > next_game.score_points:
+        winner, winner_id = current.player_name, current.player_id
+    elif next_game.score_points > current.score_points:
+        winner, winner_id = next_game.player_name, next_game.player_id
+
+    return Battle(
+        current.player_name, next_game.player_name, current.player_id, next_game.player_id,
+        current.seq, next_game.seq, winner_id, current.result_type, next_game.result_type,
+        current.score_points, next_game.score_points, winner, current.date
+    )
+
+
+def is_battle_pair(current: Game, next_game: Game,
+                   window_seconds: int = BATTLE_WINDOW_SECONDS) -> bool:
+    """判断相邻两局是否构成对战（不同玩家且开始时间相差不超过窗口）"""
+    if current.player_id == next_game.player_id:
+        return False
+    time_gap = next_game.timestamp - current.timestamp
+    return 0 <= time_gap <= window_seconds
+
+
+def match_battles(valid_games: List[Game],
+                  window_seconds: int = BATTLE_WINDOW_SECONDS) -> List[Battle]:
+    """
+    相邻两局不同玩家的游戏在时间窗口内即为一轮对战
+
+    Args:
+        valid_games: 按开始时间排序的有效游戏
+        window_seconds: 对战时间窗口（秒）
+
+    Returns:
+        List[Battle]: 对战记录列表
+    """
+    battles = []
+    for current, next_game in zip(valid_games, valid_games[1:]):
+        if is_battle_pair(current, next_game, window_seconds):
+            battles.append(decide_battle(current, next_game))
+    return battles
+
+
+def build_player_stats(valid_games: List[Game],
+                       battles: List[Battle]) -> Dict[str, Dict[str, Any]]:
+    """
+    汇总每个玩家的游戏和对战统计
+
+    Args:
+        valid_games: 有效游戏列表
+        battles: 对战记录列表
+
+    Returns:
+        Dict: 玩家 -> 统计数据
+    """
+    # 按整数玩家ID累计，最后才解析为显示名
+    player_stats = defaultdict(lambda: {
+        'total_games': 0, 'total_points': 0, 'avg_points': 0,
+        'battles_won': 0, 'battles_lost': 0, 'battles_draw': 0,
+        'win_rate': 0, 'result_counts': Counter()
+    })
+    names = {}
+
+    # 游戏统计
+    for game in valid_games:
+        player = game.player_id
+        names[player] = game.player_name
+        player_stats[player]['total_games'] += 1
+        player_stats[player]['total_points'] += game.score_points
+        player_stats[player]['result_counts'][game.result_type] += 1
+
+    # 对战统计
+    for battle in battles:
+        p1, p2 = battle.player1_id, battle.player2_id
+        names.setdefault(p1, battle.player1)
+        names.setdefault(p2, battle.player2)
+        winner = battle.winner_id
+
+        if winner == p1:
+            player_stats[p1]['battles_won'] += 1
+            player_stats[p2]['battles_lost'] += 1
+        elif winner == p2:
+            player_stats[p2]['battles_won'] += 1
+            player_stats[p1]['battles_lost'] += 1
+        else:
+            player_stats[p1]['battles_draw'] += 1
+            player_stats[p2]['battles_draw'] += 1
+
+    # 计算统计值
+    for stats in player_stats.values():
+        finalize_player_stats(stats)
+
+    return {names[player]: stats for player, stats in player_stats.items()}
+
+
+def finalize_player_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """根据累计值计算平均得分和胜率"""
+    if stats['total_games'] > 0:
+        stats['avg_points'] = stats['total_points'] / stats['total_games']
+
+    total_decisive = stats['battles_won'] + stats['battles_lost']
+    if total_decisive > 0:
+        stats['win_rate'] = stats['battles_won'] / total_decisive * 100
+    return stats
+
+
+def rank_players(player_stats: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """按平均得分从高到低排序"""
+    return sorted(player_stats.items(), key=lambda x: x[1]['avg_points'], reverse=True)
+
+
+def best_result(result_counts: Counter) -> str:
+    """玩家出现过的最佳结果"""
+    for result_type in RESULT_ORDER[:-1]:
+        if result_counts[result_type] > 0:
+            return result_type
+    return '没牛'
+
+
+def head_to_head(battles: List[Battle]) -> List[Tuple[str, int, Dict[str, int]]]:
+    """
+    统计每对玩家的对战次数和战绩
+
+    Args:
+        battles: 对战记录列表
+
+    Returns:
+        List[Tuple]: (对战组合, 对战次数, 战绩) 按对战次数从多到少排序，
+                     p1_wins/p2_wins分别对应组合中排在前/后的玩家
+    """
+    battle_pairs = defaultdict(int)
+    battle_results = defaultdict(lambda: {'p1_wins': 0, 'p2_wins': 0, 'draws': 0})
+    pair_names = {}
+
+    # 以整数ID对为键，组合名称只在输出时生成
+    for battle in battles:
+        p1, p2 = battle.player1_id, battle.player2_id
+        if battle.player2 < battle.player1:
+            p1, p2 = p2, p1
+            pair_names.setdefault((p1, p2), (battle.player2, battle.player1))
+        else:
+            pair_names.setdefault((p1, p2), (battle.player1, battle.player2))
+        key = (p1, p2)
+        battle_pairs[key] += 1
+
+        winner = battle.winner_id
+        if winner == p1:
+            battle_results[key]['p1_wins'] += 1
+        elif winner == p2:
+            battle_results[key]['p2_wins'] += 1
+        else:
+            battle_results[key]['draws'] += 1
+
+    pairs = sorted(battle_pairs.items(), key=lambda x: x[1], reverse=True)
+    return [(' vs '.join(pair_names[pair]), count, battle_results[pair]) for pair, count in pairs]
+
+
+def analyze_messages(messages: List[Dict[str, Any]],
+                     engine: Optional[NiuNiuEngine] = None) -> AnalysisResult:
+    """
+    对一批原始消息执行完整分析
+
+    Args:
+        messages: 标准化后的原始消息列表
+        engine: 牛牛规则引擎
+
+    Returns:
+        AnalysisResult: 骰子、游戏、对战和玩家统计
+    """
+    registry = PlayerRegistry()
+    dice_records = extract_dice_records(messages, registry)
+    valid_games = assemble_games(dice_records, engine, registry=registry)
+    battles = match_battles(valid_games)
+    player_stats = build_player_stats(valid_games, battles)
+    return AnalysisResult(dice_records, valid_games, battles, player_stats, registry)
\ No newline at end of file
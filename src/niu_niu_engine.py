@@ -41,16 +41,21 @@ class NiuNiuEngine:
         if self._is_baozi(dice):
             return GameResult(type="豹子", value=10)
             
-        # 2. 检查是否有牛
-        niu_combinations = self._find_niu_combinations(dice)
+        # 2. 检查是否有牛，找到最佳的牛牛组合
+        return self.calculate_niu_result(dice)
+    
+    def calculate_niu_result(self, dice: List[int]) -> GameResult:
+        """
+        只按凑十计算牛牛结果，不判定豹子
+        （规则集以不同的豹子定义覆盖这个结果）
         
-        if not niu_combinations:
-            return GameResult(type="没牛", value=0)
+        Args:
+            dice: 5个骰子的列表
             
-        # 3. 找到最佳的牛牛组合
-        best_result = self._find_best_combination(niu_combinations)
-        
-        return best_result
+        Returns:
+            GameResult: 牛牛、牛X或没牛
+        """
+        return self._find_best_combination(self._find_niu_combinations(dice))
     
     def _is_baozi(self, dice: List[int]) -> bool:
         """
@@ -4,21 +4,25 @@
 专门针对牛牛游戏数据进行精确获取和预过滤，减少误导性数据
 """
 import json
-import requests
-from typing import List, Dict, Any, Optional, Set, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import time
 import re
-from collections import defaultdict
 
 from dice_parser import DiceParser
 from niu_niu_engine import NiuNiuEngine
+from seq_tracker import SeqTracker
+from stream_stats import StreamAccumulator
+from records import RawMessage
+from stage_profiler import StageProfiler, NULL_PROFILER
 
 
 @dataclass
 class FilteredDiceMessage:
-    """预过滤的骰子消息"""
+    """预过滤的骰子消息（不保留消息XML，骰子信息已解析为md5_value和content_value）"""
+    __slots__ = ('seq', 'timestamp', 'datetime', 'player_id', 'player_name', 'dice_values', 'dice_count',
+                 'msg_type', 'md5_value', 'content_value', 'confidence_score')
     seq: int
     timestamp: int
     datetime: str
@@ -27,7 +31,6 @@ class FilteredDiceMessage:
     dice_values: List[int]
     dice_count: int
     msg_type: int
-    content: str
     md5_value: str
     content_value: str
     confidence_score: float  # 置信度分数
@@ -36,16 +39,19 @@ class FilteredDiceMessage:
 class OptimizedChatlogImporter:
     """优化的Chatlog数据导入器"""
     
-    def __init__(self, api_base_url: str = "http://127.0.0.1:5030"):
+    def __init__(self, api_base_url: str = "http://127.0.0.1:5030",
+                 profiler: Optional[StageProfiler] = None):
         """
         初始化导入器
-        
+
         Args:
             api_base_url: chatlog HTTP API地址
+            profiler: 分阶段计时器（默认不计时）
         """
         self.api_base_url = api_base_url.rstrip('/')
         self.dice_parser = DiceParser()
         self.niu_niu_engine = NiuNiuEngine()
+        self.profiler = profiler or NULL_PROFILER
         
         # 牛牛相关关键词（用于内容过滤）
         self.niu_niu_keywords = {
@@ -91,26 +97,53 @@ class OptimizedChatlogImporter:
             return []
         
         # 2. 预筛选骰子消息
-        dice_messages = self._pre_filter_dice_messages(raw_messages)
+        with self.profiler.stage('prefilter', items=len(raw_messages)):
+            dice_messages = self._pre_filter_dice_messages(raw_messages)
         print(f"📊 预筛选: {len(raw_messages)} -> {len(dice_messages)} 条骰子消息")
-        
+
         # 3. 应用智能过滤
         if enable_smart_filter:
-            filtered_messages = self._apply_smart_filter(dice_messages, confidence_threshold)
+            with self.profiler.stage('smart_filter', items=len(dice_messages)):
+                filtered_messages = self._apply_smart_filter(dice_messages, confidence_threshold)
             print(f"🧠 智能过滤: {len(dice_messages)} -> {len(filtered_messages)} 条高质量消息")
             return filtered_messages
         else:
             # 转换为FilteredDiceMessage格式
             return [self._convert_to_filtered_message(msg, 1.0) for msg in dice_messages]
     
-    def _fetch_raw_messages_optimized(self, group_name: str, date: str) -> List[Dict]:
+    def _fetch_raw_messages_optimized(self, group_name: str, date: str) -> List[RawMessage]:
         """使用优化参数获取原始消息"""
-        print(f"📡 连接chatlog API...")
+        all_messages = []
+        for batch_messages in self.iter_message_pages(group_name, date):
+            all_messages.extend(batch_messages)
         
-        if not self.test_connection():
-            print(f"❌ 无法连接到chatlog API")
-            return []
-        print(f"✅ API连接成功")
+        print(f"✅ 总共获取 {len(all_messages)} 条原始消息")
+        return all_messages
+    
+    def iter_message_pages(self, group_name: str, date: str, check_connection: bool = True,
+                           raise_errors: bool = False) -> Iterator[List[RawMessage]]:
+        """
+        逐批获取并标准化消息（边获取边处理时使用）
+        分页期间有新消息时offset会偏移导致同一条消息出现在相邻两页，按seq去重后再返回
+        
+        Args:
+            group_name: 群聊名称
+            date: 日期范围
+            check_connection: 获取前是否先测试API连接
+            raise_errors: 请求失败时抛出异常（默认打印后结束，已获取的批次保留）
+            
+        Yields:
+            List[RawMessage]: 每批标准化后的消息
+        """
+        import requests  # 只有联网获取时才需要，避免拖慢纯分析模式的启动
+
+        if check_connection:
+            print(f"📡 连接chatlog API...")
+            
+            if not self.test_connection():
+                print(f"❌ 无法连接到chatlog API")
+                return
+            print(f"✅ API连接成功")
         
         # 优化的API参数
         url = f"{self.api_base_url}/api/v1/chatlog"
@@ -122,10 +155,10 @@ class OptimizedChatlogImporter:
             'offset': 0
         }
         
-        all_messages = []
         current_offset = 0
         batch_size = 2000
         batch_count = 0
+        tracker = SeqTracker()
         
         print(f"📥 开始批量获取消息 (每批{batch_size}条)...")
         
@@ -136,27 +169,32 @@ class OptimizedChatlogImporter:
             params['offset'] = current_offset
             
             try:
-                response = requests.get(url, params=params, timeout=60)  # 增加超时时间
-                response.raise_for_status()
-                
-                data = response.json()
-                if isinstance(data, list):
-                    message_data = data
-                else:
-                    message_data = data.get('data', [])
-                
+                with self.profiler.stage('fetch_page'):
+                    response = requests.get(url, params=params, timeout=60)  # 增加超时时间
+                    response.raise_for_status()
+
+                with self.profiler.stage('decode') as timer:
+                    data = response.json()
+                    if isinstance(data, list):
+                        message_data = data
+                    else:
+                        message_data = data.get('data', [])
+                    timer.add(len(message_data))
+
                 if not message_data:
                     break
-                
+
                 # 转换为标准格式
-                batch_messages = []
-                for item in message_data:
-                    msg = self._standardize_message(item)
-                    if msg:
-                        batch_messages.append(msg)
-                
-                all_messages.extend(batch_messages)
+                with self.profiler.stage('standardize', items=len(message_data)):
+                    batch_messages = []
+                    for item in message_data:
+                        msg = self._standardize_message(item)
+                        if msg:
+                            batch_messages.append(msg)
+                    batch_messages = tracker.filter(batch_messages)
+
                 print(f"  批次 {batch_count}: 获取第 {current_offset+1}-{current_offset+len(batch_messages)} 条消息")
+                yield batch_messages
                 
                 if len(message_data) < batch_size:
                     print(f"  📋 已获取所有数据 (最后一批获取了{len(message_data)}条)")
@@ -168,31 +206,36 @@ class OptimizedChatlogImporter:
                 
             except requests.RequestException as e:
                 print(f"❌ API请求失败: {e}")
+                if raise_errors:
+                    raise
                 break
             except Exception as e:
                 print(f"❌ 数据处理失败: {e}")
+                if raise_errors:
+                    raise
                 break
         
-        print(f"✅ 总共获取 {len(all_messages)} 条原始消息")
-        return all_messages
+        if tracker.duplicates or tracker.missing:
+            print(f"  ⚠️ {tracker.describe()}")
     
-    def _standardize_message(self, item: Dict) -> Optional[Dict]:
+    def _standardize_message(self, item: Dict) -> Optional[RawMessage]:
         """标准化消息格式"""
         try:
-            return {
-                'seq': item.get('seq', 0),
-                'time': item.get('time', ''),
-                'timestamp': self._parse_timestamp(item.get('time', '')),
-                'datetime': self._parse_datetime(item.get('time', '')),
-                'talker': item.get('talker', ''),
-                'talker_name': item.get('talkerName', ''),
-                'sender': item.get('sender', ''),
-                'sender_name': item.get('senderName', ''),
-                'msg_type': item.get('type', 0),
-                'sub_type': item.get('subType', 0),
-                'content': item.get('content', ''),
-                'contents': item.get('contents', {})
-            }
+            time_str = item.get('time', '')
+            return RawMessage(
+                item.get('seq', 0),
+                time_str,
+                self._parse_timestamp(time_str),
+                self._parse_datetime(time_str),
+                item.get('talker', ''),
+                item.get('talkerName', ''),
+                item.get('sender', ''),
+                item.get('senderName', ''),
+                item.get('type', 0),
+                item.get('subType', 0),
+                item.get('content', ''),
+                item.get('contents', {})
+            )
         except Exception:
             return None
     
@@ -226,7 +269,8 @@ class OptimizedChatlogImporter:
             if not dice_values:
                 continue
             
-            # 3. 添加骰子信息
+            # 3. 添加骰子信息（候选骰子消息只占少数，复制为字典后补充，不修改原始消息）
+            msg = dict(msg)
             msg['dice_values'] = dice_values
             msg['dice_count'] = len(dice_values)
             msg['md5_value'] = self._extract_md5_value(msg)
@@ -286,15 +330,41 @@ class OptimizedChatlogImporter:
         # 分析消息上下文，计算置信度
         filtered_messages = []
         
-        for i, msg in enumerate(dice_messages):
-            confidence = self._calculate_message_confidence(msg, dice_messages, i)
-            
+        for msg, confidence in zip(dice_messages, self.score_confidences(dice_messages)):
             if confidence >= confidence_threshold:
                 filtered_msg = self._convert_to_filtered_message(msg, confidence)
                 filtered_messages.append(filtered_msg)
         
         return filtered_messages
     
+    def score_message_confidences(self, messages: List[Dict]) -> Dict[int, float]:
+        """
+        对标准化后的消息做与智能过滤相同的预筛选和置信度计算
+        上下文是预筛选保留的全部候选消息（包括表情/MD5消息），与_apply_smart_filter一致
+        
+        Args:
+            messages: 标准化后的消息列表（需有毫秒timestamp）
+            
+        Returns:
+            Dict[int, float]: seq -> 置信度（只包含预筛选保留的消息）
+        """
+        dice_messages = sorted(self._pre_filter_dice_messages(messages), key=lambda x: x['seq'])
+        return {msg['seq']: confidence
+                for msg, confidence in zip(dice_messages, self.score_confidences(dice_messages))}
+    
+    def score_confidences(self, dice_messages: List[Dict]) -> List[float]:
+        """
+        计算每条骰子消息的置信度（与阈值无关，可对多个阈值复用）
+        
+        Args:
+            dice_messages: 按seq排序的骰子消息（需有content、sender、dice_count和毫秒timestamp）
+            
+        Returns:
+            List[float]: 与输入一一对应的置信度
+        """
+        return [self._calculate_message_confidence(msg, dice_messages, i)
+                for i, msg in enumerate(dice_messages)]
+    
     def _calculate_message_confidence(self, msg: Dict, all_messages: List[Dict], index: int) -> float:
         """计算消息的置信度"""
         confidence = 0.8  # 基础置信度
@@ -373,7 +443,6 @@ class OptimizedChatlogImporter:
             dice_values=msg['dice_values'],
             dice_count=msg['dice_count'],
             msg_type=msg['msg_type'],
-            content=msg['content'],
             md5_value=msg['md5_value'],
             content_value=msg['content_value'],
             confidence_score=confidence
@@ -381,6 +450,8 @@ class OptimizedChatlogImporter:
     
     def test_connection(self) -> bool:
         """测试API连接"""
+        import requests
+
         try:
             response = requests.get(f"{self.api_base_url}/api/v1/contact", timeout=10)
             return response.status_code == 200
@@ -392,22 +463,27 @@ class OptimizedChatlogImporter:
         if not filtered_messages:
             return {'total': 0}
         
-        confidences = [msg.confidence_score for msg in filtered_messages]
-        player_counts = defaultdict(int)
-        
+        # 一次遍历累加置信度统计、玩家分布和骰子数分布
+        acc = StreamAccumulator()
+        confidence, players, dice_counts = acc.stat('confidence'), acc.hist('player'), acc.hist('dice_count')
+        high_confidence = 0
         for msg in filtered_messages:
-            player_counts[msg.player_id] += 1
+            confidence.add(msg.confidence_score)
+            if msg.confidence_score >= 0.8:
+                high_confidence += 1
+            players[msg.player_id] += 1
+            dice_counts[msg.dice_count if msg.dice_count in (1, 5) else 'other'] += 1
         
         return {
-            'total_messages': len(filtered_messages),
-            'avg_confidence': sum(confidences) / len(confidences),
-            'min_confidence': min(confidences),
-            'max_confidence': max(confidences),
-            'high_confidence_count': sum(1 for c in confidences if c >= 0.8),
-            'player_distribution': dict(player_counts),
+            'total_messages': confidence.count,
+            'avg_confidence': confidence.total / confidence.count,
+            'min_confidence': confidence.min,
+            'max_confidence': confidence.max,
+            'high_confidence_count': high_confidence,
+            'player_distribution': dict(players),
             'dice_count_distribution': {
-                '1': sum(1 for msg in filtered_messages if msg.dice_count == 1),
-                '5': sum(1 for msg in filtered_messages if msg.dice_count == 5),
-                'other': sum(1 for msg in filtered_messages if msg.dice_count not in [1, 5])
+                '1': dice_counts[1],
+                '5': dice_counts[5],
+                'other': dice_counts['other']
             }
         }
\ No newline at end of file
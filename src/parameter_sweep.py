@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+组局/对战窗口和置信度阈值的参数扫描
+骰子提取、置信度计算和每手牌的结果只做一次；每组参数只需在
+按seq排序的(玩家, 时间戳)数组上重新组局和配对，各组参数在进程池中并行运行。
+置信度与导入器的智能过滤使用相同的上下文（预筛选保留的全部候选消息，包括表情/MD5消息），
+因此某个阈值下保留的骰子与导入器在该阈值下的过滤结果一致
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from game_assembler import GameAssembler
+from niu_niu_analysis import extract_dice_records, GAME_WINDOW_SECONDS, BATTLE_WINDOW_SECONDS
+from optimized_chatlog_importer import OptimizedChatlogImporter
+from player_registry import PlayerRegistry
+from rule_sets import RuleSet
+
+DEFAULT_GAME_WINDOWS = (20, 30, 45, 60)
+DEFAULT_BATTLE_WINDOWS = (120, 300, 600)
+DEFAULT_CONFIDENCE_THRESHOLDS = (0.0, 0.5, 0.7)
+BASELINE_CONFIDENCE = 0.0  # 分析模式不做置信度过滤
+
+
+@dataclass
+class SweepInput:
+    """与参数无关、只计算一次的输入（按seq排序）"""
+    players: List[int]
+    timestamps: List[int]
+    dice: List[int]
+    confidences: List[float]
+    labels: List[str]
+    points: Sequence[int]    # 手牌下标 -> 得分
+    strength: Sequence[int]  # 手牌下标 -> 对战比较值
+
+
+def prepare_sweep(messages: List[Dict[str, Any]]) -> SweepInput:
+    """
+    提取骰子、计算置信度并编译计分表
+
+    Args:
+        messages: 标准化后的原始消息列表
+
+    Returns:
+        SweepInput: 扫描输入
+    """
+    registry = PlayerRegistry()
+    records = sorted(extract_dice_records(messages, registry), key=lambda r: r.seq)
+
+    # 置信度按导入器的智能过滤计算（上下文相同），预筛选未保留的骰子视为置信度0
+    scores = OptimizedChatlogImporter().score_message_confidences(messages)
+    confidences = [scores.get(record.seq, 0.0) for record in records]
+
+    standard = RuleSet().compile()
+    return SweepInput(
+        players=[record.player_id for record in records],
+        timestamps=[record.timestamp for record in records],
+        dice=[record.dice_value for record in records],
+        confidences=confidences,
+        labels=registry.labels(),
+        points=standard.points,
+        strength=standard.strength,
+    )
+
+
+def run_setting(data: SweepInput, threshold: float, game_window: int,
+                battle_windows: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    一组(置信度阈值, 组局窗口)下组局一次，再按每个对战窗口配对
+
+    Returns:
+        List[Dict]: 每个对战窗口一行结果（带内部排名字段_avg_ranking/_win_rate_ranking）
+    """
+    players, timestamps, dice = data.players, data.timestamps, data.dice
+    kept = [i for i, confidence in enumerate(data.confidences) if confidence >= threshold]
+
+    assembler = GameAssembler(window_seconds=game_window)
+    games = []  # (开始时间戳, 玩家, 手牌下标)
+    for game in assembler.feed((players[i], timestamps[i], i) for i in kept):
+        hand = 0
+        for i in game:
+            hand = hand * 6 + dice[i] - 1
+        games.append((timestamps[game[0]], players[game[0]], hand))
+    games.sort(key=itemgetter(0))
+
+    totals: Dict[int, List[int]] = {}  # 玩家 -> [局数, 得分]
+    for _, player, hand in games:
+        row = totals.setdefault(player, [0, 0])
+        row[0] += 1
+        row[1] += data.points[hand]
+    avg_points = {player: points / count for player, (count, points) in totals.items()}
+
+    # 相邻两局不同玩家即为候选对战，各对战窗口只按时间差筛选
+    candidates = []
+    for (t1, p1, h1), (t2, p2, h2) in zip(games, games[1:]):
+        if p1 != p2 and t2 >= t1:
+            s1, s2 = data.strength[h1], data.strength[h2]
+            candidates.append((t2 - t1, p1, p2, (s1 > s2) - (s1 < s2)))
+
+    rows = []
+    for battle_window in battle_windows:
+        record: Dict[int, List[int]] = {player: [0, 0, 0] for player in totals}  # 胜, 负, 平
+        battles = draws = 0
+        for gap, p1, p2, outcome in candidates:
+            if gap > battle_window:
+                continue
+            battles += 1
+            if outcome > 0:
+                record[p1][0] += 1
+                record[p2][1] += 1
+            elif outcome < 0:
+                record[p2][0] += 1
+                record[p1][1] += 1
+            else:
+                record[p1][2] += 1
+                record[p2][2] += 1
+                draws += 1
+        win_rate = {player: won / (won + lost) * 100 if won + lost else 0
+                    for player, (won, lost, _) in record.items()}
+
+        avg_ranking = [data.labels[p] for p in sorted(avg_points, key=lambda p: -avg_points[p])]
+        win_rate_ranking = [data.labels[p] for p in sorted(win_rate, key=lambda p: -win_rate[p])]
+        rows.append({
+            'confidence_threshold': threshold,
+            'game_window': game_window,
+            'battle_window': battle_window,
+            'dice_kept': len(kept),
+            'games': len(games),
+            'battles': battles,
+            'draws': draws,
+            'players': len(totals),
+            'top_avg_player': avg_ranking[0] if avg_ranking else '',
+            'top_win_rate_player': win_rate_ranking[0] if win_rate_ranking else '',
+            '_avg_ranking': avg_ranking,
+            '_win_rate_ranking': win_rate_ranking,
+        })
+    return rows
+
+
+def kendall_tau(ranking_a: List[str], ranking_b: List[str]) -> float:
+    """
+    两个排名在共同玩家上的Kendall tau（1为完全一致，-1为完全相反）
+
+    Args:
+        ranking_a: 玩家名按名次排列
+        ranking_b: 玩家名按名次排列
+
+    Returns:
+        float: 相关系数，共同玩家少于2人时为1.0
+    """
+    position = {name: i for i, name in enumerate(ranking_b)}
+    common = [position[name] for name in ranking_a if name in position]
+    n = len(common)
+    if n < 2:
+        return 1.0
+    score = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            score += 1 if common[i] < common[j] else -1
+    return score / (n * (n - 1) / 2)
+
+
+_WORKER_DATA: Optional[SweepInput] = None
+
+
+def _init_worker(data: SweepInput):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def _run_worker(task: Tuple[float, int, Sequence[int]]) -> List[Dict[str, Any]]:
+    return run_setting(_WORKER_DATA, *task)
+
+
+def run_sweep(data: SweepInput,
+              game_windows: Sequence[int] = DEFAULT_GAME_WINDOWS,
+              battle_windows: Sequence[int] = DEFAULT_BATTLE_WINDOWS,
+              thresholds: Sequence[float] = DEFAULT_CONFIDENCE_THRESHOLDS,
+              workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    扫描全部参数组合，并计算各组合排名相对基准参数的稳定性
+
+    Args:
+        data: prepare_sweep的结果
+        game_windows: 组局窗口（秒）
+        battle_windows: 对战窗口（秒）
+        thresholds: 置信度阈值
+        workers: 并行进程数，默认CPU核数，1为不并行
+
+    Returns:
+        List[Dict]: 每组参数一行，按(阈值, 组局窗口, 对战窗口)排序；
+                    avg_rank_tau/win_rate_rank_tau为与基准参数排名的Kendall tau
+
+    Raises:
+        ValueError: 任一网格为空
+    """
+    if not (game_windows and battle_windows and thresholds):
+        raise ValueError("Sweep grids must not be empty")
+    battle_windows = sorted(battle_windows)
+    tasks = [(threshold, game_window, battle_windows)
+             for threshold, game_window in product(sorted(thresholds), sorted(game_windows))]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        results = [run_setting(data, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            results = list(pool.map(_run_worker, tasks))
+    rows = [row for task_rows in results for row in task_rows]
+
+    # 基准：当前分析使用的参数（不在网格中时取第一组）
+    baseline = next((row for row in rows
+                     if (row['confidence_threshold'], row['game_window'], row['battle_window'])
+                     == (BASELINE_CONFIDENCE, GAME_WINDOW_SECONDS, BATTLE_WINDOW_SECONDS)), rows[0])
+    for row in rows:
+        row['is_baseline'] = row is baseline
+        row['avg_rank_tau'] = kendall_tau(baseline['_avg_ranking'], row['_avg_ranking'])
+        row['win_rate_rank_tau'] = kendall_tau(baseline['_win_rate_ranking'], row['_win_rate_ranking'])
+    for row in rows:
+        del row['_avg_ranking'], row['_win_rate_ranking']
+    return rows
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+玩家近期状态
+按时间顺序逐局、逐场更新每个玩家的滚动指标（每次O(1)）：
+最长连胜/连败、当前连胜连败、最近N局平均得分、最近N场对战胜率和冷热状态
+"""
+from collections import deque
+from typing import Any, Dict, Iterable
+
+from records import Game, Battle
+
+DEFAULT_FORM_WINDOW = 10
+
+# 冷热判定：最近N场对战的胜率（分出胜负的场次至少占窗口一半）
+HOT_WIN_RATE = 60.0
+COLD_WIN_RATE = 40.0
+
+
+class PlayerForm:
+    """单个玩家的滚动状态（环形缓冲区 + 滚动和）"""
+
+    __slots__ = ('points', 'points_sum',
+                 'outcomes', 'recent_wins', 'recent_decisive',
+                 'streak', 'longest_win_streak', 'longest_loss_streak')
+
+    def __init__(self, window: int = DEFAULT_FORM_WINDOW):
+        self.points = deque(maxlen=window)    # 最近N局得分
+        self.points_sum = 0
+        self.outcomes = deque(maxlen=window)  # 最近N场对战：1胜、-1负、0平
+        self.recent_wins = 0
+        self.recent_decisive = 0
+        self.streak = 0                       # 正数为连胜，负数为连败
+        self.longest_win_streak = 0
+        self.longest_loss_streak = 0
+
+    def add_game(self, score_points: int):
+        """记录一局得分"""
+        if len(self.points) == self.points.maxlen:
+            self.points_sum -= self.points[0]
+        self.points.append(score_points)
+        self.points_sum += score_points
+
+    def add_outcome(self, outcome: int):
+        """
+        记录一场对战结果（平局会中断连胜/连败）
+
+        Args:
+            outcome: 1胜、-1负、0平
+        """
+        if len(self.outcomes) == self.outcomes.maxlen:
+            dropped = self.outcomes[0]
+            self.recent_wins -= dropped == 1
+            self.recent_decisive -= dropped != 0
+        self.outcomes.append(outcome)
+        self.recent_wins += outcome == 1
+        self.recent_decisive += outcome != 0
+
+        if outcome == 1:
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.longest_win_streak = max(self.longest_win_streak, self.streak)
+        elif outcome == -1:
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.longest_loss_streak = max(self.longest_loss_streak, -self.streak)
+        else:
+            self.streak = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        当前的滚动指标
+
+        Returns:
+            Dict: longest_win_streak, longest_loss_streak, current_streak,
+                  recent_avg_points, recent_win_rate, form
+        """
+        recent_avg = self.points_sum / len(self.points) if self.points else 0
+        recent_win_rate = self.recent_wins / self.recent_decisive * 100 if self.recent_decisive else 0
+
+        form = 'steady'
+        if self.recent_decisive >= max(1, self.outcomes.maxlen // 2):
+            if recent_win_rate >= HOT_WIN_RATE:
+                form = 'hot'
+            elif recent_win_rate <= COLD_WIN_RATE:
+                form = 'cold'
+
+        return {
+            'longest_win_streak': self.longest_win_streak,
+            'longest_loss_streak': self.longest_loss_streak,
+            'current_streak': self.streak,
+            'recent_avg_points': recent_avg,
+            'recent_win_rate': recent_win_rate,
+            'form': form,
+        }
+
+
+class FormTracker:
+    """按整数玩家ID维护所有玩家的滚动状态"""
+
+    def __init__(self, window: int = DEFAULT_FORM_WINDOW):
+        """
+        初始化
+
+        Args:
+            window: 滚动窗口（最近N局/N场）
+        """
+        self.window = window
+        self.players: Dict[int, PlayerForm] = {}
+        self.names: Dict[int, str] = {}
+
+    def _player(self, player_id: int, name: str) -> PlayerForm:
+        form = self.players.get(player_id)
+        if form is None:
+            form = self.players[player_id] = PlayerForm(self.window)
+        self.names[player_id] = name
+        return form
+
+    def add_game(self, game: Game):
+        """记录一局游戏"""
+        self._player(game.player_id, game.player_name).add_game(game.score_points)
+
+    def add_battle(self, battle: Battle):
+        """记录一场对战"""
+        p1, p2, winner = battle.player1_id, battle.player2_id, battle.winner_id
+        outcome = 0 if winner is None else (1 if winner == p1 else -1)
+        self._player(p1, battle.player1).add_outcome(outcome)
+        self._player(p2, battle.player2).add_outcome(-outcome)
+
+    def feed(self, valid_games: Iterable[Game], battles: Iterable[Battle]) -> 'FormTracker':
+        """
+        按时间顺序送入游戏和对战（两者的指标互不依赖，可分别送入）
+
+        Args:
+            valid_games: 按开始时间排序的有效游戏
+            battles: 按时间排序的对战记录
+
+        Returns:
+            FormTracker: self
+        """
+        for game in valid_games:
+            self.add_game(game)
+        for battle in battles:
+            self.add_battle(battle)
+        return self
+
+    def by_name(self) -> Dict[str, Dict[str, Any]]:
+        """玩家显示名 -> 滚动指标"""
+        return {self.names[player_id]: form.summary() for player_id, form in self.players.items()}
+
+
+def attach_form(player_stats: Dict[str, Dict[str, Any]], valid_games: Iterable[Game],
+                battles: Iterable[Battle], window: int = DEFAULT_FORM_WINDOW) -> Dict[str, Dict[str, Any]]:
+    """
+    把滚动指标合并进build_player_stats的结果
+
+    Args:
+        player_stats: 玩家 -> 统计数据
+        valid_games: 按开始时间排序的有效游戏
+        battles: 按时间排序的对战记录
+        window: 滚动窗口
+
+    Returns:
+        Dict: 合并后的player_stats（原地修改）
+    """
+    for player, form in FormTracker(window).feed(valid_games, battles).by_name().items():
+        if player in player_stats:
+            player_stats[player].update(form)
+    return player_stats
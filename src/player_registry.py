@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+玩家身份登记
+把稳定的发送者ID（wxid）映射为从0开始的连续整数ID，
+分组、对战和统计都以整数ID为键，只在输出时解析为显示名。
+玩家改名后仍是同一个ID，输出使用最近一次出现的昵称
+"""
+from typing import Dict, List, Optional
+
+
+UNKNOWN_PLAYER = '未知'
+
+
+class PlayerRegistry:
+    """发送者ID -> 连续整数ID 的登记表"""
+
+    def __init__(self):
+        """初始化空登记表"""
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []        # ID -> 发送者ID
+        self._names: List[str] = []       # ID -> 最近使用的昵称
+        self._name_times: List[int] = []  # ID -> 最近昵称出现的时间戳
+        self._labels: Optional[List[str]] = None
+
+    @staticmethod
+    def player_key(sender: str, sender_name: str) -> str:
+        """
+        玩家的稳定标识：优先使用发送者ID，缺失时退化为昵称
+
+        Args:
+            sender: 发送者ID（wxid）
+            sender_name: 显示昵称
+
+        Returns:
+            str: 登记用的键
+        """
+        if sender:
+            return sender
+        return f'name:{sender_name or UNKNOWN_PLAYER}'
+
+    def intern(self, sender: str, sender_name: str = '', timestamp: int = 0) -> int:
+        """
+        登记一个玩家并返回其整数ID，已登记的玩家在昵称更新时记录新昵称
+
+        Args:
+            sender: 发送者ID（wxid）
+            sender_name: 本条消息中的昵称
+            timestamp: 消息时间戳（用于判断哪个昵称最新）
+
+        Returns:
+            int: 玩家ID
+        """
+        key = self.player_key(sender, sender_name)
+        player_id = self._ids.get(key)
+        if player_id is None:
+            player_id = len(self._keys)
+            self._ids[key] = player_id
+            self._keys.append(key)
+            self._names.append(sender_name or UNKNOWN_PLAYER)
+            self._name_times.append(timestamp)
+            self._labels = None
+        elif sender_name and timestamp >= self._name_times[player_id] and sender_name != self._names[player_id]:
+            self._names[player_id] = sender_name
+            self._name_times[player_id] = timestamp
+            self._labels = None
+        return player_id
+
+    def merge(self, other: 'PlayerRegistry') -> List[int]:
+        """
+        登记另一个登记表中的所有玩家（按各自昵称的时间戳保留最新昵称）
+
+        Args:
+            other: 另一个登记表（如另一个文件的分析结果）
+
+        Returns:
+            List[int]: other中的ID -> 本登记表中的ID
+        """
+        # 没有发送者ID的玩家以昵称登记，键为"name:昵称"
+        return [self.intern('' if key.startswith('name:') else key, name, timestamp)
+                for key, name, timestamp in zip(other._keys, other._names, other._name_times)]
+
+    def id_of(self, sender: str, sender_name: str = '') -> Optional[int]:
+        """已登记玩家的ID，未登记时返回None"""
+        return self._ids.get(self.player_key(sender, sender_name))
+
+    def key(self, player_id: int) -> str:
+        """玩家的发送者ID"""
+        return self._keys[player_id]
+
+    def keys(self) -> List[str]:
+        """所有玩家的发送者ID，按ID排列"""
+        return list(self._keys)
+
+    def name(self, player_id: int) -> str:
+        """玩家最近使用的昵称"""
+        return self._names[player_id]
+
+    def label(self, player_id: int) -> str:
+        """输出用的显示名（昵称重复时附加发送者ID后缀以区分）"""
+        return self.labels()[player_id]
+
+    def labels(self) -> List[str]:
+        """
+        所有玩家的显示名，按ID排列
+
+        Returns:
+            List[str]: ID -> 显示名
+        """
+        if self._labels is None:
+            counts: Dict[str, int] = {}
+            for name in self._names:
+                counts[name] = counts.get(name, 0) + 1
+            self._labels = [
+                name if counts[name] == 1 else f'{name}({key.replace("name:", "")[-4:]})'
+                for name, key in zip(self._names, self._keys)
+            ]
+        return self._labels
+
+    def __len__(self) -> int:
+        return len(self._keys)
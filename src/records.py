@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+紧凑的记录类型
+原始消息、骰子投掷、游戏和对战使用__slots__记录代替字典：
+每条记录只有固定的字段槽位（没有哈希表），重复出现的字符串（发送者、昵称、日期、时间）
+统一驻留，骰子记录不再携带消息XML。分析热循环使用属性访问；
+同时保留按键访问（record['seq']、record.get()）以兼容CSV写出和HTTP服务等按字典使用的代码
+"""
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+
+def intern(value: Any) -> Any:
+    """驻留字符串（API返回null等非字符串值时原样返回）"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class Record:
+    """slotted记录的公共基类"""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """同dict.get"""
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        """字段名（按定义顺序）"""
+        return self.__slots__
+
+    def values(self) -> Tuple[Any, ...]:
+        """字段值（按定义顺序）"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def items(self):
+        """(字段名, 值)"""
+        return zip(self.__slots__, self.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（写JSON时使用）"""
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is type(self):
+            return self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # 按位置参数序列化，比默认的槽位字典更小
+        return type(self), self.values()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.items())
+        return f'{type(self).__name__}({fields})'
+
+
+def json_default(value: Any) -> Dict[str, Any]:
+    """json.dump的default：记录按字典写出"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class RawMessage(Record):
+    """标准化后的聊天消息（字段与原始消息文件一致）"""
+    __slots__ = ('seq', 'time', 'timestamp', 'datetime', 'talker', 'talker_name',
+                 'sender', 'sender_name', 'msg_type', 'sub_type', 'content', 'contents')
+
+    def __init__(self, seq: int = 0, time: str = '', timestamp: int = 0, datetime: str = '',
+                 talker: str = '', talker_name: str = '', sender: str = '', sender_name: str = '',
+                 msg_type: int = 0, sub_type: int = 0, content: str = '',
+                 contents: Optional[Dict[str, Any]] = None):
+        self.seq = seq
+        self.time = time
+        self.timestamp = timestamp
+        self.datetime = datetime
+        self.talker = intern(talker)
+        self.talker_name = intern(talker_name)
+        self.sender = intern(sender)
+        self.sender_name = intern(sender_name)
+        self.msg_type = msg_type
+        self.sub_type = sub_type
+        self.content = content
+        self.contents = contents if contents is not None else {}
+
+
+class DiceThrow(Record):
+    """一次骰子投掷（只保留解析出的content值，不保留消息XML）"""
+    __slots__ = ('seq', 'date', 'time', 'timestamp', 'player_id', 'player_name',
+                 'content_value', 'dice_value')
+
+    def __init__(self, seq: int = 0, date: str = '', time: str = '', timestamp: int = 0,
+                 player_id: int = 0, player_name: str = '', content_value: str = '',
+                 dice_value: int = 0):
+        self.seq = seq
+        self.date = intern(date)
+        self.time = intern(time)
+        self.timestamp = timestamp
+        self.player_id = player_id
+        self.player_name = intern(player_name)
+        self.content_value = intern(content_value)
+        self.dice_value = dice_value
+
+
+class Game(Record):
+    """一局有效游戏（5颗骰子）"""
+    __slots__ = ('seq', 'player_id', 'player_name', 'date', 'start_time', 'end_time', 'timestamp',
+                 'dice_values', 'result_type', 'result_value', 'score_points')
+
+    def __init__(self, seq: int = 0, player_id: int = 0, player_name: str = '', date: str = '',
+                 start_time: str = '', end_time: str = '', timestamp: int = 0,
+                 dice_values: Tuple[int, ...] = (), result_type: str = '', result_value: int = 0,
+                 score_points: int = 0):
+        self.seq = seq
+        self.player_id = player_id
+        self.player_name = player_name
+        self.date = date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.timestamp = timestamp
+        self.dice_values = dice_values
+        self.result_type = result_type
+        self.result_value = result_value
+        self.score_points = score_points
+
+
+class Battle(Record):
+    """一轮对战（相邻两局不同玩家的游戏）"""
+    __slots__ = ('player1', 'player2', 'player1_id', 'player2_id', 'player1_seq', 'player2_seq',
+                 'winner_id', 'player1_result', 'player2_result', 'player1_points', 'player2_points',
+                 'winner', 'date')
+
+    def __init__(self, player1: str = '', player2: str = '', player1_id: int = 0, player2_id: int = 0,
+                 player1_seq: Optional[int] = None, player2_seq: Optional[int] = None,
+                 winner_id: Optional[int] = None, player1_result: str = '', player2_result: str = '',
+                 player1_points: int = 0, player2_points: int = 0, winner: str = 'draw',
+                 date: str = ''):
+        self.player1 = player1
+        self.player2 = player2
+        self.player1_id = player1_id
+        self.player2_id = player2_id
+        self.player1_seq = player1_seq
+        self.player2_seq = player2_seq
+        self.winner_id = winner_id
+        self.player1_result = player1_result
+        self.player2_result = player2_result
+        self.player1_points = player1_points
+        self.player2_points = player2_points
+        self.winner = winner
+        self.date = date
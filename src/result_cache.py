@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+分析结果缓存
+按(群聊, 时间范围, 数据内容摘要)缓存统计结果，LRU淘汰，并为每个条目生成ETag
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class LRUResultCache:
+    """线程安全的LRU结果缓存"""
+
+    def __init__(self, max_entries: int = 128):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多保留的条目数
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_etag(key: Hashable) -> str:
+        """由缓存键生成稳定的ETag（键包含数据内容摘要，数据变化即失效）"""
+        raw = json.dumps(key, ensure_ascii=False, default=str, sort_keys=True)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, Any]]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Tuple[str, Any]: (ETag, 结果)，未命中返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, value: Any) -> str:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            value: 结果
+
+        Returns:
+            str: 条目的ETag
+        """
+        etag = self.make_etag(key)
+        with self._lock:
+            self._entries[key] = (etag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[str, Any]:
+        """
+        命中则直接返回，否则计算后写入
+
+        Args:
+            key: 缓存键
+            compute: 未命中时调用的计算函数
+
+        Returns:
+            Tuple[str, Any]: (ETag, 结果)
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        value = compute()
+        return self.put(key, value), value
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
\ No newline at end of file
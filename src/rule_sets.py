@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+可配置的规则变体
+规则集（计分表、豹子定义、平分时的比较顺序）以声明方式配置，
+编译为覆盖全部6^5种有序手牌的查找表；评估时每局只需一次查表，
+多个规则集共用同一批游戏的手牌下标和对战配对
+"""
+import json
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from niu_niu_engine import NiuNiuEngine
+from niu_niu_analysis import RESULT_ORDER, calculate_score_points, is_battle_pair, BATTLE_WINDOW_SECONDS
+
+HAND_COUNT = 6 ** 5
+
+# 依次比较的项，越大越强：得分、结果等级、点数和、最大点数
+TIE_BREAKS = ('points', 'rank', 'dice_sum', 'max_die')
+
+# 比较结果(0平/1先手胜/-1后手胜) -> (先手, 后手)在统计行中的计数位置
+_OUTCOME_SLOTS = ((4, 4), (2, 3), (3, 2))
+
+
+def hand_index(dice: Sequence[int]) -> int:
+    """5颗骰子（按投掷顺序）在查找表中的下标"""
+    index = 0
+    for value in dice:
+        index = index * 6 + value - 1
+    return index
+
+
+def _all_hands() -> List[Tuple[int, ...]]:
+    """按下标顺序排列的全部有序手牌"""
+    hands = []
+    for index in range(HAND_COUNT):
+        dice, rest = [], index
+        for _ in range(5):
+            dice.append(rest % 6 + 1)
+            rest //= 6
+        hands.append(tuple(reversed(dice)))
+    return hands
+
+
+_BASE_RESULTS: Optional[List[str]] = None
+
+
+def _base_results() -> List[str]:
+    """不含豹子判定的牛牛结果（每手牌只计算一次，所有规则集共用）"""
+    global _BASE_RESULTS
+    if _BASE_RESULTS is None:
+        engine = NiuNiuEngine()
+        _BASE_RESULTS = [engine.calculate_niu_result(list(hand)).type for hand in _all_hands()]
+    return _BASE_RESULTS
+
+
+def default_scoring() -> Dict[str, int]:
+    """标准计分表（与calculate_score_points一致）"""
+    return {result_type: calculate_score_points(result_type, 0) for result_type in RESULT_ORDER}
+
+
+@dataclass
+class RuleSet:
+    """声明式规则集"""
+    name: str = 'standard'
+    scoring: Dict[str, int] = field(default_factory=default_scoring)  # 结果类型 -> 得分
+    baozi_min_same: int = 5                                           # 至少几颗相同算豹子，0为不设豹子
+    tie_break: List[str] = field(default_factory=lambda: ['points'])  # 依次比较，全部相同为平局
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RuleSet':
+        """
+        从配置创建规则集，未给出的计分项沿用标准计分
+
+        Args:
+            data: 规则集配置
+
+        Returns:
+            RuleSet: 规则集
+        """
+        rule_set = cls(
+            name=data['name'],
+            scoring={**default_scoring(), **data.get('scoring', {})},
+            baozi_min_same=data.get('baozi_min_same', 5),
+            tie_break=list(data.get('tie_break', ['points'])),
+        )
+        rule_set.validate()
+        return rule_set
+
+    def validate(self):
+        """检查配置是否合法"""
+        unknown = set(self.scoring) - set(RESULT_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown result types in scoring of '{self.name}': {sorted(unknown)}")
+        if self.baozi_min_same not in (0, 3, 4, 5):
+            raise ValueError(f"baozi_min_same must be 0, 3, 4 or 5 in '{self.name}'")
+        if not self.tie_break or any(item not in TIE_BREAKS for item in self.tie_break):
+            raise ValueError(f"tie_break of '{self.name}' must be a non-empty list of {TIE_BREAKS}")
+
+    def compile(self) -> 'CompiledRuleSet':
+        """编译为查找表"""
+        self.validate()
+        return CompiledRuleSet(self)
+
+
+class CompiledRuleSet:
+    """按手牌下标查表的规则集：结果类型、得分和比较强度"""
+
+    def __init__(self, rule_set: RuleSet):
+        """
+        编译规则集
+
+        Args:
+            rule_set: 声明式规则集
+        """
+        self.rule_set = rule_set
+        self.name = rule_set.name
+        self.result_types = array('b')  # RESULT_ORDER下标
+        self.points = array('i')
+        self.strength = array('q')      # 按tie_break顺序组合的比较值
+
+        min_points = min(rule_set.scoring.values())
+        points_base = max(rule_set.scoring.values()) - min_points + 1
+        bases = {'points': points_base, 'rank': len(RESULT_ORDER), 'dice_sum': 31, 'max_die': 7}
+        rank_of = {result_type: len(RESULT_ORDER) - 1 - i for i, result_type in enumerate(RESULT_ORDER)}
+
+        for hand, base_type in zip(_all_hands(), _base_results()):
+            result_type = base_type
+            if rule_set.baozi_min_same and max(Counter(hand).values()) >= rule_set.baozi_min_same:
+                result_type = '豹子'
+            points = rule_set.scoring[result_type]
+
+            values = {
+                'points': points - min_points,
+                'rank': rank_of[result_type],
+                'dice_sum': sum(hand),
+                'max_die': max(hand),
+            }
+            strength = 0
+            for item in rule_set.tie_break:
+                strength = strength * bases[item] + values[item]
+
+            self.result_types.append(RESULT_ORDER.index(result_type))
+            self.points.append(points)
+            self.strength.append(strength)
+
+    def result_type(self, dice: Sequence[int]) -> str:
+        """手牌在该规则集下的结果类型"""
+        return RESULT_ORDER[self.result_types[hand_index(dice)]]
+
+
+def load_rule_sets(path: str) -> List[RuleSet]:
+    """
+    从JSON文件加载规则集列表
+
+    Args:
+        path: JSON文件，内容为规则集配置的列表
+
+    Returns:
+        List[RuleSet]: 规则集
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    rule_sets = [RuleSet.from_dict(item) for item in data]
+    names = [rule_set.name for rule_set in rule_sets]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate rule-set names in {path}")
+    return rule_sets
+
+
+def evaluate_rule_sets(valid_games: List[Dict[str, Any]], compiled: List[CompiledRuleSet], labels: List[str],
+                       window_seconds: int = BATTLE_WINDOW_SECONDS) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    按多个规则集评估同一批游戏
+    手牌下标和对战配对与规则无关，只计算一次；之后每个规则集各遍历一次，每局/每场只做查表和比较
+
+    Args:
+        valid_games: 按开始时间排序的有效游戏
+        compiled: 编译后的规则集
+        labels: 玩家ID -> 显示名（PlayerRegistry.labels()，不使用游戏记录中可能过时的昵称）
+        window_seconds: 对战时间窗口（秒）
+
+    Returns:
+        Dict: 规则集名 -> 玩家 -> 统计（total_games, total_points, avg_points,
+              battles_won, battles_lost, battles_draw, win_rate）
+    """
+    hands = [hand_index(game.dice_values) for game in valid_games]
+    players = [game.player_id for game in valid_games]
+    pairs = [i for i in range(len(valid_games) - 1)
+             if is_battle_pair(valid_games[i], valid_games[i + 1], window_seconds)]
+
+    results = {}
+    for rules in compiled:
+        points_table, strength_table = rules.points, rules.strength
+        totals = {player: [0, 0, 0, 0, 0] for player in players}  # 局数, 得分, 胜, 负, 平
+
+        for player, hand in zip(players, hands):
+            row = totals[player]
+            row[0] += 1
+            row[1] += points_table[hand]
+
+        for i in pairs:
+            s1, s2 = strength_table[hands[i]], strength_table[hands[i + 1]]
+            slot1, slot2 = _OUTCOME_SLOTS[(s1 > s2) - (s1 < s2)]
+            totals[players[i]][slot1] += 1
+            totals[players[i + 1]][slot2] += 1
+
+        results[rules.name] = {
+            labels[player]: {
+                'total_games': games, 'total_points': points,
+                'avg_points': points / games if games else 0,
+                'battles_won': won, 'battles_lost': lost, 'battles_draw': draw,
+                'win_rate': won / (won + lost) * 100 if won + lost else 0,
+            }
+            for player, (games, points, won, lost, draw) in totals.items()
+        }
+    return results
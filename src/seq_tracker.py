@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+按seq去重和缺口检测
+每个群一个跟踪器：seq空间按64位分块，块号 -> 位图（只为出现过的块分配），
+判重和登记都是O(1)；连续的seq每条约占1位，稀疏时退化为每条一个字典项。
+获取的每一页/每个分片依次送入，重复的消息丢弃，结束后报告seq序列中的缺口
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+WORD_BITS = 64
+
+
+class SeqTracker:
+    """流式seq去重与缺口跟踪（由合并结果的单个线程调用）"""
+
+    def __init__(self):
+        """初始化空跟踪器"""
+        self.words: Dict[int, int] = {}
+        self.unique = 0
+        self.duplicates = 0
+        self.low: Optional[int] = None
+        self.high: Optional[int] = None
+        self._unsequenced: Set[Tuple[Any, Any, Any]] = set()
+
+    def add(self, seq: int) -> bool:
+        """
+        登记一个seq
+
+        Args:
+            seq: 消息序号
+
+        Returns:
+            bool: 首次出现返回True，重复返回False
+        """
+        word = seq >> 6
+        mask = 1 << (seq & (WORD_BITS - 1))
+        bits = self.words.get(word, 0)
+        if bits & mask:
+            self.duplicates += 1
+            return False
+        self.words[word] = bits | mask
+        self.unique += 1
+        if self.low is None or seq < self.low:
+            self.low = seq
+        if self.high is None or seq > self.high:
+            self.high = seq
+        return True
+
+    def __contains__(self, seq: int) -> bool:
+        return bool(self.words.get(seq >> 6, 0) & (1 << (seq & (WORD_BITS - 1))))
+
+    def filter(self, messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        丢弃已见过的消息（没有seq的消息按 时间+发送者+内容 判重）
+
+        Args:
+            messages: 一页或一个分片的消息
+
+        Returns:
+            List[Dict]: 首次出现的消息，保持原顺序
+        """
+        kept = []
+        for message in messages:
+            seq = message.get('seq', 0)
+            if seq:
+                if not self.add(seq):
+                    continue
+            else:
+                key = (message.get('time'), message.get('sender'), message.get('content'))
+                if key in self._unsequenced:
+                    self.duplicates += 1
+                    continue
+                self._unsequenced.add(key)
+            kept.append(message)
+        return kept
+
+    def gaps(self) -> List[Tuple[int, int]]:
+        """
+        seq序列中的缺口
+
+        Returns:
+            List[Tuple[int, int]]: 最小与最大seq之间缺失的闭区间，按seq排序
+        """
+        gaps = []
+        expected = self.low
+        for word in sorted(self.words):
+            bits = self.words[word]
+            base = word << 6
+            while bits:
+                lowest = bits & -bits
+                seq = base + lowest.bit_length() - 1
+                if seq > expected:
+                    gaps.append((expected, seq - 1))
+                expected = seq + 1
+                bits ^= lowest
+        return gaps
+
+    @property
+    def missing(self) -> int:
+        """最小与最大seq之间缺失的消息数"""
+        if self.low is None:
+            return 0
+        return self.high - self.low + 1 - self.unique
+
+    def describe(self, limit: int = 3) -> str:
+        """
+        一行摘要（用于打印）
+
+        Args:
+            limit: 最多列出的缺口数
+
+        Returns:
+            str: 如 "重复 2 条, seq缺口 1 处共 3 条 (101-103)"
+        """
+        text = f"重复 {self.duplicates} 条"
+        if not self.missing:
+            return text + ", seq连续"
+        gaps = self.gaps()
+        shown = ', '.join(str(a) if a == b else f'{a}-{b}' for a, b in gaps[:limit])
+        more = ', ...' if len(gaps) > limit else ''
+        return text + f", seq缺口 {len(gaps)} 处共 {self.missing} 条 ({shown}{more})"
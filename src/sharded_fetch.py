@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+按时间分片并行获取
+把任意时间参数（季度、半年、年、自定义范围等）拆成按天或按周的分片，
+各分片用有限的并发数同时分页获取，完成一个即按seq（SeqTracker）去重合并；
+已完整结束的分片写入分片缓存，重新运行时直接跳过
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from checkpoint import atomic_open
+from niu_niu_analysis import time_range_bounds
+from records import json_default
+from seq_tracker import SeqTracker
+
+SHARD_UNITS = ('day', 'week')
+DEFAULT_FETCH_WORKERS = 4
+
+
+def plan_shards(time_param: str, unit: str = 'week') -> List[Tuple[str, date, date]]:
+    """
+    把时间参数拆成按天或按自然周（周一至周日，首尾按范围截断）的分片
+
+    Args:
+        time_param: parse_time_range支持的任意时间参数
+        unit: 'day' 或 'week'
+
+    Returns:
+        List[Tuple]: (分片时间参数, 起始日期, 结束日期)，分片时间参数为单日或自定义范围格式
+    """
+    if unit not in SHARD_UNITS:
+        raise ValueError(f"Shard unit must be one of {SHARD_UNITS}")
+    start, end = time_range_bounds(time_param)
+
+    shards = []
+    current = start
+    while current <= end:
+        if unit == 'day':
+            shard_end = current
+        else:
+            shard_end = min(end, current + timedelta(days=6 - current.weekday()))
+        if shard_end == current:
+            shards.append((current.isoformat(), current, shard_end))
+        else:
+            shards.append((f'{current.isoformat()},{shard_end.isoformat()}', current, shard_end))
+        current = shard_end + timedelta(days=1)
+    return shards
+
+
+def merge_messages(batches: List[List[Dict[str, Any]]],
+                   tracker: Optional[SeqTracker] = None) -> List[Dict[str, Any]]:
+    """
+    合并各分片的消息，按seq去重（分片边界重叠或重复获取时只保留一条）并排序
+
+    Args:
+        batches: 各分片的消息
+        tracker: seq跟踪器（用于之后报告重复和缺口），默认新建
+
+    Returns:
+        List[Dict]: 按seq排序的消息
+    """
+    tracker = tracker if tracker is not None else SeqTracker()
+    merged = []
+    for messages in batches:
+        merged.extend(tracker.filter(messages))
+    merged.sort(key=lambda m: m.get('seq', 0))
+    return merged
+
+
+class ShardCache:
+    """已完整结束的分片的本地缓存（每个群一个目录，每个分片一个JSON文件）"""
+
+    def __init__(self, cache_dir: str, group: str):
+        """
+        初始化
+
+        Args:
+            cache_dir: 分片缓存根目录
+            group: 群聊ID
+        """
+        self.directory = os.path.join(cache_dir, hashlib.sha1(group.encode('utf-8')).hexdigest()[:12])
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, shard: str) -> str:
+        return os.path.join(self.directory, shard.replace(',', '_to_') + '.json')
+
+    def get(self, shard: str) -> Optional[List[Dict[str, Any]]]:
+        """读取分片，未缓存时返回None"""
+        path = self._path(shard)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, shard: str, messages: List[Dict[str, Any]]):
+        """写入分片"""
+        with atomic_open(self._path(shard), 'w', encoding='utf-8') as f:
+            json.dump(messages, f, ensure_ascii=False, default=json_default)
+
+
+def fetch_sharded(fetch_pages: Callable[[str], Iterator[List[Dict[str, Any]]]], time_param: str,
+                  unit: str = 'week', workers: int = DEFAULT_FETCH_WORKERS,
+                  cache: Optional[ShardCache] = None,
+                  today: Optional[date] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    并行获取所有分片
+
+    Args:
+        fetch_pages: 分片时间参数 -> 分页消息迭代器（请求失败时应抛出异常）
+        time_param: 时间参数
+        unit: 分片单位
+        workers: 同时获取的分片数
+        cache: 分片缓存，None为不缓存
+        today: 当前日期（结束日期早于今天的分片才写入缓存，默认今天）
+
+    Returns:
+        Tuple: (按seq合并去重后的消息, 统计: shards/cached/fetched/failed/tracker)
+    """
+    today = today or date.today()
+    shards = plan_shards(time_param, unit)
+    tracker = SeqTracker()
+    merged: List[Dict[str, Any]] = []
+    summary = {'shards': len(shards), 'cached': 0, 'fetched': 0, 'failed': [], 'tracker': tracker}
+
+    pending = []
+    for shard, _, shard_end in shards:
+        cached = cache.get(shard) if cache is not None else None
+        if cached is not None:
+            merged.extend(tracker.filter(cached))
+            summary['cached'] += 1
+        else:
+            pending.append((shard, shard_end))
+
+    def fetch(shard: str) -> List[Dict[str, Any]]:
+        messages = []
+        for page in fetch_pages(shard):
+            messages.extend(page)
+        return messages
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='shard') as pool:
+            futures = {pool.submit(fetch, shard): (shard, shard_end) for shard, shard_end in pending}
+            for future in as_completed(futures):
+                shard, shard_end = futures[future]
+                try:
+                    messages = future.result()
+                except Exception as e:
+                    print(f"  ❌ 分片 {shard} 获取失败: {e}")
+                    summary['failed'].append(shard)
+                    continue
+                # 每个分片完成时即去重合并，内存中不保留重复消息
+                merged.extend(tracker.filter(messages))
+                summary['fetched'] += 1
+                # 仍可能有新消息的分片（含今天）不缓存
+                if cache is not None and shard_end < today:
+                    cache.put(shard, messages)
+                print(f"  📦 分片 {shard}: {len(messages)}条消息")
+
+    merged.sort(key=lambda m: m.get('seq', 0))
+    return merged, summary
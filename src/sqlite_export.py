@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+本地SQLite分析库导出
+把骰子、游戏和对战按批写入一个跨时间段累积的SQLite数据库，
+每批一个事务内executemany；按 (群, seq) 幂等更新，重复导出同一时间段不会产生重复行。
+建有 (群, 玩家, 时间戳) 和 (群, 日期) 索引，跨时间段的问题可以直接用SQL回答
+"""
+import sqlite3
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from player_registry import PlayerRegistry
+from records import DiceThrow, Game, Battle
+
+BATCH_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dice (
+    group_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    time TEXT,
+    timestamp INTEGER,
+    player_key TEXT,
+    player_name TEXT,
+    content_value TEXT,
+    dice_value INTEGER,
+    PRIMARY KEY (group_id, seq)
+);
+CREATE INDEX IF NOT EXISTS dice_player_time ON dice (group_id, player_key, timestamp);
+CREATE INDEX IF NOT EXISTS dice_date ON dice (group_id, date);
+
+CREATE TABLE IF NOT EXISTS games (
+    group_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    timestamp INTEGER,
+    player_key TEXT,
+    player_name TEXT,
+    dice_values TEXT,
+    result_type TEXT,
+    result_value INTEGER,
+    score_points INTEGER,
+    PRIMARY KEY (group_id, seq)
+);
+CREATE INDEX IF NOT EXISTS games_player_time ON games (group_id, player_key, timestamp);
+CREATE INDEX IF NOT EXISTS games_date ON games (group_id, date);
+
+CREATE TABLE IF NOT EXISTS battles (
+    group_id TEXT NOT NULL,
+    player1_seq INTEGER NOT NULL,
+    player2_seq INTEGER,
+    date TEXT,
+    player1_key TEXT,
+    player2_key TEXT,
+    winner_key TEXT,
+    player1 TEXT,
+    player2 TEXT,
+    winner TEXT,
+    player1_result TEXT,
+    player2_result TEXT,
+    player1_points INTEGER,
+    player2_points INTEGER,
+    PRIMARY KEY (group_id, player1_seq)
+);
+CREATE INDEX IF NOT EXISTS battles_player1 ON battles (group_id, player1_key, date);
+CREATE INDEX IF NOT EXISTS battles_player2 ON battles (group_id, player2_key, date);
+CREATE INDEX IF NOT EXISTS battles_date ON battles (group_id, date);
+
+CREATE TABLE IF NOT EXISTS players (
+    group_id TEXT NOT NULL,
+    player_key TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (group_id, player_key)
+);
+"""
+
+
+def _upsert_sql(table: str, columns: Sequence[str], key: Sequence[str]) -> str:
+    """INSERT ... ON CONFLICT(主键) DO UPDATE 语句"""
+    updates = ', '.join(f'{c} = excluded.{c}' for c in columns if c not in key)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}")
+
+
+DICE_COLUMNS = ('group_id', 'seq', 'date', 'time', 'timestamp', 'player_key', 'player_name',
+                'content_value', 'dice_value')
+GAME_COLUMNS = ('group_id', 'seq', 'date', 'start_time', 'end_time', 'timestamp', 'player_key',
+                'player_name', 'dice_values', 'result_type', 'result_value', 'score_points')
+BATTLE_COLUMNS = ('group_id', 'player1_seq', 'player2_seq', 'date', 'player1_key', 'player2_key',
+                  'winner_key', 'player1', 'player2', 'winner', 'player1_result', 'player2_result',
+                  'player1_points', 'player2_points')
+
+DICE_SQL = _upsert_sql('dice', DICE_COLUMNS, ('group_id', 'seq'))
+GAME_SQL = _upsert_sql('games', GAME_COLUMNS, ('group_id', 'seq'))
+BATTLE_SQL = _upsert_sql('battles', BATTLE_COLUMNS, ('group_id', 'player1_seq'))
+PLAYER_SQL = _upsert_sql('players', ('group_id', 'player_key', 'name'), ('group_id', 'player_key'))
+
+
+class SqliteExport:
+    """一个群的分析结果导出器（可在分块分析中逐块调用）"""
+
+    def __init__(self, db_path: str, group: str, batch_rows: int = BATCH_ROWS):
+        """
+        打开（或创建）数据库
+
+        Args:
+            db_path: SQLite数据库文件
+            group: 群聊ID（所有表的第一列，同一个库可存多个群）
+            batch_rows: 每个事务写入的行数
+        """
+        self.group = group
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def _write(self, sql: str, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """按批执行executemany，每批一个事务"""
+        count = 0
+        batch: List[Tuple[Any, ...]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                with self.conn:
+                    self.conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with self.conn:
+                self.conn.executemany(sql, batch)
+            count += len(batch)
+        self.rows += count
+        return count
+
+    def write_dice(self, dice_records: List[DiceThrow], registry: PlayerRegistry) -> int:
+        """写入骰子记录，返回行数"""
+        key = registry.key
+        return self._write(DICE_SQL, (
+            (self.group, r.seq, r.date, r.time, r.timestamp, key(r.player_id),
+             r.player_name, str(r.content_value), r.dice_value)
+            for r in dice_records))
+
+    def write_games(self, games: List[Game], registry: PlayerRegistry) -> int:
+        """写入游戏，返回行数"""
+        key = registry.key
+        return self._write(GAME_SQL, (
+            (self.group, g.seq, g.date, g.start_time, g.end_time, g.timestamp,
+             key(g.player_id), g.player_name, ','.join(map(str, g.dice_values)),
+             g.result_type, g.result_value, g.score_points)
+            for g in games))
+
+    def write_battles(self, battles: List[Battle], registry: PlayerRegistry) -> int:
+        """写入对战，返回行数"""
+        key = registry.key
+        return self._write(BATTLE_SQL, (
+            (self.group, b.player1_seq, b.player2_seq, b.date, key(b.player1_id),
+             key(b.player2_id), None if b.winner_id is None else key(b.winner_id),
+             b.player1, b.player2, b.winner, b.player1_result, b.player2_result,
+             b.player1_points, b.player2_points)
+            for b in battles))
+
+    def write_players(self, registry: PlayerRegistry) -> int:
+        """写入玩家的发送者ID和当前显示名"""
+        return self._write(PLAYER_SQL, (
+            (self.group, player_key, name)
+            for player_key, name in zip(registry.keys(), registry.labels())))
+
+    def close(self):
+        """关闭数据库"""
+        self.conn.close()
+
+    def __enter__(self) -> 'SqliteExport':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_analysis(db_path: str, group: str, dice_records: List[DiceThrow],
+                    valid_games: List[Game], battles: List[Battle],
+                    registry: PlayerRegistry, batch_rows: Optional[int] = None) -> int:
+    """
+    导出一次分析的全部结果
+
+    Args:
+        db_path: SQLite数据库文件
+        group: 群聊ID
+        dice_records: 骰子记录
+        valid_games: 有效游戏
+        battles: 对战记录
+        registry: 玩家注册表
+        batch_rows: 每个事务写入的行数
+
+    Returns:
+        int: 写入（含更新）的行数
+    """
+    with SqliteExport(db_path, group, batch_rows or BATCH_ROWS) as export:
+        export.write_dice(dice_records, registry)
+        export.write_games(valid_games, registry)
+        export.write_battles(battles, registry)
+        export.write_players(registry)
+        return export.rows
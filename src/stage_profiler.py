@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+分阶段性能计时
+记录每个处理阶段的耗时、处理条数、吞吐量和内存，
+输出汇总表和JSON，并可对单个阶段生成cProfile数据。
+
+内存取自ru_maxrss，是整个进程的常驻内存高水位，不是某个阶段独占的峰值：
+每个阶段记录结束时的进程高水位（rss_high_water_mb）和阶段内高水位的增长（rss_growth_mb）。
+流水线模式下获取线程和分析线程会同时记录阶段，累加在锁内进行；
+并行阶段的内存增长会同时计入两个阶段
+"""
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程常驻内存高水位（MB，进程启动以来的最大值），平台不支持时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS单位为字节
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class StageTimer:
+    """单次阶段计时，可在阶段内累加处理条数"""
+
+    __slots__ = ('items',)
+
+    def __init__(self, items: int = 0):
+        self.items = items
+
+    def add(self, count: int = 1):
+        """累加处理条数"""
+        self.items += count
+
+
+class StageProfiler:
+    """分阶段计时器（可在多个线程中同时记录）"""
+
+    def __init__(self, enabled: bool = True, cprofile_stage: Optional[str] = None):
+        """
+        初始化计时器
+
+        Args:
+            enabled: 是否启用（关闭时stage()几乎没有开销）
+            cprofile_stage: 需要生成cProfile数据的阶段名（cProfile只记录进入该阶段的线程）
+        """
+        self.enabled = enabled
+        self.cprofile_stage = cprofile_stage
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._profile = None  # cProfile.Profile，仅在指定阶段时创建
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0) -> Iterator[StageTimer]:
+        """
+        记录一个阶段，同名阶段多次调用会累加（例如每页的获取）
+
+        Args:
+            name: 阶段名
+            items: 已知的处理条数，也可在阶段内通过timer.add()累加
+
+        Yields:
+            StageTimer: 阶段计时对象
+        """
+        timer = StageTimer(items)
+        if not self.enabled:
+            yield timer
+            return
+
+        profiling = name == self.cprofile_stage
+        if profiling:
+            if self._profile is None:
+                import cProfile
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiling:
+                self._profile.disable()
+            self.record(name, elapsed, timer.items, rss_before)
+
+    def record(self, name: str, seconds: float, items: int = 0, rss_before: Optional[float] = None):
+        """
+        直接记录一次阶段耗时
+
+        Args:
+            name: 阶段名
+            seconds: 耗时（秒）
+            items: 处理条数
+            rss_before: 阶段开始时的进程内存高水位（MB），用于计算阶段内的增长
+        """
+        if not self.enabled:
+            return
+        rss = peak_rss_mb()
+        with self._lock:
+            entry = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'items': 0,
+                                                  'rss_high_water_mb': None, 'rss_growth_mb': None})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['items'] += items
+            entry['rss_high_water_mb'] = rss
+            if rss is not None and rss_before is not None:
+                entry['rss_growth_mb'] = (entry['rss_growth_mb'] or 0.0) + rss - rss_before
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可JSON序列化的计时结果"""
+        stages = {}
+        with self._lock:
+            entries = [(name, dict(entry)) for name, entry in self.stages.items()]
+        for name, entry in entries:
+            seconds = entry['seconds']
+            stages[name] = {
+                **entry,
+                'seconds': round(seconds, 6),
+                'items_per_sec': round(entry['items'] / seconds, 1) if seconds > 0 and entry['items'] else None,
+            }
+        return {
+            'total_seconds': round(time.perf_counter() - self._started, 6),
+            'rss_high_water_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+    def print_summary(self):
+        """打印阶段汇总表"""
+        if not self.enabled:
+            return
+        data = self.to_dict()
+        print(f'\n⏱️  阶段性能统计 (总耗时 {data["total_seconds"]:.3f}s)')
+        print('=' * 100)
+        print(f'{"阶段":20} {"次数":>6} {"耗时(s)":>10} {"条数":>12} {"条/秒":>14} {"内存高水位(MB)":>14} {"增长(MB)":>10}')
+        print('-' * 100)
+        for name, entry in data['stages'].items():
+            rate = f"{entry['items_per_sec']:,.0f}" if entry['items_per_sec'] else '-'
+            rss = f"{entry['rss_high_water_mb']:.1f}" if entry['rss_high_water_mb'] is not None else '-'
+            growth = f"{entry['rss_growth_mb']:.1f}" if entry['rss_growth_mb'] is not None else '-'
+            print(f'{name:20} {entry["calls"]:6d} {entry["seconds"]:10.3f} {entry["items"]:12,d} {rate:>14} {rss:>14} '
+                  f'{growth:>10}')
+
+    def write_json(self, path: str):
+        """写出机器可读的计时结果"""
+        if not self.enabled:
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def dump_cprofile(self, path: str) -> bool:
+        """
+        写出cProfile数据（可用snakeviz或pstats查看）
+
+        Returns:
+            bool: 是否有数据写出
+        """
+        if self._profile is None:
+            return False
+        self._profile.dump_stats(path)
+        return True
+
+
+# 未启用计时时使用的共享实例
+NULL_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+牛牛统计HTTP服务
+基于本地原始消息归档（raw_messages_*.json）为任意(群聊, 时间范围)提供
+玩家统计、排行榜、对战组合和结果分布，结果按群聊数据的内容摘要缓存并支持ETag/304
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from niu_niu_analysis import (
+    analyze_messages, time_range_bounds, rank_players, best_result, head_to_head, RESULT_ORDER
+)
+from result_cache import LRUResultCache
+
+
+class MessageStore:
+    """原始消息归档仓库，按群聊合并并按seq去重"""
+
+    def __init__(self, data_dir: str, pattern: str = 'raw_messages_*.json'):
+        """
+        初始化仓库
+
+        Args:
+            data_dir: 原始消息归档所在目录
+            pattern: 归档文件名匹配模式
+        """
+        self.data_dir = data_dir
+        self.pattern = pattern
+        self._signature: Optional[Tuple] = None
+        self._messages: Dict[str, List[Dict[str, Any]]] = {}
+        self._high_water: Dict[str, int] = {}
+        self._digests: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _current_signature(self) -> Tuple:
+        """归档文件集合及其修改时间，用于判断是否需要重新加载"""
+        paths = sorted(glob.glob(os.path.join(self.data_dir, self.pattern)))
+        signature = []
+        for path in paths:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def refresh(self) -> bool:
+        """
+        归档文件有变化时重新加载
+
+        Returns:
+            bool: 是否重新加载了数据
+        """
+        signature = self._current_signature()
+        with self._lock:
+            if signature == self._signature:
+                return False
+
+            by_group = defaultdict(dict)
+            for path, _, _ in signature:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        messages = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"❌ 跳过无法解析的归档 {path}: {e}")
+                    continue
+                for msg in messages:
+                    by_group[msg.get('talker', '')][msg.get('seq', 0)] = msg
+
+            self._messages = {
+                group: [seq_map[seq] for seq in sorted(seq_map)]
+                for group, seq_map in by_group.items()
+            }
+            self._high_water = {
+                group: (messages[-1].get('seq', 0) if messages else 0)
+                for group, messages in self._messages.items()
+            }
+            # 改写较早时段的归档不会改变高水位，缓存键需要反映内容本身
+            self._digests = {group: content_digest(messages) for group, messages in self._messages.items()}
+            self._signature = signature
+            return True
+
+    def groups(self) -> List[str]:
+        """已加载的群聊列表"""
+        return sorted(self._messages)
+
+    def high_water_mark(self, group: str) -> int:
+        """群聊已加载数据的最大seq"""
+        return self._high_water.get(group, 0)
+
+    def data_version(self, group: str) -> str:
+        """群聊已加载数据的内容摘要（任一消息变化都会改变）"""
+        return self._digests.get(group, '')
+
+    def messages_in_range(self, group: str, start: str, end: str) -> List[Dict[str, Any]]:
+        """
+        取出群聊在日期闭区间内的消息
+
+        Args:
+            group: 群聊ID
+            start: 起始日期（YYYY-MM-DD）
+            end: 结束日期（YYYY-MM-DD）
+
+        Returns:
+            List[Dict]: 按seq排序的消息
+        """
+        return [msg for msg in self._messages.get(group, [])
+                if start <= msg.get('time', '')[:10] <= end]
+
+
+class StatsService:
+    """带缓存的统计查询服务"""
+
+    def __init__(self, store: MessageStore, cache_size: int = 128):
+        """
+        初始化服务
+
+        Args:
+            store: 原始消息仓库
+            cache_size: 结果缓存条目上限
+        """
+        self.store = store
+        self.cache = LRUResultCache(max_entries=cache_size)
+
+    def query(self, group: str, time_param: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        查询某群聊某时间范围的统计汇总
+
+        Args:
+            group: 群聊ID
+            time_param: 时间参数（与命令行--time相同）
+
+        Returns:
+            Tuple[str, Dict]: (ETag, 统计汇总)
+        """
+        self.store.refresh()
+        start, end = time_range_bounds(time_param)
+        key = (group, start.isoformat(), end.isoformat(), self.store.data_version(group))
+
+        def compute():
+            messages = self.store.messages_in_range(group, key[1], key[2])
+            return summarize(messages, time_param)
+
+        return self.cache.get_or_compute(key, compute)
+
+
+def content_digest(messages: List[Dict[str, Any]]) -> str:
+    """
+    按seq排序的消息列表的摘要
+
+    Args:
+        messages: 一个群聊的全部消息
+
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha1()
+    for msg in messages:
+        digest.update(json.dumps(msg, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def summarize(messages: List[Dict[str, Any]], time_param: str) -> Dict[str, Any]:
+    """
+    分析消息并生成可JSON序列化的统计汇总
+
+    Args:
+        messages: 原始消息列表
+        time_param: 时间参数
+
+    Returns:
+        Dict: 玩家统计、排行榜、对战组合和结果分布
+    """
+    result = analyze_messages(messages)
+    sorted_players = rank_players(result.player_stats)
+
+    players = []
+    for player, stats in sorted_players:
+        players.append({
+            'player_name': player,
+            'total_games': stats['total_games'],
+            'total_points': stats['total_points'],
+            'avg_points': round(stats['avg_points'], 2),
+            'win_rate': round(stats['win_rate'], 1),
+            'battles_won': stats['battles_won'],
+            'battles_lost': stats['battles_lost'],
+            'battles_draw': stats['battles_draw'],
+            'result_counts': dict(stats['result_counts']),
+            'best_result': best_result(stats['result_counts'])
+        })
+
+    qualified = [p for p in players if p['battles_won'] + p['battles_lost'] >= 5]
+    rankings = {
+        'avg_points': [p['player_name'] for p in players if p['total_games'] >= 10],
+        'win_rate': [p['player_name'] for p in sorted(qualified, key=lambda p: p['win_rate'], reverse=True)],
+        'activity': [p['player_name'] for p in sorted(players, key=lambda p: p['total_games'], reverse=True)],
+        'niu_niu': [p['player_name'] for p in sorted(players, key=lambda p: p['result_counts'].get('牛牛', 0), reverse=True)
+                    if p['result_counts'].get('牛牛', 0) > 0],
+        'baozi': [p['player_name'] for p in sorted(players, key=lambda p: p['result_counts'].get('豹子', 0), reverse=True)
+                  if p['result_counts'].get('豹子', 0) > 0],
+    }
+
+    all_results = Counter(game.result_type for game in result.valid_games)
+    daily_games = Counter(game.date for game in result.valid_games if game.date)
+
+    return {
+        'time': time_param,
+        'overview': {
+            'messages': len(messages),
+            'dice': len(result.dice_records),
+            'games': len(result.valid_games),
+            'battles': len(result.battles),
+        },
+        'players': players,
+        'rankings': rankings,
+        'head_to_head': [
+            {'pair': pair, 'battles': count, **results}
+            for pair, count, results in head_to_head(result.battles)
+        ],
+        'distribution': {
+            'results': {result_type: all_results[result_type] for result_type in RESULT_ORDER
+                        if result_type in all_results},
+            'daily_games': dict(sorted(daily_games.items())),
+        },
+    }
+
+
+def create_app(service: StatsService, default_group: str = ''):
+    """
+    创建Flask应用
+
+    Args:
+        service: 统计查询服务
+        default_group: 未指定group参数时使用的群聊ID
+
+    Returns:
+        Flask: 应用实例
+    """
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+
+    def cached_response(section: Optional[str] = None, player: Optional[str] = None):
+        group = request.args.get('group', default_group)
+        time_param = request.args.get('time')
+        if not time_param:
+            return jsonify({'error': 'missing time parameter'}), 400
+
+        try:
+            etag, summary = service.query(group, time_param)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if player is not None:
+            etag = f"{etag}-{player}"
+        if request.if_none_match.contains(etag):
+            return '', 304
+
+        if player is not None:
+            body = next((p for p in summary['players'] if p['player_name'] == player), None)
+            if body is None:
+                return jsonify({'error': f'player not found: {player}'}), 404
+        elif section is not None:
+            body = {'time': summary['time'], section: summary[section]}
+        else:
+            body = summary
+
+        response = jsonify(body)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @app.get('/api/v1/summary')
+    def summary():
+        return cached_response()
+
+    @app.get('/api/v1/players')
+    def players():
+        return cached_response('players')
+
+    @app.get('/api/v1/players/<path:player>')
+    def player_stats(player):
+        return cached_response(player=player)
+
+    @app.get('/api/v1/rankings')
+    def rankings():
+        return cached_response('rankings')
+
+    @app.get('/api/v1/head-to-head')
+    def head_to_head_pairs():
+        return cached_response('head_to_head')
+
+    @app.get('/api/v1/distribution')
+    def distribution():
+        return cached_response('distribution')
+
+    @app.get('/api/v1/groups')
+    def groups():
+        service.store.refresh()
+        return jsonify({group: service.store.high_water_mark(group) for group in service.store.groups()})
+
+    @app.get('/api/v1/cache')
+    def cache_stats():
+        return jsonify(service.cache.stats())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Niu Niu Stats HTTP Service")
+    parser.add_argument("--data-dir", default=".", help="Directory containing raw_messages_*.json archives")
+    parser.add_argument("--group", default="21998085218@chatroom", help="Default group chat ID")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=5031, help="Bind port")
+    parser.add_argument("--cache-size", type=int, default=128, help="Max cached (group, range) results")
+
+    args = parser.parse_args()
+
+    store = MessageStore(args.data_dir)
+    store.refresh()
+    print(f'🌐 Niu Niu Stats Service')
+    print(f'📁 Data: {args.data_dir} ({len(store.groups())} groups)')
+    print(f'🔗 http://{args.host}:{args.port}/api/v1/summary?time=2025-06')
+
+    app = create_app(StatsService(store, cache_size=args.cache_size), default_group=args.group)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
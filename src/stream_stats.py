@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+单遍流式统计累加器
+计数、求和、最小/最大值、Welford均值和方差、直方图和top-k堆都在一次遍历中更新；
+累加器可以合并（分块、分片各自累加后汇总），报告的各个部分都从同一次扫描的结果读取
+"""
+import heapq
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from records import Game
+
+
+class RunningStats:
+    """数值序列的计数、和、最值、均值和方差（Welford）"""
+    __slots__ = ('count', 'total', 'min', 'max', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        """加入一个值"""
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: 'RunningStats'):
+        """合并另一段数据的统计（Chan等人的并行方差公式）"""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.total, self.min, self.max = other.count, other.total, other.min, other.max
+            self.mean, self.m2 = other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """总体方差"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stdev(self) -> float:
+        """总体标准差"""
+        return math.sqrt(self.variance)
+
+
+class TopK:
+    """保留键最大的k项（k为None时保留全部）；键相同时先加入的排在前面，与稳定排序一致"""
+    __slots__ = ('k', 'heap', 'pushed')
+
+    def __init__(self, k: Optional[int] = None):
+        self.k = k
+        self.heap: List[Tuple[Any, int, Any]] = []
+        self.pushed = 0
+
+    def push(self, key: Any, item: Any):
+        """加入一项"""
+        entry = (key, -self.pushed, item)
+        self.pushed += 1
+        if self.k is None or len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def merge(self, other: 'TopK'):
+        """合并另一个TopK（other的项视为在本对象所有项之后加入）"""
+        offset = self.pushed
+        for key, order, item in other.heap:
+            entry = (key, order - offset, item)
+            if self.k is None or len(self.heap) < self.k:
+                heapq.heappush(self.heap, entry)
+            elif entry[:2] > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, entry)
+        self.pushed += other.pushed
+
+    def items(self) -> List[Any]:
+        """按键从大到小的项"""
+        return [item for _, _, item in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class StreamAccumulator:
+    """按名字管理的一组RunningStats、直方图、top-k和收集列表，可整体合并"""
+
+    def __init__(self):
+        self.stats: Dict[str, RunningStats] = {}
+        self.hists: Dict[str, Counter] = {}
+        self.tops: Dict[str, TopK] = {}
+        self.lists: Dict[str, List[Any]] = {}
+
+    def stat(self, name: str) -> RunningStats:
+        """名为name的数值统计（不存在时创建）"""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = RunningStats()
+        return stats
+
+    def hist(self, name: str) -> Counter:
+        """名为name的直方图（不存在时创建）"""
+        hist = self.hists.get(name)
+        if hist is None:
+            hist = self.hists[name] = Counter()
+        return hist
+
+    def top(self, name: str, k: Optional[int] = None) -> TopK:
+        """名为name的top-k（不存在时按k创建）"""
+        top = self.tops.get(name)
+        if top is None:
+            top = self.tops[name] = TopK(k)
+        return top
+
+    def collect(self, name: str) -> List[Any]:
+        """名为name的按加入顺序收集的列表（不存在时创建）"""
+        items = self.lists.get(name)
+        if items is None:
+            items = self.lists[name] = []
+        return items
+
+    def merge(self, other: 'StreamAccumulator') -> 'StreamAccumulator':
+        """合并另一个累加器（如另一个分块或分片），返回self"""
+        for name, stats in other.stats.items():
+            self.stat(name).merge(stats)
+        for name, hist in other.hists.items():
+            self.hist(name).update(hist)
+        for name, top in other.tops.items():
+            self.top(name, top.k).merge(top)
+        for name, items in other.lists.items():
+            self.collect(name).extend(items)
+        return self
+
+
+def summarize_games(games: Iterable[Game], accumulator: Optional[StreamAccumulator] = None
+                    ) -> StreamAccumulator:
+    """
+    一次遍历游戏，累加结果分布、每日局数和得分统计
+
+    Args:
+        games: 游戏
+        accumulator: 累加到已有的累加器（默认新建）
+
+    Returns:
+        StreamAccumulator: hist('result_type')、hist('date')、stat('score_points')
+    """
+    acc = accumulator if accumulator is not None else StreamAccumulator()
+    results, days, points = acc.hist('result_type'), acc.hist('date'), acc.stat('score_points')
+    for game in games:
+        results[game.result_type] += 1
+        if game.date:
+            days[game.date] += 1
+        points.add(game.score_points)
+    return acc
+
+
+def summarize_players(sorted_players: List[Tuple[str, Dict[str, Any]]],
+                      min_battles: int = 5, min_games: int = 10, top_n: int = 3) -> StreamAccumulator:
+    """
+    一次遍历排序后的玩家统计，得到报告的各个排行榜
+
+    Args:
+        sorted_players: rank_players的结果（平均得分从高到低）
+        min_battles: 参与胜率排行的最少对战数
+        min_games: 参与平均得分排行的最少局数
+        top_n: 牛牛排行榜长度
+
+    Returns:
+        StreamAccumulator: top('highest_win_rate'/'lowest_win_rate'/'avg_points'/'longest_win_streak')取第一名，
+        top('niu_niu')前top_n名，top('baozi')和top('activity')全部，collect('hot')/collect('cold')
+    """
+    acc = StreamAccumulator()
+    highest, lowest = acc.top('highest_win_rate', 1), acc.top('lowest_win_rate', 1)
+    best_avg, streak = acc.top('avg_points', 1), acc.top('longest_win_streak', 1)
+    niu_niu, baozi, activity = acc.top('niu_niu', top_n), acc.top('baozi'), acc.top('activity')
+    forms = {'hot': acc.collect('hot'), 'cold': acc.collect('cold')}
+    for entry in sorted_players:
+        player, stats = entry
+        if stats['battles_won'] + stats['battles_lost'] >= min_battles:
+            highest.push(stats['win_rate'], entry)
+            lowest.push(-stats['win_rate'], entry)
+        if stats['total_games'] >= min_games:
+            best_avg.push(stats['avg_points'], entry)
+        counts = stats['result_counts']
+        if counts['牛牛'] > 0:
+            niu_niu.push(counts['牛牛'], entry)
+        if counts['豹子'] > 0:
+            baozi.push(counts['豹子'], entry)
+        activity.push(stats['total_games'], entry)
+        streak.push(stats.get('longest_win_streak', 0), entry)
+        form = forms.get(stats.get('form'))
+        if form is not None:
+            form.append(player)
+    return acc
+
+
+def first(accumulator: StreamAccumulator, name: str) -> Optional[Any]:
+    """top-k的第一名（没有时为None）"""
+    items = accumulator.top(name).items()
+    return items[0] if items else None
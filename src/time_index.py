@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+玩家按日累计索引（前缀和）
+每个玩家按日期保存累计的游戏数、得分、胜负平和各结果类型次数，
+任意日期范围的统计只需两次查找和一次相减，无需重新扫描历史数据。
+玩家以发送者ID为键，改名后历史不拆分，显示名只在查询时解析；
+每对玩家的胜负平按同样的方式保存（PairTimeIndex）
+"""
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from checkpoint import atomic_open
+from niu_niu_analysis import RESULT_ORDER, finalize_player_stats
+from records import Battle
+
+
+# 每行的字段顺序（所有玩家共用），结果类型计数紧跟在基础字段之后
+BASE_FIELDS = ('games', 'points', 'wins', 'losses', 'draws')
+INDEX_FIELDS = BASE_FIELDS + tuple(RESULT_ORDER)
+STRIDE = len(INDEX_FIELDS)
+RESULT_OFFSET = len(BASE_FIELDS)
+
+# 玩家对的字段（以发送者ID排序靠前的玩家为视角）
+PAIR_FIELDS = ('wins', 'losses', 'draws')
+
+
+class _PlayerSeries:
+    """单个玩家（或玩家对）的日期列表和扁平化的累计数组（每天stride个int64）"""
+
+    __slots__ = ('days', 'cum', 'stride')
+
+    def __init__(self, stride: int = STRIDE):
+        self.days: List[str] = []
+        self.cum = array('q')
+        self.stride = stride
+
+    def row(self, index: int) -> array:
+        """第index天的累计行，index为-1时返回全零行"""
+        if index < 0:
+            return array('q', bytes(8 * self.stride))
+        return self.cum[index * self.stride:(index + 1) * self.stride]
+
+    def delta(self, index: int) -> List[int]:
+        """第index天当天的增量"""
+        current, previous = self.row(index), self.row(index - 1)
+        return [current[k] - previous[k] for k in range(self.stride)]
+
+    def append(self, day: str, daily: List[int]):
+        """追加一天（day必须晚于已有的最后一天）"""
+        previous = self.row(len(self.days) - 1)
+        self.days.append(day)
+        self.cum.extend(previous[k] + daily[k] for k in range(self.stride))
+
+    def truncate(self, length: int):
+        """只保留前length天"""
+        del self.days[length:]
+        del self.cum[length * self.stride:]
+
+    def totals(self, start: str, end: str) -> List[int]:
+        """日期闭区间内的合计（两次查找和一次相减）"""
+        hi = self.row(bisect_right(self.days, end) - 1)
+        lo = self.row(bisect_left(self.days, start) - 1)
+        return [hi[k] - lo[k] for k in range(self.stride)]
+
+
+def _update_series(series_map: Dict[Any, _PlayerSeries], rows: Dict[str, Dict[Any, List[int]]],
+                   period_start: str, period_end: str, stride: int):
+    """
+    用一个周期的每日增量行更新各序列
+    周期在已有数据之后时只追加新的天；与已有数据重叠时只重建受影响的后缀
+
+    Args:
+        series_map: 键 -> 序列（原地更新，没有数据的键被删除）
+        rows: 日期 -> 键 -> 增量行
+        period_start: 周期起始日期（YYYY-MM-DD）
+        period_end: 周期结束日期（YYYY-MM-DD）
+        stride: 每行字段数
+    """
+    new_days = sorted(day for day in rows if day and period_start <= day <= period_end)
+    keys = set(series_map)
+    for day in new_days:
+        keys.update(rows[day])
+
+    for key in keys:
+        series = series_map.setdefault(key, _PlayerSeries(stride))
+        start = bisect_left(series.days, period_start)
+        end = bisect_right(series.days, period_end)
+
+        # 保留周期之后的增量，截断后重新累加
+        tail = [(series.days[k], series.delta(k)) for k in range(end, len(series.days))]
+        series.truncate(start)
+        for day in new_days:
+            if key in rows[day]:
+                series.append(day, rows[day][key])
+        for day, daily in tail:
+            series.append(day, daily)
+
+        if not series.days:
+            del series_map[key]
+
+
+def _dump_series(series_map: Dict[str, _PlayerSeries]) -> Dict[str, Dict[str, Any]]:
+    """序列转换为可JSON序列化的字典"""
+    return {key: {'days': series.days, 'cum': series.cum.tolist()} for key, series in series_map.items()}
+
+
+def _load_series(payload: Dict[str, Dict[str, Any]], stride: int) -> Dict[str, _PlayerSeries]:
+    """由_dump_series的结果还原序列"""
+    series_map = {}
+    for key, data in payload.items():
+        series = _PlayerSeries(stride)
+        series.days = data['days']
+        series.cum = array('q', data['cum'])
+        series_map[key] = series
+    return series_map
+
+
+class PlayerTimeIndex:
+    """按玩家、按日的前缀和索引"""
+
+    def __init__(self):
+        """初始化空索引"""
+        self._players: Dict[str, _PlayerSeries] = {}  # 发送者ID -> 序列
+        self.names: Dict[str, str] = {}  # 发送者ID -> 最近的显示名
+        self._covered: List[List[str]] = []  # 已索引的日期区间（闭区间，已合并）
+
+    @staticmethod
+    def daily_rows(valid_games: Iterable[Dict[str, Any]], battles: Iterable[Dict[str, Any]],
+                   keys: List[str]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        将游戏和对战汇总为每日每玩家的增量行
+
+        Args:
+            valid_games: 有效游戏列表
+            battles: 对战记录列表
+            keys: 玩家ID -> 发送者ID（PlayerRegistry.keys()）
+
+        Returns:
+            Dict: 日期 -> 发送者ID -> 增量行
+        """
+        rows = defaultdict(lambda: defaultdict(lambda: [0] * STRIDE))
+        result_index = {result_type: RESULT_OFFSET + i for i, result_type in enumerate(RESULT_ORDER)}
+
+        for game in valid_games:
+            row = rows[game.date][keys[game.player_id]]
+            row[0] += 1
+            row[1] += game.score_points
+            row[result_index[game.result_type]] += 1
+
+        for battle in battles:
+            day_rows = rows[battle.date]
+            p1, p2 = keys[battle.player1_id], keys[battle.player2_id]
+            winner = battle.winner_id
+            if winner == battle.player1_id:
+                day_rows[p1][2] += 1
+                day_rows[p2][3] += 1
+            elif winner == battle.player2_id:
+                day_rows[p2][2] += 1
+                day_rows[p1][3] += 1
+            else:
+                day_rows[p1][4] += 1
+                day_rows[p2][4] += 1
+
+        return rows
+
+    def update(self, period_start: str, period_end: str, valid_games: List[Dict[str, Any]],
+               battles: List[Dict[str, Any]], keys: List[str], labels: List[str]):
+        """
+        用一个分析周期的结果更新索引
+        周期在已有数据之后时只追加新的天；与已有数据重叠时只重建受影响的后缀
+
+        Args:
+            period_start: 周期起始日期（YYYY-MM-DD）
+            period_end: 周期结束日期（YYYY-MM-DD）
+            valid_games: 周期内的有效游戏
+            battles: 周期内的对战记录
+            keys: 玩家ID -> 发送者ID
+            labels: 玩家ID -> 显示名
+        """
+        _update_series(self._players, self.daily_rows(valid_games, battles, keys),
+                       period_start, period_end, STRIDE)
+        for game in valid_games:
+            self.names[keys[game.player_id]] = labels[game.player_id]
+        self._add_coverage(period_start, period_end)
+
+    def _add_coverage(self, start: str, end: str):
+        """合并已索引的日期区间"""
+        intervals = sorted(self._covered + [[start, end]])
+        merged: List[List[str]] = []
+        for interval in intervals:
+            if merged and interval[0] <= _next_day(merged[-1][1]):
+                merged[-1][1] = max(merged[-1][1], interval[1])
+            else:
+                merged.append(list(interval))
+        self._covered = merged
+
+    def covers(self, start: str, end: str) -> bool:
+        """索引是否完整覆盖[start, end]"""
+        return any(lo <= start and end <= hi for lo, hi in self._covered)
+
+    def query(self, player: str, start: str, end: str) -> Optional[Dict[str, int]]:
+        """
+        查询单个玩家在日期闭区间内的汇总
+
+        Args:
+            player: 玩家的发送者ID
+            start: 起始日期（YYYY-MM-DD）
+            end: 结束日期（YYYY-MM-DD）
+
+        Returns:
+            Dict: 字段 -> 区间内合计，玩家不存在时返回None
+        """
+        series = self._players.get(player)
+        if series is None:
+            return None
+        return dict(zip(INDEX_FIELDS, series.totals(start, end)))
+
+    def player_stats(self, start: str, end: str) -> Dict[str, Dict[str, Any]]:
+        """
+        查询所有玩家在日期闭区间内的统计（格式与build_player_stats一致）
+
+        Args:
+            start: 起始日期（YYYY-MM-DD）
+            end: 结束日期（YYYY-MM-DD）
+
+        Returns:
+            Dict: 显示名 -> 统计数据
+        """
+        labels = self.labels()
+        player_stats = {}
+        for player in self._players:
+            totals = self.query(player, start, end)
+            if not any(totals[field] for field in BASE_FIELDS):
+                continue
+            stats = {
+                'total_games': totals['games'], 'total_points': totals['points'], 'avg_points': 0,
+                'battles_won': totals['wins'], 'battles_lost': totals['losses'],
+                'battles_draw': totals['draws'], 'win_rate': 0,
+                'result_counts': Counter({result_type: totals[result_type]
+                                          for result_type in RESULT_ORDER if totals[result_type]})
+            }
+            player_stats[labels[player]] = finalize_player_stats(stats)
+        return player_stats
+
+    def labels(self) -> Dict[str, str]:
+        """
+        索引中每个玩家的显示名
+        不同发送者的显示名相同时（如分别来自不同周期的同名玩家）附加发送者ID后缀以区分
+
+        Returns:
+            Dict: 发送者ID -> 显示名
+        """
+        labels = {key: self.names.get(key, key) for key in self._players}
+        counts = Counter(labels.values())
+        return {key: label if counts[label] == 1 else f'{label}({key.replace("name:", "")[-4:]})'
+                for key, label in labels.items()}
+
+    def players(self) -> List[str]:
+        """索引中的玩家（显示名）"""
+        return list(self.labels().values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典"""
+        return {'fields': list(INDEX_FIELDS), 'covered': self._covered, 'names': self.names,
+                'players': _dump_series(self._players)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source: str = '') -> 'PlayerTimeIndex':
+        """由to_dict的结果还原索引，字段不匹配（或是以显示名为键的旧索引）时抛出ValueError"""
+        if data.get('fields') != list(INDEX_FIELDS) or 'names' not in data:
+            raise ValueError(f"索引字段不匹配，请删除后重建: {source}")
+        index = cls()
+        index._covered = data['covered']
+        index.names = data['names']
+        index._players = _load_series(data['players'], STRIDE)
+        return index
+
+    def save(self, path: str):
+        """保存索引到JSON文件"""
+        with atomic_open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'PlayerTimeIndex':
+        """
+        从JSON文件加载索引，文件不存在时返回空索引
+
+        Args:
+            path: 索引文件路径
+
+        Returns:
+            PlayerTimeIndex: 索引
+        """
+        if not os.path.exists(path):
+            return cls()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), path)
+
+    def covered_ranges(self) -> List[Tuple[str, str]]:
+        """已索引的日期区间"""
+        return [tuple(interval) for interval in self._covered]
+
+
+class PairTimeIndex:
+    """按玩家对、按日的胜负平前缀和索引（玩家对为按发送者ID排序的两个键，以前者为视角）"""
+
+    def __init__(self):
+        """初始化空索引"""
+        self._pairs: Dict[Tuple[str, str], _PlayerSeries] = {}
+
+    @staticmethod
+    def daily_rows(battles: Iterable[Battle], keys: List[str]) -> Dict[str, Dict[Tuple[str, str], List[int]]]:
+        """
+        将对战汇总为每日每对玩家的增量行
+
+        Args:
+            battles: 对战记录列表
+            keys: 玩家ID -> 发送者ID
+
+        Returns:
+            Dict: 日期 -> (发送者A, 发送者B) -> [A胜, A负, 平]
+        """
+        rows = defaultdict(lambda: defaultdict(lambda: [0] * len(PAIR_FIELDS)))
+        for battle in battles:
+            p1, p2 = keys[battle.player1_id], keys[battle.player2_id]
+            a, b = sorted((p1, p2))
+            row = rows[battle.date][a, b]
+            if battle.winner_id is None:
+                row[2] += 1
+            elif keys[battle.winner_id] == a:
+                row[0] += 1
+            else:
+                row[1] += 1
+        return rows
+
+    def update(self, period_start: str, period_end: str, battles: List[Battle], keys: List[str]):
+        """用一个分析周期的对战更新索引（规则同PlayerTimeIndex.update）"""
+        _update_series(self._pairs, self.daily_rows(battles, keys), period_start, period_end, len(PAIR_FIELDS))
+
+    def query(self, start: str, end: str) -> List[Tuple[str, str, int, int, int]]:
+        """
+        查询日期闭区间内有对战的玩家对（发送者ID，显示名由调用方通过PlayerTimeIndex.labels()解析）
+
+        Args:
+            start: 起始日期（YYYY-MM-DD）
+            end: 结束日期（YYYY-MM-DD）
+
+        Returns:
+            List: (发送者A, 发送者B, A胜, A负, 平)，按对战数从多到少
+        """
+        pairs = []
+        for (a, b), series in self._pairs.items():
+            wins, losses, draws = series.totals(start, end)
+            if wins or losses or draws:
+                pairs.append((a, b, wins, losses, draws))
+        pairs.sort(key=lambda pair: -(pair[2] + pair[3] + pair[4]))
+        return pairs
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典（玩家对以制表符连接）"""
+        return {'fields': list(PAIR_FIELDS),
+                'pairs': _dump_series({f'{a}\t{b}': series for (a, b), series in self._pairs.items()})}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PairTimeIndex':
+        """由to_dict的结果还原索引"""
+        index = cls()
+        for key, series in _load_series(data['pairs'], len(PAIR_FIELDS)).items():
+            a, b = key.split('\t')
+            index._pairs[a, b] = series
+        return index
+
+
+def _next_day(day: str) -> str:
+    """下一天（用于合并相邻区间）"""
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证按内容寻址的分析结果缓存
+"""
+import unittest
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis_cache import AnalysisCache, source_fingerprint
+from niu_niu_analysis import analyze_messages, analysis_parameters, ANALYSIS_MODULES
+from test_niu_niu_analysis import game_messages
+
+
+class TestAnalysisCache(unittest.TestCase):
+    """测试缓存键、读写和淘汰"""
+
+    def setUp(self):
+        """测试前准备：临时缓存目录"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp.cleanup()
+
+    def test_key_depends_on_input_and_params(self):
+        """测试：输入摘要、参数任一变化都会得到不同的键"""
+        params = analysis_parameters()
+        key = AnalysisCache.make_key('abc', params)
+        self.assertEqual(key, AnalysisCache.make_key('abc', dict(params)))
+        self.assertNotEqual(key, AnalysisCache.make_key('abd', params))
+        self.assertNotEqual(key, AnalysisCache.make_key('abc', {**params, 'game_window_seconds': 31}))
+        self.assertNotEqual(key, AnalysisCache.make_key('abc', {**params, 'engine_version': -1}))
+        self.assertEqual(len(source_fingerprint(ANALYSIS_MODULES)), 64)
+
+    def test_round_trip_analysis_result(self):
+        """测试：分析结果写入后原样读出"""
+        cache = AnalysisCache(self.cache_dir)
+        result = analyze_messages(game_messages(100, '甲', 21, 0, [3, 2, 5, 6, 4])
+                                  + game_messages(200, '乙', 21, 1, [1, 4, 5, 2, 3]))
+        self.assertIsNone(cache.get('k'))
+        cache.put('k', {'analysis': result})
+
+        cached = cache.get('k')['analysis']
+        self.assertEqual(cached.battles, result.battles)
+        self.assertEqual(cached.player_stats, result.player_stats)
+        self.assertEqual(cached.registry.labels(), result.registry.labels())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_fingerprint_file(self):
+        """测试：文件内容变化时摘要变化，未变化时复用记录的摘要"""
+        cache = AnalysisCache(self.cache_dir)
+        path = os.path.join(self.tmp.name, 'raw.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[1]')
+        first = cache.fingerprint_file(path)
+        self.assertEqual(cache.fingerprint_file(path), first)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[2]')
+        os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        self.assertNotEqual(cache.fingerprint_file(path), first)
+
+    def test_lru_eviction_by_entries(self):
+        """测试：超过条目数时淘汰最久未使用的条目"""
+        cache = AnalysisCache(self.cache_dir, max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        os.utime(os.path.join(self.cache_dir, 'a.pkl'), ns=(1, 1))
+        os.utime(os.path.join(self.cache_dir, 'b.pkl'), ns=(2, 2))
+        cache.get('a')  # a变为最近使用
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_eviction_by_size(self):
+        """测试：总大小超限时淘汰旧条目"""
+        cache = AnalysisCache(self.cache_dir, max_bytes=1500)
+        cache.put('a', b'x' * 1000)
+        os.utime(os.path.join(self.cache_dir, 'a.pkl'), ns=(1, 1))
+        cache.put('b', b'y' * 1000)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_corrupt_entry_discarded(self):
+        """测试：损坏的条目视为未命中并被删除"""
+        cache = AnalysisCache(self.cache_dir)
+        with open(os.path.join(self.cache_dir, 'bad.pkl'), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertIsNone(cache.get('bad'))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'bad.pkl')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
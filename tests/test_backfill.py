@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证历史归档的并行批量重新分析
+"""
+import unittest
+import csv
+import json
+import sys
+import os
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from backfill import find_archives, run_backfill, write_files_csv, write_merged_stats_csv
+from niu_niu_analysis import analyze_messages
+from player_form import attach_form
+from player_registry import PlayerRegistry
+from test_chunked_analysis import multi_day_messages
+
+
+def split_points(messages, count):
+    """间隔超过一小时（不会拆开游戏或对战）的位置中，均匀取count个"""
+    gaps = [i for i in range(1, len(messages))
+            if (datetime.fromisoformat(messages[i]['time'])
+                - datetime.fromisoformat(messages[i - 1]['time'])).total_seconds() >= 3600]
+    return [gaps[(k + 1) * len(gaps) // (count + 1)] for k in range(count)]
+
+
+class TestBackfill(unittest.TestCase):
+    """测试归档发现、合并、失败汇总和缓存"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmp.name, 'archive')
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        os.makedirs(self.archive)
+        self.messages = multi_day_messages(300, seed=9)
+        a, b = split_points(self.messages, 2)
+        # 第三个文件与第二个文件重叠
+        self.write('raw_messages_1.json', self.messages[:a])
+        self.write('raw_messages_2.json', self.messages[a:b])
+        self.write('raw_messages_3.json', self.messages[a:])
+        with open(os.path.join(self.archive, 'raw_messages_bad.json'), 'w', encoding='utf-8') as f:
+            f.write('[{"seq": 1,')
+        self.write('raw_messages_dict.json', {'messages': []})
+        self.write('notes.json', [])
+
+        self.whole = analyze_messages(self.messages)
+        attach_form(self.whole.player_stats, self.whole.valid_games, self.whole.battles)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.archive, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def test_find_archives(self):
+        """测试：目录只匹配raw_messages_*.json，通配符和文件路径去重"""
+        paths = find_archives([self.archive, os.path.join(self.archive, 'raw_messages_1*'),
+                               os.path.join(self.archive, 'notes.json')])
+        self.assertEqual([os.path.basename(p) for p in paths],
+                         ['notes.json', 'raw_messages_1.json', 'raw_messages_2.json', 'raw_messages_3.json',
+                          'raw_messages_bad.json', 'raw_messages_dict.json'])
+
+    def test_merged_stats_and_failures(self):
+        """测试：重叠归档合并后与整体分析相同，解析失败的文件被汇总"""
+        paths = find_archives([self.archive])
+        result = run_backfill(paths, workers=1, cache_dir=None)
+        self.assertEqual(result['player_stats'], self.whole.player_stats)
+        self.assertEqual((result['games'], result['battles']),
+                         (len(self.whole.valid_games), len(self.whole.battles)))
+
+        statuses = {os.path.basename(f['path']): f['status'] for f in result['files']}
+        self.assertEqual(statuses, {'raw_messages_1.json': 'ok', 'raw_messages_2.json': 'ok',
+                                    'raw_messages_3.json': 'ok', 'raw_messages_bad.json': 'failed',
+                                    'raw_messages_dict.json': 'failed'})
+        errors = {os.path.basename(f['path']): f['error'] for f in result['files']}
+        self.assertTrue(errors['raw_messages_bad.json'].startswith('JSONDecodeError'))
+        self.assertIn('JSON array', errors['raw_messages_dict.json'])
+
+        files_path = os.path.join(self.tmp.name, 'files.csv')
+        stats_path = os.path.join(self.tmp.name, 'stats.csv')
+        write_files_csv(files_path, result['files'])
+        write_merged_stats_csv(stats_path, result['player_stats'])
+        with open(files_path, encoding='utf-8') as f:
+            self.assertEqual(sum(1 for row in csv.DictReader(f) if row['status'] == 'failed'), 2)
+        with open(stats_path, encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(sum(int(row['total_games']) for row in rows), len(self.whole.valid_games))
+
+    def test_cache_and_parallel(self):
+        """测试：第二次运行命中缓存，多进程结果与单进程相同"""
+        paths = find_archives([self.archive])
+        first = run_backfill(paths, workers=2, cache_dir=self.cache_dir)
+        self.assertFalse(any(f['cached'] for f in first['files']))
+        self.assertEqual(first['player_stats'], self.whole.player_stats)
+
+        seen = []
+        second = run_backfill(paths, workers=1, cache_dir=self.cache_dir,
+                              on_result=lambda outcome: seen.append(outcome['path']))
+        self.assertEqual(sorted(seen), paths)
+        self.assertEqual([f['cached'] for f in second['files']], [True, True, True, False, False])
+        self.assertEqual(second['player_stats'], first['player_stats'])
+        self.assertFalse([name for name in os.listdir(self.cache_dir) if name.endswith('.tmp')])
+
+    def test_missing_file(self):
+        """测试：不存在的文件记为失败，不中断其他文件"""
+        paths = find_archives([os.path.join(self.archive, 'raw_messages_1.json'),
+                               os.path.join(self.archive, 'missing.json')])
+        result = run_backfill(paths, workers=1, cache_dir=self.cache_dir)
+        self.assertEqual([f['status'] for f in result['files']], ['failed', 'ok'])
+        self.assertTrue(result['files'][0]['error'].startswith('FileNotFoundError'))
+
+    def test_registry_merge(self):
+        """测试：合并登记表时同一发送者映射为同一ID，保留时间最新的昵称"""
+        left, right = PlayerRegistry(), PlayerRegistry()
+        left.intern('wxid_a', '甲', 10)
+        right.intern('wxid_b', '乙', 5)
+        right.intern('wxid_a', '甲2', 20)
+        right.intern('', '无名', 30)
+        self.assertEqual(left.merge(right), [1, 0, 2])
+        self.assertEqual(left.labels(), ['甲2', '乙', '无名'])
+        self.assertEqual(left.id_of('', '无名'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
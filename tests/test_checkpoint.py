@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证原子写出和分块分析的检查点恢复
+"""
+import unittest
+import json
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from checkpoint import atomic_open, save_checkpoint, load_checkpoint, truncate_outputs
+from chunked_analysis import ChunkedAnalysis, iter_chunks
+from fetch_pipeline import RawJsonWriter
+from niu_niu_analysis import analyze_messages
+from player_form import attach_form
+from test_chunked_analysis import multi_day_messages, renamed_messages
+
+
+class TestAtomicWrites(unittest.TestCase):
+    """测试原子写出"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'out.csv')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('old')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_failed_write_keeps_old_file(self):
+        """测试：写出过程中出错时原文件不变，不留下临时文件；正常结束时替换"""
+        with self.assertRaises(RuntimeError):
+            with atomic_open(self.path, 'w', encoding='utf-8') as f:
+                f.write('half')
+                raise RuntimeError('crash')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.tmp.name), ['out.csv'])
+
+        with atomic_open(self.path, 'w', encoding='utf-8') as f:
+            f.write('new')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'new')
+
+    def test_raw_writer_abort(self):
+        """测试：流水线中途失败时保留原有的原始数据文件"""
+        writer = RawJsonWriter(self.path)
+        writer.write_page([{'seq': 1}])
+        writer.abort()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.tmp.name), ['out.csv'])
+
+    def test_checkpoint_run_must_match(self):
+        """测试：运行标识不一致、文件损坏或不存在时不恢复"""
+        path = os.path.join(self.tmp.name, 'checkpoints', 'run.pkl')
+        run = {'raw': [10, 20], 'group': 'g'}
+        save_checkpoint(path, run, {'chunks': 3})
+        self.assertEqual(load_checkpoint(path, run), {'chunks': 3})
+        self.assertIsNone(load_checkpoint(path, {**run, 'raw': [11, 20]}))
+        with open(path, 'wb') as f:
+            f.write(b'\x80\x05trunc')
+        self.assertIsNone(load_checkpoint(path, run))
+        self.assertIsNone(load_checkpoint(os.path.join(self.tmp.name, 'missing.pkl'), run))
+
+
+class TestChunkedResume(unittest.TestCase):
+    """测试中断后从检查点继续的结果与不中断一致"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'raw.json')
+        self.spill = os.path.join(self.tmp.name, 'spill')
+        self.checkpoint = os.path.join(self.tmp.name, 'checkpoint.pkl')
+        self.games_file = os.path.join(self.tmp.name, 'games.txt')
+        self.messages = multi_day_messages(400, seed=12)
+        with open(self.raw, 'w', encoding='utf-8') as f:
+            json.dump(self.messages, f, ensure_ascii=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_chunks(self, analysis, crash_at=None, checkpoint_every=5):
+        """从analysis.chunks处继续处理，每checkpoint_every块存一次检查点，处理完第crash_at块后“崩溃”"""
+        skip = analysis.chunks
+        # 小块在一天之内切分，检查点时组局器中常有未成局的骰子
+        for label, chunk in iter_chunks(self.raw, 'day', 4000):
+            if skip:
+                skip -= 1
+                continue
+            _, games, _ = analysis.process_chunk(label, chunk)
+            with open(self.games_file, 'a', encoding='utf-8') as f:
+                f.writelines(f'{game.seq}\t{game.player_name}\n' for game in games)
+            if analysis.chunks % checkpoint_every == 0:
+                save_checkpoint(self.checkpoint, {}, {
+                    'analysis': analysis, 'outputs': {self.games_file: os.path.getsize(self.games_file)}})
+            if analysis.chunks == crash_at:
+                return False
+        games, _ = analysis.finish()
+        with open(self.games_file, 'a', encoding='utf-8') as f:
+            f.writelines(f'{game.seq}\t{game.player_name}\n' for game in games)
+        return True
+
+    def test_resume_matches_uninterrupted(self):
+        """测试：两次中断后恢复，输出行、统计和近期状态与一次性分析一致"""
+        full = analyze_messages(self.messages)
+        attach_form(full.player_stats, full.valid_games, full.battles)
+        open(self.games_file, 'w').close()
+
+        self.assertFalse(self.run_chunks(ChunkedAnalysis(self.spill), crash_at=12))
+        for crash_at in (23, None):
+            state = load_checkpoint(self.checkpoint, {})
+            analysis = state['analysis']
+            analysis.rollback()
+            truncate_outputs(state['outputs'])
+            self.assertEqual(analysis.chunks % 5, 0)
+            spilled = [name for name in os.listdir(self.spill) if name.endswith('.json')]
+            self.assertEqual(len(spilled), analysis.chunks)
+            self.assertEqual(len(list(analysis.game_labels())), analysis.game_count)
+            finished = self.run_chunks(analysis, crash_at=crash_at)
+        self.assertTrue(finished)
+
+        self.assertEqual(analysis.merge_stats(), full.player_stats)
+        self.assertEqual(analysis.game_count, len(full.valid_games))
+        self.assertEqual(analysis.battle_count, len(full.battles))
+        with open(self.games_file, encoding='utf-8') as f:
+            self.assertEqual([int(line.split('\t')[0]) for line in f], [game.seq for game in full.valid_games])
+
+    def test_resume_across_rename(self):
+        """测试：改名和重名玩家出现在检查点与中断之间（第60块），恢复后结束时按ID改写的名字与一次性分析一致"""
+        self.messages = renamed_messages(self.messages)
+        with open(self.raw, 'w', encoding='utf-8') as f:
+            json.dump(self.messages, f, ensure_ascii=False)
+        full = analyze_messages(self.messages)
+        open(self.games_file, 'w').close()
+
+        # 检查点在第56、63、…块：第62块中断后从第56块（改名前）恢复，第80块中断后从第77块（改名后）恢复
+        self.assertFalse(self.run_chunks(ChunkedAnalysis(self.spill), crash_at=62, checkpoint_every=7))
+        for crash_at in (80, None):
+            state = load_checkpoint(self.checkpoint, {})
+            analysis = state['analysis']
+            analysis.rollback()
+            truncate_outputs(state['outputs'])
+            finished = self.run_chunks(analysis, crash_at=crash_at, checkpoint_every=7)
+        self.assertTrue(finished)
+
+        self.assertTrue(analysis.needs_relabel())
+        with open(self.games_file, encoding='utf-8') as f:
+            rows = [line.rstrip('\n').split('\t') for line in f]
+        self.assertIn('甲', {name for _, name in rows})
+        relabeled = [(int(seq), name) for (seq, _), (name,) in zip(rows, analysis.game_labels())]
+        self.assertEqual(relabeled, [(game.seq, game.player_name) for game in full.valid_games])
+        self.assertEqual(list(analysis.battle_labels()),
+                         [[battle.player1, battle.player2, battle.winner] for battle in full.battles])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
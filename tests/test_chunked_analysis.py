@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证内存有上限的分块分析
+"""
+import unittest
+import json
+import random
+import sys
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from chunked_analysis import ChunkedAnalysis, iter_json_array, iter_chunks
+from niu_niu_analysis import analyze_messages
+from player_form import attach_form
+from test_niu_niu_analysis import dice_message
+
+
+def multi_day_messages(games, seed=7):
+    """构造跨越多天（含跨午夜游戏）的多人游戏消息，夹杂普通聊天消息"""
+    rng = random.Random(seed)
+    clock = datetime(2025, 6, 1, 22, 0, tzinfo=timezone(timedelta(hours=8)))
+    messages, seq = [], 1
+    for _ in range(games):
+        player = rng.choice('甲乙丙丁')
+        clock += timedelta(seconds=rng.choice([15, 60, 250, 3600]))
+        for _ in range(5):
+            clock += timedelta(seconds=rng.randint(1, 8))
+            messages.append(dice_message(seq, player, clock.isoformat(), rng.randint(1, 6)))
+            seq += 1
+            if rng.random() < 0.2:
+                messages.append({'seq': seq, 'time': clock.isoformat(), 'sender': f'wxid_{player}',
+                                 'sender_name': player, 'msg_type': 1, 'content': '再来一局'})
+                seq += 1
+    return messages
+
+
+def renamed_messages(messages):
+    """后半段消息中甲改名为老甲，并出现一个新玩家（不同发送者ID）也叫乙"""
+    half = len(messages) // 2
+    renamed = [dict(message) for message in messages]
+    for message in renamed[half:]:
+        if message['sender'] == 'wxid_甲':
+            message['sender_name'] = '老甲'
+        elif message['sender'] == 'wxid_丙':
+            message['sender'], message['sender_name'] = 'wxid_new乙', '乙'
+    return renamed
+
+
+class TestJsonArrayStream(unittest.TestCase):
+    """测试流式JSON数组读取"""
+
+    def test_matches_json_load(self):
+        """测试：小读取缓冲区下逐个读出的元素与整体加载一致"""
+        data = [{'a': i, 's': '牛' * (i % 7), 'n': [i, None, True]} for i in range(200)] + [3.5, "x"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'raw.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.assertEqual([value for value, _ in iter_json_array(path, read_size=17)], data)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(' [ ] ')
+            self.assertEqual(list(iter_json_array(path)), [])
+
+
+class TestChunkedAnalysis(unittest.TestCase):
+    """测试分块结果与一次性分析一致"""
+
+    def run_chunked(self, messages, unit, max_chunk_bytes):
+        """写出原始文件并分块分析，输出的行按结束时的显示名改写（同写出CSV），返回(游戏, 对战, 统计, 块数)"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'raw.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(messages, f, ensure_ascii=False, indent=2)
+            analysis = ChunkedAnalysis(os.path.join(tmp, 'spill'))
+            games, battles = [], []
+            for label, chunk in iter_chunks(path, unit, max_chunk_bytes):
+                _, chunk_games, chunk_battles = analysis.process_chunk(label, chunk)
+                games += chunk_games
+                battles += chunk_battles
+            rest_games, rest_battles = analysis.finish()
+            games += rest_games
+            battles += rest_battles
+            self.relabeled = analysis.needs_relabel()
+            for game, (name,) in zip(games, analysis.game_labels()):
+                game.player_name = name
+            for battle, names in zip(battles, analysis.battle_labels()):
+                battle.player1, battle.player2, battle.winner = names
+            stats = analysis.merge_stats()
+        return games, battles, stats, analysis.chunks
+
+    def test_matches_full_analysis(self):
+        """测试：按天、按周以及块内提前切分时，游戏、对战和统计（含近期状态）都与一次性分析一致"""
+        messages = multi_day_messages(400)
+        full = analyze_messages(messages)
+        attach_form(full.player_stats, full.valid_games, full.battles)
+
+        for unit, max_chunk_bytes in [('day', 10 ** 9), ('week', 10 ** 9), ('day', 4000)]:
+            with self.subTest(unit=unit, max_chunk_bytes=max_chunk_bytes):
+                games, battles, stats, chunks = self.run_chunked(messages, unit, max_chunk_bytes)
+                self.assertEqual(games, full.valid_games)
+                self.assertEqual(battles, full.battles)
+                self.assertEqual(stats, full.player_stats)
+                self.assertFalse(self.relabeled)
+        self.assertGreater(chunks, 20)
+
+    def test_rename_and_late_duplicate_name(self):
+        """测试：中途改名、后面的块才出现重名玩家时，早先输出的行改写后与一次性分析一致"""
+        messages = renamed_messages(multi_day_messages(400))
+        full = analyze_messages(messages)
+        attach_form(full.player_stats, full.valid_games, full.battles)
+        self.assertIn('老甲', full.player_stats)
+        self.assertNotIn('甲', full.player_stats)
+        self.assertEqual(sum(name.startswith('乙(') for name in full.player_stats), 2)
+
+        for unit, max_chunk_bytes in [('day', 10 ** 9), ('day', 4000)]:
+            with self.subTest(unit=unit, max_chunk_bytes=max_chunk_bytes):
+                games, battles, stats, _ = self.run_chunked(messages, unit, max_chunk_bytes)
+                self.assertTrue(self.relabeled)
+                self.assertEqual(games, full.valid_games)
+                self.assertEqual(battles, full.battles)
+                self.assertEqual(stats, full.player_stats)
+
+    def test_memory_bounded(self):
+        """测试：分块分析的内存峰值远低于一次性加载"""
+        messages = multi_day_messages(3000, seed=11)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'raw.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(messages, f, ensure_ascii=False, indent=2)
+            del messages
+
+            tracemalloc.start()
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+            full_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            analysis = ChunkedAnalysis(os.path.join(tmp, 'spill'))
+            for label, chunk in iter_chunks(path, 'week', 64 * 1024):
+                analysis.process_chunk(label, chunk)
+            analysis.finish()
+            analysis.merge_stats()
+            chunked_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.assertLess(chunked_peak, full_peak / 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
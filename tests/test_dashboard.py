@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证面板快照
+"""
+import unittest
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from dashboard import DashboardSnapshot, snapshot_signature, rank_rows
+from niu_niu_analysis import match_battles, build_player_stats
+from records import Game
+from test_time_index import synthetic_games, comparable, KEYS, LABELS
+
+
+def expected_rows(games, battles):
+    """直接扫描得到的玩家统计"""
+    return comparable(build_player_stats(games, battles))
+
+
+def row_stats(rows):
+    """快照表格行中与comparable对应的字段"""
+    return {row['player']: (row['total_games'], row['total_points'], row['battles_won'], row['battles_lost'],
+                            row['battles_draw']) for row in rows}
+
+
+class TestDashboardSnapshot(unittest.TestCase):
+    """测试快照更新、查询和保存"""
+
+    def setUp(self):
+        self.games = synthetic_games(11)
+        self.battles = match_battles(self.games)
+        self.snapshot = DashboardSnapshot()
+        for start, end in (('2025-06-01', '2025-06-15'), ('2025-06-16', '2025-06-30')):
+            self.snapshot.update(start, end, [g for g in self.games if start <= g.date <= end],
+                                 [b for b in self.battles if start <= b.date <= end], KEYS, LABELS)
+
+    def test_query_matches_rescan(self):
+        """测试：分两次更新后，任意时间段的玩家、对战和每日局数与重新扫描一致"""
+        start, end = '2025-06-05', '2025-06-22'
+        games = [g for g in self.games if start <= g.date <= end]
+        battles = [b for b in self.battles if start <= b.date <= end]
+        view = self.snapshot.query(start, end)
+
+        expected = {p: s[:5] for p, s in expected_rows(games, battles).items()}
+        self.assertEqual(row_stats(view['players']), expected)
+        self.assertEqual(sum(pair['battles'] for pair in view['head_to_head']), len(battles))
+        self.assertEqual(sum(view['results'].values()), len(games))
+        self.assertEqual(view['daily']['x'][0], start)
+        self.assertEqual(sum(view['daily']['y']), len(games))
+        self.assertEqual(self.snapshot.date_range(), ('2025-06-01', '2025-06-30'))
+
+    def test_player_filter_and_ranking(self):
+        """测试：玩家筛选只保留相关玩家和对战，排行按指定列并过滤最少局数"""
+        view = self.snapshot.query('2025-06-01', '2025-06-30', ['甲'])
+        self.assertEqual([row['player'] for row in view['players']], ['甲'])
+        self.assertTrue(all('甲' in (pair['player1'], pair['player2']) for pair in view['head_to_head']))
+
+        rows = self.snapshot.query('2025-06-01', '2025-06-30')['players']
+        ranked = rank_rows(rows, 'total_games', min_games=1)
+        self.assertEqual([row['total_games'] for row in ranked],
+                         sorted((row['total_games'] for row in rows), reverse=True))
+        self.assertEqual(rank_rows(rows, 'win_rate', min_games=10 ** 6), [])
+
+    def test_reanalyzed_period_replaces_days(self):
+        """测试：重新分析同一周期不会重复计数"""
+        before = self.snapshot.query('2025-06-01', '2025-06-30')
+        start, end = '2025-06-10', '2025-06-20'
+        self.snapshot.update(start, end, [g for g in self.games if start <= g.date <= end],
+                             [b for b in self.battles if start <= b.date <= end], KEYS, LABELS)
+        self.assertEqual(self.snapshot.query('2025-06-01', '2025-06-30'), before)
+
+    def test_rename_keeps_one_history(self):
+        """测试：玩家改名后，快照中的玩家行和对战组合都按发送者ID合并并显示新名字"""
+        start, end = '2025-06-16', '2025-06-30'
+        self.snapshot.update(start, end, [g for g in self.games if start <= g.date <= end],
+                             [b for b in self.battles if start <= b.date <= end], KEYS, ['小甲'] + LABELS[1:])
+        view = self.snapshot.query('2025-06-01', '2025-06-30', ['小甲'])
+        self.assertEqual([row['player'] for row in view['players']], ['小甲'])
+        self.assertEqual(view['players'][0]['total_games'], sum(1 for g in self.games if g.player_id == 0))
+        opponents = [pair['player2'] if pair['player1'] == '小甲' else pair['player1'] for pair in view['head_to_head']]
+        self.assertEqual(sorted(opponents), ['丁', '丙', '乙'])
+        self.assertEqual(sum(pair['battles'] for pair in view['head_to_head']),
+                         sum(1 for b in self.battles if 0 in (b.player1_id, b.player2_id)))
+
+    def test_save_load_and_signature(self):
+        """测试：保存后加载查询结果不变，重新保存后签名变化"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot.json')
+            self.assertIsNone(snapshot_signature(path))
+            self.snapshot.save(path)
+            signature = snapshot_signature(path)
+            loaded = DashboardSnapshot.load(path)
+            self.assertEqual(loaded.query('2025-06-03', '2025-06-25'), self.snapshot.query('2025-06-03', '2025-06-25'))
+
+            loaded.update('2025-07-01', '2025-07-01', [Game(player_name='甲', date='2025-07-01', result_type='牛牛')], [],
+                          KEYS, LABELS)
+            loaded.save(path)
+            self.assertNotEqual(snapshot_signature(path), signature)
+            self.assertEqual(DashboardSnapshot.load(path).date_range(), ('2025-06-01', '2025-07-01'))
+
+    def test_multi_year_query_is_fast(self):
+        """测试：三年、20名玩家的快照上查询一个时间段远低于一秒，每日序列被降采样"""
+        snapshot = DashboardSnapshot()
+        games = []
+        for day in range(1095):
+            date = time.strftime('%Y-%m-%d', time.gmtime(1640995200 + day * 86400))
+            games.extend(Game(player_id=i, player_name=f'玩家{i}', date=date, timestamp=day * 86400 + i * 60,
+                              result_type='牛1', score_points=1) for i in range(20))
+        snapshot.update('2022-01-01', '2024-12-30', games, match_battles(games),
+                        [f'wxid_{i}' for i in range(20)], [f'玩家{i}' for i in range(20)])
+
+        started = time.perf_counter()
+        view = snapshot.query('2022-03-01', '2024-11-30', ['玩家3', '玩家4'])
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 0.5)
+        self.assertLessEqual(len(view['daily']['x']), 180)
+        self.assertEqual(len(view['players']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
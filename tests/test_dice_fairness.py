@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证骰子公平性检测
+"""
+import unittest
+import random
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from dice_fairness import chi2_sf, DiceStream, FairnessTracker
+from records import DiceThrow
+
+
+def dice_records(values, player_id=0, start_seq=1):
+    """构造骰子记录"""
+    return [DiceThrow(seq=start_seq + i, player_id=player_id, dice_value=v) for i, v in enumerate(values)]
+
+
+class TestChiSquare(unittest.TestCase):
+    """测试卡方上尾概率闭式解"""
+
+    def test_critical_values(self):
+        """测试：各自由度的0.05临界值"""
+        for x, df in [(3.841, 1), (5.991, 2), (11.070, 5), (37.652, 25)]:
+            with self.subTest(df=df):
+                self.assertAlmostEqual(chi2_sf(x, df), 0.05, places=3)
+        self.assertEqual(chi2_sf(0, 5), 1.0)
+
+
+class TestDiceStream(unittest.TestCase):
+    """测试单个玩家的流式检验"""
+
+    def test_fair_dice_not_flagged(self):
+        """测试：随机骰子不被判定为异常"""
+        rng = random.Random(5)
+        stream = DiceStream()
+        for _ in range(5000):
+            stream.add(rng.randint(1, 6))
+        report = stream.report()
+        self.assertEqual(report['throws'], 5000)
+        self.assertEqual(report['suspicious'], '')
+
+    def test_replayed_sequence_flagged(self):
+        """测试：循环重放的点数序列被判定为异常"""
+        stream = DiceStream()
+        for i in range(600):
+            stream.add(i % 6 + 1)
+        report = stream.report()
+        self.assertAlmostEqual(report['face_chi2'], 0)
+        self.assertIn('transition', report['suspicious'])
+        self.assertIn('runs', report['suspicious'])
+
+    def test_loaded_die_flagged(self):
+        """测试：偏向6点的骰子被点数分布检验发现"""
+        rng = random.Random(9)
+        stream = DiceStream()
+        for _ in range(600):
+            stream.add(6 if rng.random() < 0.4 else rng.randint(1, 6))
+        self.assertIn('face', stream.report()['suspicious'])
+
+    def test_too_few_throws(self):
+        """测试：投掷数不足时不判定"""
+        stream = DiceStream()
+        for _ in range(10):
+            stream.add(6)
+        self.assertEqual(stream.report()['suspicious'], '')
+
+
+class TestFairnessTracker(unittest.TestCase):
+    """测试多玩家计数器和增量更新"""
+
+    def test_incremental_skips_counted_throws(self):
+        """测试：重复送入的骰子按seq跳过，保存后可继续累加"""
+        rng = random.Random(2)
+        values = [rng.randint(1, 6) for _ in range(300)]
+        keys, labels = ['wxid_a'], ['甲']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fairness.json')
+            tracker = FairnessTracker.load(path)
+            self.assertEqual(tracker.update(dice_records(values[:200]), keys, labels), 200)
+            tracker.save(path)
+
+            resumed = FairnessTracker.load(path)
+            self.assertEqual(resumed.update(dice_records(values), keys, labels), 100)
+            self.assertEqual(resumed.skipped, 200)
+
+        full = FairnessTracker()
+        full.update(dice_records(values), keys, labels)
+        self.assertEqual(resumed.reports(), full.reports())
+        self.assertEqual(full.reports()[0]['player_name'], '甲')
+
+    def test_seq_tracked_per_group(self):
+        """测试：seq按群记录，另一个群较小的seq照常计入；较早时间段后分析时计入并记为乱序，重复分析时跳过"""
+        keys, labels = ['wxid_a', 'wxid_b'], ['甲', '乙']
+        tracker = FairnessTracker()
+        self.assertEqual(tracker.update(dice_records([1, 2, 3] * 40, start_seq=5001), keys, labels, 'g1'), 120)
+        self.assertEqual(tracker.update(dice_records([4, 5, 6] * 20, 1, start_seq=101), keys, labels, 'g2'), 60)
+        self.assertEqual((tracker.skipped, tracker.out_of_order), (0, 0))
+
+        # g1较早的时间段（seq 4001-4030）在较晚的之后分析
+        self.assertEqual(tracker.update(dice_records([6] * 30, start_seq=4001), keys, labels, 'g1'), 30)
+        self.assertEqual((tracker.skipped, tracker.out_of_order), (0, 30))
+
+        # 重新分析覆盖两个时间段的范围：全部已计入
+        replay = dice_records([6] * 30, start_seq=4001) + dice_records([1, 2, 3] * 40, start_seq=5001)
+        self.assertEqual(tracker.update(replay, keys, labels, 'g1'), 0)
+        self.assertEqual(tracker.skipped, 150)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fairness.json')
+            tracker.save(path)
+            loaded = FairnessTracker.load(path)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{"last_seq": 5120, "names": {}, "players": {}}')
+            with self.assertRaises(ValueError):
+                FairnessTracker.load(path)
+        # 重新分析的范围覆盖了两段之间的seq（没有骰子的消息），区间合并
+        self.assertEqual(loaded.counted, {'g1': [[4001, 5120]], 'g2': [[101, 160]]})
+        self.assertEqual({row['player_name']: row['throws'] for row in loaded.reports()}, {'甲': 150, '乙': 60})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
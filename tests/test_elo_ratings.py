@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证Elo等级分和按日检查点
+"""
+import unittest
+import random
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from elo_ratings import EloRatings, RatingHistory, rating_table, RATING
+from records import Battle
+
+KEYS = ['wxid_a', 'wxid_b', 'wxid_c', 'wxid_d']
+LABELS = ['甲', '乙', '丙', '丁']
+
+
+def synthetic_battles(seed, days=10, per_day=15, month=6):
+    """生成跨多天、按时间排序的随机对战"""
+    rng = random.Random(seed)
+    battles = []
+    for day in range(1, days + 1):
+        for _ in range(per_day):
+            p1, p2 = rng.sample(range(len(KEYS)), 2)
+            battles.append(Battle(
+                date=f'2025-{month:02d}-{day:02d}',
+                player1_id=p1, player2_id=p2,
+                winner_id=rng.choice([p1, p1, p2, None]),
+            ))
+    return battles
+
+
+def ratings_of(elo):
+    """各玩家的等级分"""
+    return {key: round(row[RATING], 9) for key, row in elo.state.items()}
+
+
+class TestEloRatings(unittest.TestCase):
+    """测试Elo更新"""
+
+    def test_expected_score(self):
+        """测试：同分期望0.5，高分一方期望更高"""
+        self.assertAlmostEqual(EloRatings.expected_score(1500, 1500), 0.5)
+        self.assertAlmostEqual(EloRatings.expected_score(1900, 1500), 1 / 1.1)
+
+    def test_rate_zero_sum(self):
+        """测试：胜者加分、败者等量减分"""
+        elo = EloRatings(k_factor=32)
+        elo.rate('a', 'b', 1.0)
+        self.assertAlmostEqual(elo.rating('a'), 1516)
+        self.assertAlmostEqual(elo.rating('b'), 1484)
+
+        elo.rate('a', 'b', 0.5)
+        self.assertAlmostEqual(elo.rating('a') + elo.rating('b'), 3000)
+        self.assertEqual(elo.state['a'][1:], [2, 1, 0, 1])
+
+
+class TestRatingHistory(unittest.TestCase):
+    """测试检查点续算"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.battles = synthetic_battles(11)
+
+    def test_resume_matches_full_replay(self):
+        """测试：分两段续算与一次处理全部对战结果一致"""
+        full, _ = RatingHistory().run_period('2025-06-01', '2025-06-10', self.battles, KEYS, LABELS)
+
+        history = RatingHistory()
+        history.run_period('2025-06-01', '2025-06-05', self.battles, KEYS, LABELS)
+        resumed, start_state = history.run_period('2025-06-06', '2025-06-10', self.battles, KEYS, LABELS)
+
+        self.assertEqual(ratings_of(resumed), ratings_of(full))
+        self.assertTrue(start_state)
+
+    def test_rerun_earlier_period_recomputes_later(self):
+        """测试：先算7月、再补6月、再重算7月，与按时间顺序计算一致，7月的检查点不会丢失"""
+        june, july = self.battles, synthetic_battles(12, month=7)
+        in_order = RatingHistory()
+        in_order.run_period('2025-06-01', '2025-06-30', june, KEYS, LABELS)
+        expected, _ = in_order.run_period('2025-07-01', '2025-07-31', july, KEYS, LABELS)
+
+        history = RatingHistory()
+        history.run_period('2025-07-01', '2025-07-31', july, KEYS, LABELS)
+        history.run_period('2025-06-01', '2025-06-30', june, KEYS, LABELS)
+        self.assertEqual(history.days, in_order.days)
+        self.assertEqual(ratings_of(EloRatings(state=history.state_before('2025-08-01'))), ratings_of(expected))
+        rerun, _ = history.run_period('2025-07-01', '2025-07-31', july, KEYS, LABELS)
+        self.assertEqual(ratings_of(rerun), ratings_of(expected))
+
+        history.results.pop('2025-07-10')
+        with self.assertRaises(ValueError):
+            history.run_period('2025-06-01', '2025-06-30', june, KEYS, LABELS)
+
+    def test_save_and_load(self):
+        """测试：检查点保存后可继续计算"""
+        full, _ = RatingHistory().run_period('2025-06-01', '2025-06-10', self.battles, KEYS, LABELS)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ratings.json')
+            history = RatingHistory()
+            history.run_period('2025-06-01', '2025-06-04', self.battles, KEYS, LABELS)
+            history.save(path)
+
+            loaded = RatingHistory.load(path)
+            resumed, _ = loaded.run_period('2025-06-05', '2025-06-10', self.battles, KEYS, LABELS)
+            self.assertEqual(ratings_of(resumed), ratings_of(full))
+
+            with self.assertRaises(ValueError):
+                RatingHistory.load(path, k_factor=16)
+
+    def test_rating_table_period_changes(self):
+        """测试：排行只统计本周期的变化"""
+        history = RatingHistory()
+        history.run_period('2025-06-01', '2025-06-05', self.battles, KEYS, LABELS)
+        elo, start_state = history.run_period('2025-06-06', '2025-06-06', self.battles, KEYS, LABELS)
+        rows = rating_table(elo, start_state, history.names)
+
+        self.assertEqual(sum(r['battles'] for r in rows), 2 * 15)
+        self.assertAlmostEqual(sum(r['change'] for r in rows), 0, places=0)
+        self.assertEqual([r['rating'] for r in rows], sorted((r['rating'] for r in rows), reverse=True))
+        self.assertTrue(set(r['player_name'] for r in rows) <= set(LABELS))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证边获取边分析的流水线
+"""
+import unittest
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from fetch_pipeline import pipeline, run_fetch_pipeline, RawJsonWriter
+from niu_niu_analysis import analyze_messages
+from player_form import attach_form
+from test_chunked_analysis import multi_day_messages
+
+
+class TestPipeline(unittest.TestCase):
+    """测试生产者/消费者调度"""
+
+    def test_overlap(self):
+        """测试：获取和分析各耗时时，总耗时接近两者中较大的一个"""
+        delay, pages = 0.04, 8
+
+        def slow_pages():
+            for i in range(pages):
+                time.sleep(delay)
+                yield i
+
+        done = []
+        start = time.perf_counter()
+        asyncio.run(pipeline(slow_pages(), lambda page: (time.sleep(delay), done.append(page))))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(done, list(range(pages)))
+        self.assertLess(elapsed, 2 * delay * pages * 0.8)
+
+    def test_backpressure(self):
+        """测试：分析慢时获取最多领先 队列长度+2 页"""
+        lock = threading.Lock()
+        counts = {'produced': 0, 'consumed': 0, 'ahead': 0}
+
+        def pages():
+            for i in range(30):
+                with lock:
+                    counts['produced'] += 1
+                    counts['ahead'] = max(counts['ahead'], counts['produced'] - counts['consumed'])
+                yield i
+
+        def consume(page):
+            time.sleep(0.002)
+            with lock:
+                counts['consumed'] += 1
+
+        self.assertEqual(asyncio.run(pipeline(pages(), consume, queue_pages=2)), 30)
+        self.assertLessEqual(counts['ahead'], 2 + 2)
+
+    def test_consumer_error_propagates(self):
+        """测试：分析出错时异常抛出，获取不会无限等待"""
+        def consume(page):
+            raise RuntimeError('bad page')
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(pipeline(iter(range(100)), consume, queue_pages=1))
+
+    def test_producer_error_propagates(self):
+        """测试：获取出错时已获取的页先处理完，再抛出异常"""
+        def pages():
+            yield 1
+            yield 2
+            raise ConnectionError('offline')
+
+        done = []
+        with self.assertRaises(ConnectionError):
+            asyncio.run(pipeline(pages(), done.append))
+        self.assertEqual(done, [1, 2])
+
+
+class TestFetchPipeline(unittest.TestCase):
+    """测试流水线分析结果"""
+
+    def test_raw_json_format(self):
+        """测试：逐页写出的原始文件与json.dump(indent=2)一致"""
+        messages = multi_day_messages(5)
+        with tempfile.TemporaryDirectory() as tmp:
+            for data in (messages, []):
+                path = os.path.join(tmp, 'raw.json')
+                writer = RawJsonWriter(path)
+                writer.write_page(data[:7])
+                writer.write_page(data[7:])
+                writer.close()
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.assertEqual(f.read(), json.dumps(data, ensure_ascii=False, indent=2))
+
+    def test_matches_full_analysis(self):
+        """测试：按页分析的结果与一次性分析一致"""
+        messages = multi_day_messages(300, seed=4)
+        full = analyze_messages(messages)
+        attach_form(full.player_stats, full.valid_games, full.battles)
+
+        pages = (messages[i:i + 97] for i in range(0, len(messages), 97))
+        with tempfile.TemporaryDirectory() as tmp:
+            count, result = run_fetch_pipeline(pages, os.path.join(tmp, 'raw.json'),
+                                               os.path.join(tmp, 'spill'), queue_pages=2)
+
+        self.assertEqual(count, len(messages))
+        self.assertEqual(result.dice_records, full.dice_records)
+        self.assertEqual(result.valid_games, full.valid_games)
+        self.assertEqual(result.battles, full.battles)
+        self.assertEqual(result.player_stats, full.player_stats)
+
+    def test_keeps_raw_file_without_pages(self):
+        """测试：没有获取到消息或获取中途失败时，已有的原始数据文件不变"""
+        def failing_pages():
+            yield multi_day_messages(20)
+            raise ConnectionError('offline')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'raw.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[{"seq": 1}]')
+
+            count, result = run_fetch_pipeline(iter([]), path, os.path.join(tmp, 'spill'))
+            self.assertEqual((count, result.valid_games), (0, []))
+            with self.assertRaises(ConnectionError):
+                run_fetch_pipeline(failing_pages(), path, os.path.join(tmp, 'spill'))
+
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), '[{"seq": 1}]')
+            self.assertEqual(sorted(os.listdir(tmp)), ['raw.json'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证在线组局状态机
+"""
+import unittest
+import random
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from game_assembler import GameAssembler
+
+
+def reference_grouping(throws, window):
+    """原批量算法：按玩家收集全部骰子后滑动扫描"""
+    player_dice = {}
+    for seq, player, timestamp in throws:
+        player_dice.setdefault(player, []).append((seq, timestamp))
+
+    games = []
+    for player, dice_list in player_dice.items():
+        dice_list.sort()
+        i = 0
+        while i + 4 < len(dice_list):
+            if dice_list[i + 4][1] - dice_list[i][1] <= window:
+                games.append(tuple(seq for seq, _ in dice_list[i:i + 5]))
+                i += 5
+            else:
+                i += 1
+    return sorted(games)
+
+
+class TestGameAssembler(unittest.TestCase):
+    """测试组局器"""
+
+    def test_five_dice_within_window(self):
+        """测试：第5颗骰子落在窗口内立即成局"""
+        assembler = GameAssembler(window_seconds=30)
+        results = [assembler.push('A', 100 + i * 5, i) for i in range(5)]
+
+        self.assertEqual(results[:4], [None] * 4)
+        self.assertEqual(results[4], [0, 1, 2, 3, 4])
+        self.assertEqual(assembler.pending_players(), 0)
+
+    def test_window_exceeded_slides_forward(self):
+        """测试：超出窗口时丢弃最早的骰子继续滑动"""
+        assembler = GameAssembler(window_seconds=30)
+        timestamps = [0, 100, 105, 110, 115, 120]
+        results = [assembler.push('A', ts, ts) for ts in timestamps]
+
+        self.assertIsNone(results[4])
+        self.assertEqual(results[5], [100, 105, 110, 115, 120])
+
+    def test_players_are_independent(self):
+        """测试：不同玩家的骰子互不干扰"""
+        assembler = GameAssembler(window_seconds=30)
+        throws = []
+        for i in range(5):
+            throws.append(('A', i, ('A', i)))
+            throws.append(('B', i, ('B', i)))
+        games = list(assembler.feed(throws))
+
+        self.assertEqual(len(games), 2)
+        self.assertTrue(all(len({player for player, _ in game}) == 1 for game in games))
+
+    def test_stale_partial_sequences_evicted(self):
+        """测试：过期的未成局序列被淘汰，内存有界"""
+        assembler = GameAssembler(window_seconds=30)
+        for i in range(100):
+            assembler.push(f'P{i}', i * 60, i)
+
+        self.assertEqual(assembler.pending_players(), 1)
+        self.assertEqual(assembler.evicted_dice, 99)
+
+    def test_player_limit(self):
+        """测试：玩家上限淘汰最久未活动的玩家"""
+        assembler = GameAssembler(window_seconds=30, max_players=3)
+        for i in range(10):
+            assembler.push(f'P{i}', 0, i)
+
+        self.assertEqual(assembler.pending_players(), 3)
+
+    def test_matches_batch_grouping(self):
+        """测试：与原批量分组算法结果一致"""
+        rng = random.Random(20250623)
+        for _ in range(20):
+            throws = []
+            timestamp = 0
+            for seq in range(500):
+                timestamp += rng.choice([0, 1, 2, 3, 5, 8, 20, 45])
+                throws.append((seq, rng.choice('ABCD'), timestamp))
+
+            assembler = GameAssembler(window_seconds=30)
+            games = assembler.feed((player, ts, seq) for seq, player, ts in throws)
+            streamed = sorted(tuple(game) for game in games)
+
+            self.assertEqual(streamed, reference_grouping(throws, 30))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证静态HTML报告
+"""
+import unittest
+import json
+import re
+import sys
+import os
+import tempfile
+from datetime import date, timedelta
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from html_report import downsample, daily_figure, write_html_report, MAX_POINTS
+from stream_stats import StreamAccumulator, summarize_games
+from matchup_matrix import MatchupMatrix
+from niu_niu_analysis import analyze_messages, rank_players
+from test_chunked_analysis import multi_day_messages
+
+
+def report_figures(text):
+    """从HTML中取出图表JSON"""
+    payload = re.search(r'const figures = (.*);\n', text).group(1)
+    return json.loads(payload.replace('<\\/', '</'))
+
+
+class TestHtmlReport(unittest.TestCase):
+    """测试降采样和报告内容"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'report.html')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_downsample(self):
+        """测试：点数不超过上限，总和不变，短序列原样返回"""
+        labels = [str(i) for i in range(1000)]
+        values = list(range(1000))
+        x, y, size = downsample(labels, values, 180)
+        self.assertLessEqual(len(x), 180)
+        self.assertEqual(len(x), len(y))
+        self.assertEqual(sum(y), sum(values))
+        self.assertEqual((x[1], size), (labels[size], 6))
+        self.assertEqual(downsample(labels[:10], values[:10], 180), (labels[:10], values[:10], 1))
+
+    def test_year_long_series_stays_small(self):
+        """测试：两年的每日数据降采样到上限以内，报告只有几十KB"""
+        summary = StreamAccumulator()
+        start = date(2024, 1, 1)
+        for i in range(730):
+            summary.hist('date')[(start + timedelta(days=i)).isoformat()] = i % 50
+        summary.hist('result_type')['牛牛'] = 1
+        figure = daily_figure(summary)
+        self.assertLessEqual(len(figure['data'][0]['x']), MAX_POINTS)
+        self.assertEqual(sum(figure['data'][0]['y']), sum(i % 50 for i in range(730)))
+        self.assertIn('每5天', figure['layout']['title']['text'])
+
+        size = write_html_report(self.path, '2024-2025', {}, [], summary)
+        self.assertLess(size, 50 * 1024)
+
+    def test_report_contents(self):
+        """测试：报告包含排行榜、结果分布、每日局数和热力图，玩家昵称被转义"""
+        result = analyze_messages(multi_day_messages(120, seed=6))
+        players = rank_players(result.player_stats)
+        players[0] = ('</script><b>x', players[0][1])
+        summary = summarize_games(result.valid_games)
+        matrix = MatchupMatrix.from_battles(result.battles, result.registry.labels())
+        write_html_report(self.path, '<测试>', {'有效游戏': len(result.valid_games)}, players, summary, matrix)
+
+        with open(self.path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertEqual(text.count('</script>'), 2)
+        self.assertIn('&lt;测试&gt;', text)
+        figures = report_figures(text)
+        types = [figure['data'][0]['type'] for figure in figures]
+        self.assertEqual(types, ['bar', 'bar', 'bar', 'bar', 'bar', 'scatter', 'heatmap'])
+        self.assertEqual(figures[0]['data'][0]['x'][0], '</script><b>x')
+        self.assertEqual(sum(figures[3]['data'][0]['y']), len(result.valid_games))
+        self.assertEqual(sum(figures[5]['data'][0]['y']), len(result.valid_games))
+        heatmap = figures[6]['data'][0]
+        self.assertEqual(sum(map(sum, heatmap['customdata'])), 2 * len(result.battles))
+        self.assertFalse([name for name in os.listdir(os.path.dirname(self.path)) if name.endswith('.tmp')])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证对战矩阵
+"""
+import unittest
+import random
+import sys
+import os
+import csv
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from niu_niu_analysis import head_to_head
+from records import Battle
+
+try:
+    import numpy as np
+    from matchup_matrix import MatchupMatrix
+except ImportError:
+    np = None
+
+LABELS = ['甲', '乙', '丙', '丁', '戊']
+
+
+def synthetic_battles(seed, count=300):
+    """生成随机对战记录"""
+    rng = random.Random(seed)
+    battles = []
+    for _ in range(count):
+        p1, p2 = rng.sample(range(len(LABELS)), 2)
+        winner_id = rng.choice([p1, p2, None])
+        battles.append(Battle(
+            player1=LABELS[p1], player2=LABELS[p2],
+            player1_id=p1, player2_id=p2,
+            winner_id=winner_id,
+            winner='draw' if winner_id is None else LABELS[winner_id],
+        ))
+    return battles
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestMatchupMatrix(unittest.TestCase):
+    """测试N×N对战矩阵"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.battles = synthetic_battles(7)
+        self.matrix = MatchupMatrix.from_battles(self.battles, LABELS)
+
+    def test_matches_head_to_head(self):
+        """测试：Top-K组合与按组合名统计的结果一致"""
+        expected = {pair: (count, results) for pair, count, results in head_to_head(self.battles)}
+        top = self.matrix.top_pairs(len(expected))
+
+        self.assertEqual(len(top), len(expected))
+        self.assertEqual({pair: (count, results) for pair, count, results in top}, expected)
+        counts = [count for _, count, _ in top]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_top_k_partial(self):
+        """测试：只取前k个组合"""
+        full = self.matrix.top_pairs(10)
+        self.assertEqual([c for _, c, _ in self.matrix.top_pairs(3)], [c for _, c, _ in full[:3]])
+        self.assertEqual(self.matrix.top_pairs(0), [])
+
+    def test_ties_follow_first_seen(self):
+        """测试：对战次数相同时按首次出现排序，分批更新与head_to_head的结果和顺序一致"""
+        # 每对玩家都对战两次，首次出现的顺序与ID顺序无关
+        pairs = [(3, 4), (0, 1), (2, 0), (4, 1), (1, 3), (0, 4)]
+        battles = [Battle(player1=LABELS[p1], player2=LABELS[p2], player1_id=p1, player2_id=p2,
+                          winner_id=p1, winner=LABELS[p1])
+                   for p1, p2 in pairs + pairs[::-1]]
+        expected = head_to_head(battles)
+
+        matrix = MatchupMatrix(LABELS[:2])
+        for start in range(0, len(battles), 5):
+            matrix.resize(LABELS)
+            matrix.update(battles[start:start + 5])
+        self.assertEqual(matrix.top_pairs(len(pairs)), expected)
+        for k in range(1, len(pairs)):
+            self.assertEqual(matrix.top_pairs(k), expected[:k])
+
+    def test_matrix_invariants(self):
+        """测试：胜负互为转置、平局对称、总数等于对战数"""
+        np.testing.assert_array_equal(self.matrix.losses, self.matrix.wins.T)
+        np.testing.assert_array_equal(self.matrix.draws, self.matrix.draws.T)
+        self.assertEqual(int(self.matrix.games.sum()) // 2, len(self.battles))
+
+    def test_strength_of_schedule(self):
+        """测试：赛程强度为按对战次数加权的对手胜率"""
+        win_rates = self.matrix.win_rates()
+        games = self.matrix.games
+        schedule = self.matrix.strength_of_schedule()
+        for i in range(len(LABELS)):
+            expected = sum(games[i, j] * win_rates[j] for j in range(len(LABELS))) / games[i].sum()
+            self.assertAlmostEqual(schedule[i], expected)
+
+    def test_resize_and_update(self):
+        """测试：新玩家出现后扩展矩阵并继续累加"""
+        matrix = MatchupMatrix(LABELS[:2])
+        matrix.update([Battle(player1_id=0, player2_id=1, winner_id=0)])
+        with self.assertRaises(ValueError):
+            matrix.update([Battle(player1_id=0, player2_id=2, winner_id=None)])
+
+        matrix.resize(LABELS[:3])
+        matrix.update([Battle(player1_id=0, player2_id=2, winner_id=None)])
+        self.assertEqual(matrix.wins[0, 1], 1)
+        self.assertEqual(matrix.draws[2, 0], 1)
+
+    def test_write_csv(self):
+        """测试：导出完整矩阵CSV"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'h2h.csv')
+            self.matrix.write_csv(path)
+            with open(path, encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0][:len(LABELS) + 1], ['player'] + LABELS)
+        self.assertEqual(rows[1][1], '')  # 对角线为空
+        wins, losses, draws = map(int, rows[1][2].split('-'))
+        self.assertEqual((wins, losses, draws),
+                         (self.matrix.wins[0, 1], self.matrix.wins[1, 0], self.matrix.draws[0, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
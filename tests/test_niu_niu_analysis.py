@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证分析流水线各阶段
+"""
+import unittest
+import sys
+import os
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from niu_niu_analysis import (
+    time_range_bounds, extract_dice_records, assemble_games, match_battles,
+    build_player_stats, analyze_messages
+)
+
+# 骰子点数到微信gameext content值的映射
+DICE_TO_CONTENT = {1: '4', 2: '5', 3: '6', 4: '7', 5: '8', 6: '9'}
+
+
+def dice_message(seq, player, time_str, dice_value):
+    """构造一条type=47骰子动画消息"""
+    return {
+        'seq': seq,
+        'time': time_str,
+        'talker': 'test@chatroom',
+        'sender': f'wxid_{player}',
+        'sender_name': player,
+        'msg_type': 47,
+        'content': f'<msg><gameext type="2" content="{DICE_TO_CONTENT[dice_value]}"></gameext></msg>',
+    }
+
+
+def game_messages(start_seq, player, hour, minute, dice):
+    """构造同一玩家连续投掷5颗骰子的消息"""
+    return [
+        dice_message(start_seq + i, player, f'2025-06-23T{hour:02d}:{minute:02d}:{i * 3:02d}+08:00', value)
+        for i, value in enumerate(dice)
+    ]
+
+
+class TestTimeRangeBounds(unittest.TestCase):
+    """测试时间参数转换为日期范围"""
+
+    def test_bounds(self):
+        """测试：各种时间格式"""
+        cases = [
+            ('2025-06-23', (date(2025, 6, 23), date(2025, 6, 23))),
+            ('2025-02', (date(2025, 2, 1), date(2025, 2, 28))),
+            ('2025-Q2', (date(2025, 4, 1), date(2025, 6, 30))),
+            ('2025-Q4', (date(2025, 10, 1), date(2025, 12, 31))),
+            ('2025-H2', (date(2025, 7, 1), date(2025, 12, 31))),
+            ('2025', (date(2025, 1, 1), date(2025, 12, 31))),
+            ('2025-06-01,2025-06-30', (date(2025, 6, 1), date(2025, 6, 30))),
+        ]
+        for time_param, expected in cases:
+            with self.subTest(time_param=time_param):
+                self.assertEqual(time_range_bounds(time_param), expected)
+
+
+class TestAnalysisPipeline(unittest.TestCase):
+    """测试骰子提取、组局、对战和统计"""
+
+    def setUp(self):
+        """测试前准备：两名玩家各投一局构成一轮对战"""
+        self.messages = (
+            game_messages(100, '甲', 21, 0, [3, 2, 5, 6, 4])    # 牛牛
+            + game_messages(200, '乙', 21, 1, [1, 4, 5, 2, 3])  # 牛5
+            + [{'seq': 300, 'time': '2025-06-23T21:02:00+08:00', 'msg_type': 1,
+                'sender_name': '甲', 'content': '再来'}]
+        )
+
+    def test_extract_dice_records(self):
+        """测试：只提取type=47的gameext骰子"""
+        records = extract_dice_records(self.messages)
+        self.assertEqual(len(records), 10)
+        self.assertEqual([r['dice_value'] for r in records[:5]], [3, 2, 5, 6, 4])
+        self.assertEqual(records[0]['date'], '2025-06-23')
+
+    def test_games_and_battles(self):
+        """测试：组局与对战判定"""
+        games = assemble_games(extract_dice_records(self.messages))
+        self.assertEqual([g['result_type'] for g in games], ['牛牛', '牛5'])
+
+        battles = match_battles(games)
+        self.assertEqual(len(battles), 1)
+        self.assertEqual(battles[0]['winner'], '甲')
+
+    def test_battle_window_across_midnight(self):
+        """测试：跨零点的相邻两局按时间戳判定对战"""
+        messages = [
+            dice_message(i, '甲', f'2025-06-23T23:59:{50 + i}+08:00', 3) for i in range(5)
+        ] + [
+            dice_message(10 + i, '乙', f'2025-06-24T00:00:{10 + i}+08:00', 2) for i in range(5)
+        ]
+        result = analyze_messages(messages)
+        self.assertEqual(len(result.valid_games), 2)
+        self.assertEqual(len(result.battles), 1)
+
+    def test_player_stats(self):
+        """测试：玩家统计汇总"""
+        result = analyze_messages(self.messages)
+        stats = build_player_stats(result.valid_games, result.battles)
+
+        self.assertEqual(stats['甲']['total_points'], 3)
+        self.assertEqual(stats['甲']['battles_won'], 1)
+        self.assertEqual(stats['乙']['battles_lost'], 1)
+        self.assertEqual(stats['甲']['win_rate'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
\ No newline at end of file
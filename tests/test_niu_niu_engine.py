@@ -85,6 +85,14 @@ class TestNiuNiuEngine(unittest.TestCase):
                 self.assertEqual(result.type, expected_type)
                 self.assertEqual(result.value, expected_value)
                 
+    def test_niu_result_without_baozi(self):
+        """测试：calculate_niu_result不判定豹子，其余结果与calculate_result一致"""
+        self.assertEqual(self.engine.calculate_result([5, 5, 5, 5, 5]).type, "豹子")
+        self.assertEqual(self.engine.calculate_niu_result([5, 5, 5, 5, 5]).type, "没牛")
+        for dice in ([1, 3, 6, 5, 6], [2, 4, 4, 3, 7], [1, 1, 2, 3, 6]):
+            with self.subTest(dice=dice):
+                self.assertEqual(self.engine.calculate_niu_result(dice), self.engine.calculate_result(dice))
+                
     def test_multiple_niu_combinations(self):
         """测试：多种牛牛组合的情况，应选择最佳结果"""
         # 例如：[2, 4, 4, 3, 7] 可以有多种组合
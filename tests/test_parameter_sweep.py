@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证窗口/置信度阈值参数扫描
+"""
+import unittest
+import random
+import sys
+import os
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from niu_niu_analysis import analyze_messages, rank_players, GAME_WINDOW_SECONDS, BATTLE_WINDOW_SECONDS
+from optimized_chatlog_importer import OptimizedChatlogImporter
+from parameter_sweep import prepare_sweep, run_setting, run_sweep, kendall_tau
+from test_niu_niu_analysis import dice_message
+
+
+def standardized(messages):
+    """与导入器标准化后的消息一样补上毫秒时间戳和日期时间"""
+    for message in messages:
+        parsed = datetime.fromisoformat(message['time'])
+        message['timestamp'] = int(parsed.timestamp() * 1000)
+        message['datetime'] = parsed.strftime('%Y-%m-%d %H:%M:%S')
+    return messages
+
+
+def irregular_messages(seed=3, games=60):
+    """构造投掷间隔和对战间隔不规则的多人游戏消息"""
+    rng = random.Random(seed)
+    messages, seq, clock = [], 1, 0
+    for _ in range(games):
+        player = rng.choice('甲乙丙')
+        clock += rng.choice([20, 90, 200, 400])
+        for _ in range(5):
+            clock += rng.randint(1, 12)
+            minutes, seconds = divmod(clock, 60)
+            hours, minutes = divmod(minutes, 60)
+            messages.append(dice_message(seq, player, f'2025-06-23T{hours:02d}:{minutes:02d}:{seconds:02d}+08:00',
+                                         rng.randint(1, 6)))
+            seq += 1
+    return standardized(messages)
+
+
+class TestParameterSweep(unittest.TestCase):
+    """测试扫描结果"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.messages = irregular_messages()
+        cls.data = prepare_sweep(cls.messages)
+
+    def test_baseline_matches_analysis(self):
+        """测试：当前参数（不过滤）的游戏数、对战数和排名与完整分析一致"""
+        result = analyze_messages(self.messages)
+        row = run_setting(self.data, 0.0, GAME_WINDOW_SECONDS, [BATTLE_WINDOW_SECONDS])[0]
+        self.assertEqual(row['games'], len(result.valid_games))
+        self.assertEqual(row['battles'], len(result.battles))
+        self.assertEqual(row['draws'], sum(1 for b in result.battles if b['winner'] == 'draw'))
+        self.assertEqual(row['_avg_ranking'], [name for name, _ in rank_players(result.player_stats)])
+
+    def test_windows_change_counts(self):
+        """测试：窗口越大，成局数和对战数不减少"""
+        rows = run_setting(self.data, 0.0, 60, [30, 300, 3600])
+        self.assertEqual(len({row['games'] for row in rows}), 1)
+        self.assertLess(rows[0]['battles'], rows[2]['battles'])
+        narrow = run_setting(self.data, 0.0, 10, [300])[0]
+        self.assertLess(narrow['games'], rows[0]['games'])
+
+    def test_grid_parallel_matches_serial(self):
+        """测试：进程池并行与串行结果一致，基准行的排名稳定性为1"""
+        grid = ([10, 30, 60], [120, 300], [0.0, 0.9])
+        serial = run_sweep(self.data, *grid, workers=1)
+        parallel = run_sweep(self.data, *grid, workers=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(serial), 12)
+
+        baseline = [row for row in serial if row['is_baseline']]
+        self.assertEqual(len(baseline), 1)
+        self.assertEqual(baseline[0]['avg_rank_tau'], 1.0)
+        strict = [row for row in serial if row['confidence_threshold'] == 0.9]
+        self.assertTrue(all(row['dice_kept'] <= baseline[0]['dice_kept'] for row in strict))
+
+    def test_empty_grid_rejected(self):
+        """测试：任一网格为空时报错，而不是在选基准行时越界"""
+        for grid in (([], [300], [0.0]), ([30], [], [0.0]), ([30], [300], [])):
+            with self.subTest(grid=grid):
+                with self.assertRaises(ValueError):
+                    run_sweep(self.data, *grid, workers=1)
+
+    def test_confidence_matches_smart_filter(self):
+        """测试：置信度与导入器智能过滤一致，上下文包含表情/MD5消息"""
+        # 两次投掷相隔400秒，中间有另一玩家的表情消息（MD5 + contents中的点数）
+        emoji = {**dice_message(2, '乙', '2025-06-23T10:06:30+08:00', 1),
+                 'content': '<msg><emoji md5="0123456789abcdef0123456789abcdef"/></msg>', 'contents': {'content': '3'}}
+        messages = standardized([dice_message(1, '甲', '2025-06-23T10:00:00+08:00', 2), emoji,
+                                 dice_message(3, '甲', '2025-06-23T10:06:40+08:00', 5)])
+        importer = OptimizedChatlogImporter()
+        with redirect_stdout(StringIO()):
+            filtered = importer._apply_smart_filter(importer._pre_filter_dice_messages(messages), 0.0)
+        expected = {msg.seq: msg.confidence_score for msg in filtered}
+
+        self.assertEqual(prepare_sweep(messages).confidences, [expected[1], expected[3]])
+        # 只以骰子动画为上下文时，第二次投掷是间隔过长的单人投掷，置信度更低
+        dice_only = importer.score_message_confidences([messages[0], messages[2]])
+        self.assertLess(dice_only[3], expected[3])
+
+    def test_kendall_tau(self):
+        """测试：排名相关系数"""
+        self.assertEqual(kendall_tau(['a', 'b', 'c'], ['a', 'b', 'c']), 1.0)
+        self.assertEqual(kendall_tau(['a', 'b', 'c'], ['c', 'b', 'a']), -1.0)
+        self.assertAlmostEqual(kendall_tau(['a', 'b', 'c', 'd'], ['b', 'a', 'c']), 1 / 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
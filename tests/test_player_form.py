@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证连胜连败和近期状态
+"""
+import unittest
+import random
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from player_form import PlayerForm, FormTracker, attach_form
+from records import Game, Battle
+
+
+def longest_run(outcomes, value):
+    """直接扫描求最长连续value"""
+    best = run = 0
+    for outcome in outcomes:
+        run = run + 1 if outcome == value else 0
+        best = max(best, run)
+    return best
+
+
+class TestPlayerForm(unittest.TestCase):
+    """测试单个玩家的滚动指标"""
+
+    def test_matches_rescan(self):
+        """测试：滚动更新与重新扫描结果一致"""
+        rng = random.Random(3)
+        form = PlayerForm(window=10)
+        points, outcomes = [], []
+        for _ in range(200):
+            points.append(rng.choice([0, 1, 1, 2, 3, 5]))
+            outcomes.append(rng.choice([1, 1, -1, 0]))
+            form.add_game(points[-1])
+            form.add_outcome(outcomes[-1])
+
+            summary = form.summary()
+            recent = outcomes[-10:]
+            decisive = [o for o in recent if o != 0]
+            self.assertAlmostEqual(summary['recent_avg_points'], sum(points[-10:]) / len(points[-10:]))
+            self.assertAlmostEqual(summary['recent_win_rate'],
+                                   recent.count(1) / len(decisive) * 100 if decisive else 0)
+            self.assertEqual(summary['longest_win_streak'], longest_run(outcomes, 1))
+            self.assertEqual(summary['longest_loss_streak'], longest_run(outcomes, -1))
+
+    def test_streak_and_form(self):
+        """测试：当前连胜、平局中断连胜和冷热判定"""
+        form = PlayerForm(window=4)
+        for outcome in [1, 1, 0, 1, 1, 1]:
+            form.add_outcome(outcome)
+        summary = form.summary()
+        self.assertEqual(summary['current_streak'], 3)
+        self.assertEqual(summary['longest_win_streak'], 3)
+        self.assertEqual(summary['form'], 'hot')
+
+        for outcome in [-1, -1, -1, -1]:
+            form.add_outcome(outcome)
+        summary = form.summary()
+        self.assertEqual(summary['current_streak'], -4)
+        self.assertEqual(summary['form'], 'cold')
+
+    def test_too_few_battles_is_steady(self):
+        """测试：近期分出胜负的对战太少时不判定冷热"""
+        form = PlayerForm(window=10)
+        for outcome in [1, 1, 1, 0, 0]:
+            form.add_outcome(outcome)
+        self.assertEqual(form.summary()['form'], 'steady')
+
+
+class TestFormTracker(unittest.TestCase):
+    """测试按玩家汇总"""
+
+    def test_attach_form(self):
+        """测试：对战双方得到相反的结果并合并进玩家统计"""
+        games = [
+            Game(player_id=0, player_name='甲', score_points=3),
+            Game(player_id=1, player_name='乙', score_points=1),
+        ]
+        battles = [Battle(player1='甲', player2='乙', player1_id=0, player2_id=1, winner_id=0)]
+        stats = attach_form({'甲': {}, '乙': {}}, games, battles)
+
+        self.assertEqual(stats['甲']['current_streak'], 1)
+        self.assertEqual(stats['乙']['current_streak'], -1)
+        self.assertEqual(stats['甲']['recent_avg_points'], 3)
+        self.assertEqual(len(FormTracker().feed(games, battles).players), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
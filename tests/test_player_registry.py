@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证玩家身份登记和按ID的统计
+"""
+import unittest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from player_registry import PlayerRegistry
+from niu_niu_analysis import analyze_messages, head_to_head
+from test_niu_niu_analysis import dice_message, game_messages
+
+
+class TestPlayerRegistry(unittest.TestCase):
+    """测试发送者ID到整数ID的映射"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = PlayerRegistry()
+
+    def test_dense_ids(self):
+        """测试：按首次出现顺序分配连续ID"""
+        ids = [self.registry.intern(sender, name) for sender, name in
+               [('wxid_a', '甲'), ('wxid_b', '乙'), ('wxid_a', '甲'), ('wxid_c', '丙')]]
+        self.assertEqual(ids, [0, 1, 0, 2])
+        self.assertEqual(len(self.registry), 3)
+        self.assertEqual(self.registry.id_of('wxid_b'), 1)
+        self.assertIsNone(self.registry.id_of('wxid_x'))
+
+    def test_rename_keeps_id(self):
+        """测试：改名后ID不变，显示最新昵称"""
+        first = self.registry.intern('wxid_a', '旧名', 100)
+        second = self.registry.intern('wxid_a', '新名', 200)
+        self.registry.intern('wxid_a', '旧名', 150)  # 更早的消息不覆盖最新昵称
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.registry.label(first), '新名')
+
+    def test_missing_sender_falls_back_to_name(self):
+        """测试：缺少发送者ID时按昵称识别"""
+        first = self.registry.intern('', '甲')
+        self.assertEqual(self.registry.intern('', '甲'), first)
+        self.assertNotEqual(self.registry.intern('', '乙'), first)
+
+    def test_duplicate_names_disambiguated(self):
+        """测试：不同玩家同名时显示名附加ID后缀"""
+        a = self.registry.intern('wxid_aaaa1111', '小明')
+        b = self.registry.intern('wxid_bbbb2222', '小明')
+        self.assertNotEqual(self.registry.label(a), self.registry.label(b))
+        self.assertTrue(self.registry.label(a).startswith('小明'))
+
+
+class TestRenamedPlayerStats(unittest.TestCase):
+    """测试改名玩家的统计不被拆分"""
+
+    def test_rename_merges_stats(self):
+        """测试：同一发送者改名前后的游戏合并统计"""
+        renamed = [dict(msg, sender_name='甲2号') for msg in game_messages(300, '甲', 22, 0, [1, 4, 5, 2, 3])]
+        messages = (
+            game_messages(100, '甲', 21, 0, [3, 2, 5, 6, 4])
+            + game_messages(200, '乙', 21, 1, [1, 4, 5, 2, 3])
+            + renamed
+        )
+        result = analyze_messages(messages)
+
+        self.assertEqual(set(result.player_stats), {'甲2号', '乙'})
+        self.assertEqual(result.player_stats['甲2号']['total_games'], 2)
+        self.assertEqual(result.battles[0]['winner'], '甲2号')
+
+    def test_head_to_head_orientation(self):
+        """测试：对战组合的胜场对应组合中的玩家顺序"""
+        messages = (
+            game_messages(100, '乙', 21, 0, [3, 2, 5, 6, 4])    # 牛牛
+            + game_messages(200, '甲', 21, 1, [1, 4, 5, 2, 3])  # 牛5
+            + game_messages(300, '甲', 21, 10, [3, 2, 5, 6, 4])
+            + game_messages(400, '乙', 21, 11, [1, 1, 1, 1, 2])  # 没牛
+        )
+        result = analyze_messages(messages)
+        pair, count, results = head_to_head(result.battles)[0]
+
+        self.assertEqual(pair, '乙 vs 甲')
+        self.assertEqual(count, 2)
+        self.assertEqual(results, {'p1_wins': 1, 'p2_wins': 1, 'draws': 0})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
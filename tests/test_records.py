@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证slotted记录类型
+"""
+import unittest
+import json
+import pickle
+import tracemalloc
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from records import RawMessage, DiceThrow, Game, Battle, json_default
+from niu_niu_analysis import analyze_messages
+from test_chunked_analysis import multi_day_messages
+
+
+def throw_fields(i):
+    return {'seq': i, 'date': '2025-06-01', 'time': '12:00:00', 'timestamp': 1748750400 + i,
+            'player_id': 3, 'player_name': '甲', 'content_value': '4', 'dice_value': 3}
+
+
+class TestRecords(unittest.TestCase):
+    """测试记录的按键兼容、序列化和内存占用"""
+
+    def test_key_access(self):
+        """测试：按键读写、get、in与属性一致，未知字段抛KeyError"""
+        throw = DiceThrow(**throw_fields(7))
+        self.assertEqual(throw['seq'], throw.seq)
+        self.assertEqual(throw.get('dice_value'), 3)
+        self.assertIsNone(throw.get('content'))
+        self.assertIn('player_name', throw)
+        self.assertNotIn('content', throw)
+        throw['dice_value'] = 6
+        self.assertEqual(throw.dice_value, 6)
+        with self.assertRaises(KeyError):
+            throw['content']
+        with self.assertRaises(AttributeError):
+            throw.extra = 1
+
+    def test_dict_equivalence(self):
+        """测试：to_dict、与字典比较和JSON输出与原来的字典记录一致"""
+        fields = throw_fields(1)
+        throw = DiceThrow(**fields)
+        self.assertEqual(throw.to_dict(), fields)
+        self.assertEqual(throw, fields)
+        self.assertEqual(throw, DiceThrow(**fields))
+        self.assertEqual(json.dumps([throw], ensure_ascii=False, default=json_default),
+                         json.dumps([fields], ensure_ascii=False))
+        message = RawMessage(seq=1, sender='wxid_a', contents={'k': 'v'})
+        self.assertEqual(json.loads(json.dumps(message, default=json_default))['contents'], {'k': 'v'})
+
+    def test_pickle_round_trip(self):
+        """测试：分析结果（分析缓存的内容）pickle往返不变"""
+        result = analyze_messages(multi_day_messages(40, seed=2))
+        for records in (result.dice_records, result.valid_games, result.battles):
+            self.assertTrue(records)
+            self.assertEqual(pickle.loads(pickle.dumps(records)), records)
+        game = result.valid_games[0]
+        self.assertIsInstance(game, Game)
+        self.assertIsInstance(game.dice_values, tuple)
+        self.assertIsInstance(result.battles[0], Battle)
+
+    def test_interned_strings(self):
+        """测试：重复的发送者和日期字符串驻留为同一对象"""
+        a = DiceThrow(date=''.join(['2025-', '06-01']), player_name=''.join(['甲', '乙']))
+        b = DiceThrow(date=''.join(['2025-', '06-01']), player_name=''.join(['甲', '乙']))
+        self.assertIs(a.date, b.date)
+        self.assertIs(a.player_name, b.player_name)
+        self.assertIsNone(RawMessage(sender=None).sender)
+
+    def test_memory_smaller_than_dicts(self):
+        """测试：10万条骰子记录的内存不到字典的一半"""
+        def measure(build):
+            tracemalloc.start()
+            items = [build(throw_fields(i)) for i in range(100000)]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del items
+            return size
+
+        dict_size = measure(dict)
+        record_size = measure(lambda fields: DiceThrow(**fields))
+        self.assertLess(record_size * 2, dict_size)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
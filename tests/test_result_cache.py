@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证结果缓存与统计查询服务
+"""
+import unittest
+import json
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from result_cache import LRUResultCache
+from stats_server import MessageStore, StatsService
+from test_niu_niu_analysis import game_messages
+
+
+class TestLRUResultCache(unittest.TestCase):
+    """测试LRU结果缓存"""
+
+    def test_lru_eviction(self):
+        """测试：超出容量时淘汰最久未使用的条目"""
+        cache = LRUResultCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_etag_follows_key(self):
+        """测试：ETag由缓存键决定，高水位变化则ETag变化"""
+        cache = LRUResultCache()
+        etag1 = cache.put(('g', '2025-06-01', '2025-06-30', 100), {})
+        etag2 = cache.put(('g', '2025-06-01', '2025-06-30', 101), {})
+
+        self.assertNotEqual(etag1, etag2)
+        self.assertEqual(etag1, LRUResultCache.make_etag(('g', '2025-06-01', '2025-06-30', 100)))
+
+    def test_get_or_compute(self):
+        """测试：命中时不重复计算"""
+        cache = LRUResultCache()
+        calls = []
+        for _ in range(3):
+            cache.get_or_compute('k', lambda: calls.append(1) or 'value')
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+
+class TestStatsService(unittest.TestCase):
+    """测试基于归档文件的统计查询"""
+
+    def setUp(self):
+        """测试前准备：写入一份原始消息归档"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmpdir.name, 'raw_messages_2025_06.json')
+        messages = (game_messages(100, '甲', 21, 0, [3, 2, 5, 6, 4])
+                    + game_messages(200, '乙', 21, 1, [1, 4, 5, 2, 3]))
+        self.write_archive(self.archive, messages)
+        self.service = StatsService(MessageStore(self.tmpdir.name))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @staticmethod
+    def write_archive(path, messages):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(messages, f, ensure_ascii=False)
+
+    def test_query_is_cached(self):
+        """测试：相同查询命中缓存"""
+        etag1, summary = self.service.query('test@chatroom', '2025-06')
+        etag2, _ = self.service.query('test@chatroom', '2025-06-01,2025-06-30')
+
+        self.assertEqual(etag1, etag2)
+        self.assertEqual(summary['overview']['games'], 2)
+        self.assertEqual(summary['rankings']['activity'][0], '甲')
+        self.assertEqual(self.service.cache.stats()['hits'], 1)
+
+    def test_rewritten_older_period_invalidates(self):
+        """测试：改写较早时段的归档（高水位不变）后，重新查询得到新结果和新ETag"""
+        later = os.path.join(self.tmpdir.name, 'raw_messages_2025_07.json')
+        july = game_messages(900, '丙', 21, 2, [6, 6, 6, 2, 1])
+        for msg in july:
+            msg['time'] = msg['time'].replace('2025-06-23', '2025-07-02')
+        self.write_archive(later, july)
+        etag1, summary = self.service.query('test@chatroom', '2025-06')
+        self.assertEqual(summary['overview']['games'], 2)
+
+        self.write_archive(self.archive, game_messages(100, '甲', 21, 0, [3, 2, 5, 6, 4]))
+        etag2, summary = self.service.query('test@chatroom', '2025-06')
+
+        self.assertEqual(self.service.store.high_water_mark('test@chatroom'), 904)
+        self.assertNotEqual(etag1, etag2)
+        self.assertEqual(summary['overview']['games'], 1)
+        self.assertEqual(summary['rankings']['activity'], ['甲'])
+
+    def test_out_of_range_query(self):
+        """测试：范围外没有数据"""
+        _, summary = self.service.query('test@chatroom', '2025-07')
+        self.assertEqual(summary['overview']['messages'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证规则集编译和多规则集评估
+"""
+import unittest
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from niu_niu_engine import NiuNiuEngine
+from niu_niu_analysis import analyze_messages, calculate_score_points
+from rule_sets import RuleSet, hand_index, load_rule_sets, evaluate_rule_sets, HAND_COUNT
+from records import Game
+from test_niu_niu_analysis import game_messages
+
+
+class TestCompiledRuleSet(unittest.TestCase):
+    """测试查找表"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.standard = RuleSet().compile()
+
+    def test_standard_matches_engine(self):
+        """测试：标准规则的查找表与引擎和计分函数逐手一致"""
+        engine = NiuNiuEngine()
+        self.assertEqual(len(self.standard.points), HAND_COUNT)
+        for index in range(0, HAND_COUNT, 7):
+            dice = [index // 6 ** (4 - i) % 6 + 1 for i in range(5)]
+            self.assertEqual(hand_index(dice), index)
+            result = engine.calculate_result(dice)
+            self.assertEqual(self.standard.result_type(dice), result.type)
+            self.assertEqual(self.standard.points[index], calculate_score_points(result.type, result.value))
+
+    def test_baozi_definition(self):
+        """测试：豹子定义（四颗相同算豹子、不设豹子）"""
+        four_same = RuleSet(name='four', baozi_min_same=4).compile()
+        self.assertEqual(four_same.result_type([2, 2, 2, 2, 5]), '豹子')
+        self.assertNotEqual(self.standard.result_type([2, 2, 2, 2, 5]), '豹子')
+        no_baozi = RuleSet(name='none', baozi_min_same=0).compile()
+        self.assertEqual(no_baozi.result_type([5, 5, 5, 5, 5]), '没牛')
+
+    def test_tie_break_order(self):
+        """测试：得分相同时按rank再按点数和比较"""
+        rules = RuleSet(name='strict', tie_break=['points', 'rank', 'dice_sum']).compile()
+        niu9, niu8 = hand_index([4, 5, 5, 4, 1]), hand_index([3, 3, 4, 4, 4])
+        self.assertEqual(rules.points[niu9], rules.points[niu8])
+        self.assertGreater(rules.strength[niu9], rules.strength[niu8])
+        self.assertEqual(self.standard.strength[niu9], self.standard.strength[niu8])
+
+    def test_invalid_config(self):
+        """测试：非法配置报错"""
+        with self.assertRaises(ValueError):
+            RuleSet.from_dict({'name': 'x', 'scoring': {'牛10': 1}})
+        with self.assertRaises(ValueError):
+            RuleSet.from_dict({'name': 'x', 'tie_break': ['luck']})
+
+
+class TestEvaluateRuleSets(unittest.TestCase):
+    """测试一次遍历评估多个规则集"""
+
+    def setUp(self):
+        """测试前准备：两名玩家的三轮对战（含一次牛9对牛8）"""
+        messages = (game_messages(100, '甲', 21, 0, [4, 5, 5, 4, 1])
+                    + game_messages(200, '乙', 21, 1, [3, 3, 4, 4, 4])
+                    + game_messages(300, '甲', 21, 20, [3, 2, 5, 6, 4])
+                    + game_messages(400, '乙', 21, 21, [1, 1, 1, 2, 3]))
+        self.result = analyze_messages(messages)
+
+    def test_standard_matches_analysis(self):
+        """测试：标准规则的评估结果与现有分析一致"""
+        results = evaluate_rule_sets(self.result.valid_games, [RuleSet().compile()],
+                                     self.result.registry.labels())['standard']
+        for player, stats in self.result.player_stats.items():
+            for name in ('total_games', 'battles_won', 'battles_lost', 'battles_draw'):
+                self.assertEqual(results[player][name], stats[name])
+            self.assertAlmostEqual(results[player]['avg_points'], stats['avg_points'])
+
+    def test_rule_sets_from_file(self):
+        """测试：从文件加载的多个规则集得到不同的胜负"""
+        config = [{'name': 'standard'},
+                  {'name': 'strict', 'scoring': {'牛牛': 4}, 'tie_break': ['points', 'rank']}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False)
+            rule_sets = load_rule_sets(path)
+
+        results = evaluate_rule_sets(self.result.valid_games, [r.compile() for r in rule_sets],
+                                     self.result.registry.labels())
+        self.assertEqual(results['standard']['甲']['battles_draw'], 1)
+        self.assertEqual(results['strict']['甲']['battles_won'], 2)
+        self.assertEqual(results['strict']['甲']['total_points'], 6)
+
+    def test_keyed_by_registry_labels(self):
+        """测试：结果按登记表的显示名输出，不使用游戏记录中过时的昵称（如分块分析中改名前的局）"""
+        games = [Game(**game.to_dict()) for game in self.result.valid_games]
+        games[0].player_name = '旧名'
+        labels = ['新甲' if label == '甲' else label for label in self.result.registry.labels()]
+
+        results = evaluate_rule_sets(games, [RuleSet().compile()], labels)['standard']
+        self.assertEqual(set(results), {'新甲', '乙'})
+        self.assertEqual(results['新甲']['total_games'], 2)
+
+    def test_duplicate_names_rejected(self):
+        """测试：规则集重名报错"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([{'name': 'a'}, {'name': 'a'}], f)
+            with self.assertRaises(ValueError):
+                load_rule_sets(path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证按seq去重和缺口检测
+"""
+import unittest
+import random
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from seq_tracker import SeqTracker
+
+
+class TestSeqTracker(unittest.TestCase):
+    """测试seq跟踪器"""
+
+    def test_add_and_duplicates(self):
+        """测试：首次出现返回True，重复返回False并计数，跨64位块边界正确"""
+        tracker = SeqTracker()
+        for seq in (63, 64, 1, 10 ** 12):
+            self.assertTrue(tracker.add(seq))
+        self.assertFalse(tracker.add(64))
+        self.assertFalse(tracker.add(10 ** 12))
+        self.assertEqual((tracker.unique, tracker.duplicates), (4, 2))
+        self.assertIn(63, tracker)
+        self.assertNotIn(65, tracker)
+        self.assertEqual((tracker.low, tracker.high), (1, 10 ** 12))
+
+    def test_gaps_match_brute_force(self):
+        """测试：随机乱序、重复送入时，缺口与逐个检查一致"""
+        rng = random.Random(3)
+        seqs = [s for s in range(500, 2500) if rng.random() > 0.05]
+        stream = seqs + rng.sample(seqs, 300)
+        rng.shuffle(stream)
+
+        tracker = SeqTracker()
+        for seq in stream:
+            tracker.add(seq)
+
+        present = set(seqs)
+        missing = [s for s in range(500, 2500) if s not in present and min(seqs) < s < max(seqs)]
+        expanded = [s for a, b in tracker.gaps() for s in range(a, b + 1)]
+        self.assertEqual(expanded, missing)
+        self.assertEqual(tracker.missing, len(missing))
+        self.assertEqual(tracker.duplicates, 300)
+
+    def test_filter_streaming(self):
+        """测试：分页重叠时逐页过滤，保留首次出现的消息；没有seq的消息按内容判重"""
+        pages = [
+            [{'seq': 1}, {'seq': 2}, {'seq': 3}],
+            [{'seq': 3}, {'seq': 4}, {'seq': 7}],
+            [{'seq': 0, 'time': 't', 'sender': 'a', 'content': 'x'},
+             {'seq': 0, 'time': 't', 'sender': 'a', 'content': 'x'}, {'seq': 2}],
+        ]
+        tracker = SeqTracker()
+        kept = [m.get('seq') for page in pages for m in tracker.filter(page)]
+        self.assertEqual(kept, [1, 2, 3, 4, 7, 0])
+        self.assertEqual(tracker.duplicates, 3)
+        self.assertEqual(tracker.gaps(), [(5, 6)])
+        self.assertEqual(tracker.describe(), "重复 3 条, seq缺口 1 处共 2 条 (5-6)")
+
+    def test_empty_and_contiguous(self):
+        """测试：空跟踪器和连续seq没有缺口"""
+        self.assertEqual(SeqTracker().gaps(), [])
+        tracker = SeqTracker()
+        tracker.filter({'seq': s} for s in range(1, 1000))
+        self.assertEqual(tracker.missing, 0)
+        self.assertEqual(tracker.describe(), "重复 0 条, seq连续")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证按时间分片并行获取
+"""
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from sharded_fetch import plan_shards, merge_messages, fetch_sharded, ShardCache
+
+
+def shard_messages(shard):
+    """每个分片一天一条消息，seq由日期决定（用于检查合并结果）"""
+    start, _, end = shard.partition(',')
+    first, last = date.fromisoformat(start), date.fromisoformat(end or start)
+    return [{'seq': day, 'time': f'{date.fromordinal(day).isoformat()}T12:00:00+08:00',
+             'sender': 'wxid_a', 'content': 'x'}
+            for day in range(first.toordinal(), last.toordinal() + 1)]
+
+
+class FakeFetcher:
+    """按分片返回两页消息，记录调用次数和最大并发数"""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, shard):
+        with self.lock:
+            self.calls.append(shard)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if shard in self.fail:
+                raise ConnectionError('timeout')
+            messages = shard_messages(shard)
+            yield messages[:1]
+            yield messages[1:]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestPlanShards(unittest.TestCase):
+    """测试分片规划"""
+
+    def test_quarter_weeks(self):
+        """测试：季度按自然周切分，首尾周截断，分片连续覆盖整个范围"""
+        shards = plan_shards('2025-Q2', 'week')
+        self.assertEqual(shards[0][0], '2025-04-01,2025-04-06')
+        self.assertEqual(shards[-1][0], '2025-06-30')
+        self.assertEqual(shards[0][1], date(2025, 4, 1))
+        for (_, _, end), (_, start, _) in zip(shards, shards[1:]):
+            self.assertEqual(start.toordinal(), end.toordinal() + 1)
+            self.assertEqual(start.weekday(), 0)
+        self.assertEqual(len(shards), 14)
+
+    def test_days_and_custom(self):
+        """测试：按天切分以及自定义范围、单日、年份"""
+        self.assertEqual(len(plan_shards('2024', 'day')), 366)
+        self.assertEqual(len(plan_shards('2025-H1', 'day')), 181)
+        self.assertEqual([s[0] for s in plan_shards('2025-06-06,2025-06-10', 'week')],
+                         ['2025-06-06,2025-06-08', '2025-06-09,2025-06-10'])
+        self.assertEqual([s[0] for s in plan_shards('2025-06-23', 'week')], ['2025-06-23'])
+        with self.assertRaises(ValueError):
+            plan_shards('2025-06', 'month')
+
+
+class TestFetchSharded(unittest.TestCase):
+    """测试并行获取、合并去重和分片缓存"""
+
+    def test_merge_dedup(self):
+        """测试：重复的seq只保留一条，结果按seq排序"""
+        a = [{'seq': 3, 'content': 'c'}, {'seq': 1, 'content': 'a'}]
+        b = [{'seq': 2, 'content': 'b'}, {'seq': 3, 'content': 'c'}]
+        self.assertEqual([m['seq'] for m in merge_messages([a, b])], [1, 2, 3])
+
+    def test_overlapping_shards_dedup(self):
+        """测试：分片返回了范围外的重叠消息时按seq去重，并报告重复数"""
+        def overlapping(shard):
+            start, _, end = shard.partition(',')
+            yield shard_messages(f'{start},{end or start}') + shard_messages(start)
+
+        messages, summary = fetch_sharded(overlapping, '2025-06', 'week', workers=4)
+        self.assertEqual(messages, shard_messages('2025-06-01,2025-06-30'))
+        self.assertEqual(summary['tracker'].duplicates, 6)
+        self.assertEqual(summary['tracker'].missing, 0)
+
+    def test_matches_single_range(self):
+        """测试：分片合并结果与整个范围一次获取一致"""
+        fetcher = FakeFetcher()
+        messages, summary = fetch_sharded(fetcher, '2025-Q2', 'week', workers=3)
+        self.assertEqual(messages, shard_messages('2025-04-01,2025-06-30'))
+        self.assertEqual(summary['fetched'], 14)
+        self.assertEqual(summary['failed'], [])
+
+    def test_concurrency_scaling(self):
+        """测试：并发数不超过上限，耗时随并发数下降"""
+        fetcher = FakeFetcher(delay=0.03)
+        start = time.perf_counter()
+        fetch_sharded(fetcher, '2025-06-01,2025-06-16', 'day', workers=8)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(fetcher.calls), 16)
+        self.assertLessEqual(fetcher.max_active, 8)
+        self.assertLess(elapsed, 16 * 0.03 / 2)
+
+    def test_cache_skips_finished_shards(self):
+        """测试：失败的分片不缓存；重新运行时只获取未完成的分片，今天及以后的分片不缓存"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ShardCache(tmp, 'group@chatroom')
+            fetcher = FakeFetcher(fail={'2025-06-09,2025-06-15'})
+            messages, summary = fetch_sharded(fetcher, '2025-06', 'week', cache=cache,
+                                              today=date(2025, 6, 25))
+            self.assertEqual(summary['failed'], ['2025-06-09,2025-06-15'])
+            self.assertEqual(summary['fetched'], 5)
+
+            fetcher = FakeFetcher()
+            messages, summary = fetch_sharded(fetcher, '2025-06', 'week', cache=cache,
+                                              today=date(2025, 6, 25))
+            self.assertEqual(sorted(fetcher.calls),
+                             ['2025-06-09,2025-06-15', '2025-06-23,2025-06-29', '2025-06-30'])
+            self.assertEqual(summary['cached'], 3)
+            self.assertEqual(messages, shard_messages('2025-06-01,2025-06-30'))
+
+    def test_failed_cache_write_keeps_shard(self):
+        """测试：写入分片出错时保留已缓存的分片，不留下临时文件"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ShardCache(tmp, 'group@chatroom')
+            shard = '2025-06-02,2025-06-08'
+            cache.put(shard, shard_messages(shard))
+            with self.assertRaises(TypeError):
+                cache.put(shard, [{'seq': 1, 'content': object()}])
+            self.assertEqual(cache.get(shard), shard_messages(shard))
+            self.assertEqual(len(os.listdir(cache.directory)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
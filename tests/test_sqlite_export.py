@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证SQLite分析库导出
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from sqlite_export import export_analysis
+from niu_niu_analysis import analyze_messages
+from test_chunked_analysis import multi_day_messages
+
+
+class TestSqliteExport(unittest.TestCase):
+    """测试导出、幂等更新和跨时间段查询"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'niu.db')
+        self.result = analyze_messages(multi_day_messages(300, seed=5))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, result, group='g1@chatroom', batch_rows=64):
+        return export_analysis(self.db, group, result.dice_records, result.valid_games, result.battles,
+                               result.registry, batch_rows)
+
+    def query(self, sql, *params):
+        with sqlite3.connect(self.db) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def test_row_counts(self):
+        """测试：各表行数与分析结果一致（分多个批次写入）"""
+        result = self.result
+        self.export(result)
+        self.assertEqual(self.query('SELECT COUNT(*) FROM dice')[0][0], len(result.dice_records))
+        self.assertEqual(self.query('SELECT COUNT(*) FROM games')[0][0], len(result.valid_games))
+        self.assertEqual(self.query('SELECT COUNT(*) FROM battles')[0][0], len(result.battles))
+        self.assertEqual(self.query('SELECT COUNT(*) FROM players')[0][0], len(result.registry.keys()))
+
+    def test_idempotent(self):
+        """测试：重复导出同一时间段不产生重复行，另一个群的数据单独计数"""
+        self.export(self.result)
+        self.export(self.result)
+        self.export(self.result, group='g2@chatroom')
+        rows = self.query('SELECT group_id, COUNT(*) FROM games GROUP BY group_id ORDER BY group_id')
+        self.assertEqual(rows, [('g1@chatroom', len(self.result.valid_games)),
+                                ('g2@chatroom', len(self.result.valid_games))])
+
+    def test_cross_period_query(self):
+        """测试：分两个时间段导出后，SQL汇总与整体分析的玩家统计一致"""
+        result = self.result
+        days = sorted({g['date'] for g in result.valid_games})
+        first = set(days[:len(days) // 2])
+        for part in (lambda d: d in first, lambda d: d not in first):
+            self.export(type(result)(
+                [r for r in result.dice_records if part(r['date'])],
+                [g for g in result.valid_games if part(g['date'])],
+                [b for b in result.battles if part(b['date'])],
+                {}, result.registry))
+
+        rows = self.query('SELECT p.name, COUNT(*), SUM(g.score_points) FROM games g '
+                          'JOIN players p USING (group_id, player_key) GROUP BY p.name')
+        self.assertEqual({name: (games, points) for name, games, points in rows},
+                         {name: (s['total_games'], s['total_points']) for name, s in result.player_stats.items()})
+
+        wins = dict(self.query('SELECT p.name, COUNT(*) FROM battles b JOIN players p '
+                               'ON p.group_id = b.group_id AND p.player_key = b.winner_key GROUP BY p.name'))
+        self.assertEqual(wins, {name: s['battles_won'] for name, s in result.player_stats.items() if s['battles_won']})
+
+    def test_indexes_used(self):
+        """测试：按玩家和时间、按日期的查询走索引"""
+        self.export(self.result)
+        plan = ' '.join(row[-1] for row in self.query(
+            'EXPLAIN QUERY PLAN SELECT * FROM games WHERE group_id = ? AND player_key = ? AND timestamp > ?',
+            'g1@chatroom', 'wxid_甲', 0))
+        self.assertIn('games_player_time', plan)
+        plan = ' '.join(row[-1] for row in self.query(
+            'EXPLAIN QUERY PLAN SELECT COUNT(*) FROM dice WHERE group_id = ? AND date BETWEEN ? AND ?',
+            'g1@chatroom', '2025-06-01', '2025-06-30'))
+        self.assertIn('dice_date', plan)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证分阶段计时
+"""
+import unittest
+import json
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stage_profiler import StageProfiler, NULL_PROFILER, peak_rss_mb
+
+
+class TestStageProfiler(unittest.TestCase):
+    """测试阶段累加、内存字段、多线程记录和输出"""
+
+    def test_stages_accumulate(self):
+        """测试：同名阶段多次调用累加次数、耗时和条数，阶段内可继续累加条数"""
+        profiler = StageProfiler()
+        for _ in range(3):
+            with profiler.stage('decode', items=10) as timer:
+                timer.add(5)
+        profiler.record('fetch_page', 0.5, 100)
+
+        data = profiler.to_dict()
+        self.assertEqual(list(data['stages']), ['decode', 'fetch_page'])
+        self.assertEqual(data['stages']['decode']['calls'], 3)
+        self.assertEqual(data['stages']['decode']['items'], 45)
+        self.assertEqual(data['stages']['fetch_page']['items_per_sec'], 200.0)
+
+    def test_rss_is_high_water_mark(self):
+        """测试：内存记录为进程高水位和阶段内的增长（高水位不会下降，增长不为负）"""
+        if peak_rss_mb() is None:
+            self.skipTest('resource module not available')
+        profiler = StageProfiler()
+        with profiler.stage('allocate'):
+            block = bytearray(64 * 1024 * 1024)
+            block[::4096] = b'\x01' * len(block[::4096])
+        del block
+        with profiler.stage('small'):
+            pass
+
+        stages = profiler.to_dict()['stages']
+        self.assertGreaterEqual(stages['allocate']['rss_growth_mb'], 0)
+        self.assertGreaterEqual(stages['small']['rss_high_water_mb'], stages['allocate']['rss_high_water_mb'])
+        self.assertNotIn('peak_rss_mb', stages['small'])
+
+    def test_concurrent_stages(self):
+        """测试：多个线程同时记录同名阶段不丢失计数"""
+        profiler = StageProfiler()
+
+        def work():
+            for _ in range(2000):
+                with profiler.stage('pipeline_analyze', items=1):
+                    pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        entry = profiler.to_dict()['stages']['pipeline_analyze']
+        self.assertEqual(entry['calls'], 8000)
+        self.assertEqual(entry['items'], 8000)
+
+    def test_disabled_and_outputs(self):
+        """测试：关闭时不记录也不写文件；开启时写出JSON和cProfile数据"""
+        with NULL_PROFILER.stage('decode', items=3):
+            pass
+        self.assertEqual(NULL_PROFILER.stages, {})
+
+        profiler = StageProfiler(cprofile_stage='decode')
+        with profiler.stage('decode', items=3):
+            sorted(range(1000))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'profile.json')
+            NULL_PROFILER.write_json(path)
+            self.assertFalse(os.path.exists(path))
+            profiler.write_json(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['stages']['decode']['items'], 3)
+            self.assertTrue(profiler.dump_cprofile(os.path.join(tmpdir, 'decode.prof')))
+        self.assertFalse(NULL_PROFILER.dump_cprofile(os.path.join(tmpdir, 'none.prof')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
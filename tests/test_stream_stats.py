@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证单遍流式统计累加器
+"""
+import unittest
+import random
+import statistics
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stream_stats import RunningStats, TopK, StreamAccumulator, summarize_games, summarize_players, first
+from optimized_chatlog_importer import OptimizedChatlogImporter, FilteredDiceMessage
+from niu_niu_analysis import analyze_messages, rank_players
+from player_form import attach_form
+from test_chunked_analysis import multi_day_messages
+
+
+class TestRunningStats(unittest.TestCase):
+    """测试Welford统计和合并"""
+
+    def test_matches_statistics(self):
+        """测试：均值、方差、最值与statistics模块一致，分段合并与整体一致"""
+        rng = random.Random(1)
+        values = [rng.gauss(50, 12) for _ in range(2000)]
+        whole = RunningStats()
+        for value in values:
+            whole.add(value)
+        self.assertAlmostEqual(whole.mean, statistics.fmean(values), places=9)
+        self.assertAlmostEqual(whole.variance, statistics.pvariance(values), places=6)
+        self.assertEqual((whole.min, whole.max, whole.count), (min(values), max(values), len(values)))
+
+        merged = RunningStats()
+        for start in range(0, 2000, 317):
+            part = RunningStats()
+            for value in values[start:start + 317]:
+                part.add(value)
+            merged.merge(part)
+        merged.merge(RunningStats())
+        self.assertEqual((merged.count, merged.min, merged.max), (whole.count, whole.min, whole.max))
+        self.assertAlmostEqual(merged.mean, whole.mean, places=9)
+        self.assertAlmostEqual(merged.variance, whole.variance, places=6)
+
+
+class TestTopK(unittest.TestCase):
+    """测试top-k堆"""
+
+    def test_matches_stable_sort(self):
+        """测试：有大量相同键时，结果与稳定降序排序的前k项一致，合并后也一致"""
+        rng = random.Random(2)
+        items = [(rng.randint(0, 5), i) for i in range(200)]
+        expected = sorted(items, key=lambda x: x[0], reverse=True)
+        for k in (1, 3, 50, None):
+            top = TopK(k)
+            for item in items:
+                top.push(item[0], item)
+            self.assertEqual(top.items(), expected[:k])
+
+            left, right = TopK(k), TopK(k)
+            for item in items[:77]:
+                left.push(item[0], item)
+            for item in items[77:]:
+                right.push(item[0], item)
+            left.merge(right)
+            self.assertEqual(left.items(), expected[:k])
+
+
+class TestSummaries(unittest.TestCase):
+    """测试报告用的单遍汇总"""
+
+    def setUp(self):
+        self.result = analyze_messages(multi_day_messages(200, seed=4))
+        attach_form(self.result.player_stats, self.result.valid_games, self.result.battles)
+
+    def test_games_summary_merges(self):
+        """测试：分块汇总后合并与一次汇总相同，且与逐项计数一致"""
+        games = self.result.valid_games
+        whole = summarize_games(games)
+        merged = StreamAccumulator()
+        for start in range(0, len(games), 100):
+            merged.merge(summarize_games(games[start:start + 100]))
+        self.assertEqual(merged.hist('result_type'), whole.hist('result_type'))
+        self.assertEqual(merged.hist('date'), whole.hist('date'))
+        self.assertEqual(whole.stat('score_points').total, sum(g.score_points for g in games))
+        self.assertEqual(whole.hist('date')[games[0].date], sum(1 for g in games if g.date == games[0].date))
+
+    def test_players_summary_matches_sorts(self):
+        """测试：单遍排行榜与逐个排序/筛选的结果一致"""
+        players = rank_players(self.result.player_stats)
+        leaders = summarize_players(players, min_games=20)
+        qualified = [(p, s) for p, s in players if s['battles_won'] + s['battles_lost'] >= 5]
+        self.assertEqual(first(leaders, 'highest_win_rate'), max(qualified, key=lambda x: x[1]['win_rate']))
+        self.assertEqual(first(leaders, 'lowest_win_rate'), min(qualified, key=lambda x: x[1]['win_rate']))
+        self.assertEqual(first(leaders, 'avg_points'), next(x for x in players if x[1]['total_games'] >= 20))
+        self.assertEqual(leaders.top('activity').items(),
+                         sorted(players, key=lambda x: x[1]['total_games'], reverse=True))
+        self.assertEqual(leaders.top('niu_niu').items(),
+                         [x for x in sorted(players, key=lambda x: x[1]['result_counts']['牛牛'], reverse=True)
+                          if x[1]['result_counts']['牛牛'] > 0][:3])
+        self.assertEqual(leaders.collect('hot'), [p for p, s in players if s['form'] == 'hot'])
+        self.assertIsNone(first(summarize_players([]), 'longest_win_streak'))
+
+
+class TestFilterStats(unittest.TestCase):
+    """测试导入器的过滤统计"""
+
+    def test_single_pass_filter_stats(self):
+        """测试：单遍统计的各项与逐项计算一致"""
+        rng = random.Random(5)
+        messages = [FilteredDiceMessage(i, 0, '', f'wxid_{i % 3}', '', [], rng.choice((1, 1, 5, 2)), 47, '', '',
+                                        rng.choice((0.5, 0.8, 0.95)))
+                    for i in range(300)]
+        stats = OptimizedChatlogImporter().get_filter_stats(messages)
+        confidences = [m.confidence_score for m in messages]
+        self.assertEqual(stats['total_messages'], 300)
+        self.assertAlmostEqual(stats['avg_confidence'], sum(confidences) / 300)
+        self.assertEqual((stats['min_confidence'], stats['max_confidence']), (0.5, 0.95))
+        self.assertEqual(stats['high_confidence_count'], sum(1 for c in confidences if c >= 0.8))
+        self.assertEqual(stats['player_distribution'], {f'wxid_{i}': 100 for i in range(3)})
+        self.assertEqual(sum(stats['dice_count_distribution'].values()), 300)
+        self.assertEqual(stats['dice_count_distribution']['other'], sum(1 for m in messages if m.dice_count == 2))
+        self.assertEqual(OptimizedChatlogImporter().get_filter_stats([]), {'total': 0})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
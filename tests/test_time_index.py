@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+测试用例：验证按日前缀和索引
+"""
+import unittest
+import random
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from niu_niu_analysis import RESULT_ORDER, calculate_score_points, match_battles, build_player_stats, head_to_head
+from time_index import PlayerTimeIndex, PairTimeIndex
+from records import Game
+
+
+# 玩家ID -> 发送者ID / 显示名
+KEYS = ['wxid_jia', 'wxid_yi', 'wxid_bing', 'wxid_ding']
+LABELS = list('甲乙丙丁')
+
+
+def synthetic_games(seed, days=30, per_day=20):
+    """生成跨多天的随机游戏记录"""
+    rng = random.Random(seed)
+    games = []
+    for day in range(1, days + 1):
+        timestamp = day * 86400
+        for _ in range(per_day):
+            timestamp += rng.randint(10, 200)
+            result_type = rng.choice(RESULT_ORDER)
+            player_id = rng.randrange(4)
+            games.append(Game(
+                player_id=player_id,
+                player_name='甲乙丙丁'[player_id],
+                date=f'2025-06-{day:02d}',
+                timestamp=timestamp,
+                result_type=result_type,
+                score_points=calculate_score_points(result_type, 0),
+            ))
+    return games
+
+
+def comparable(player_stats):
+    """去掉浮点字段，便于比较"""
+    return {
+        player: (s['total_games'], s['total_points'], s['battles_won'], s['battles_lost'],
+                 s['battles_draw'], {k: v for k, v in s['result_counts'].items() if v})
+        for player, s in player_stats.items()
+    }
+
+
+class TestPlayerTimeIndex(unittest.TestCase):
+    """测试前缀和索引"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.games = synthetic_games(2025)
+        self.battles = match_battles(self.games)
+
+    def expected(self, start, end):
+        """直接扫描得到的区间统计"""
+        games = [g for g in self.games if start <= g['date'] <= end]
+        battles = [b for b in self.battles if start <= b['date'] <= end]
+        return comparable(build_player_stats(games, battles))
+
+    def test_range_queries_match_rescan(self):
+        """测试：任意区间查询与重新扫描结果一致"""
+        index = PlayerTimeIndex()
+        index.update('2025-06-01', '2025-06-30', self.games, self.battles, KEYS, LABELS)
+
+        for start, end in [('2025-06-01', '2025-06-30'), ('2025-06-05', '2025-06-05'),
+                           ('2025-06-10', '2025-06-21'), ('2025-05-01', '2025-06-03')]:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(comparable(index.player_stats(start, end)), self.expected(start, end))
+
+    def test_incremental_append(self):
+        """测试：按天增量追加与一次性构建结果一致"""
+        index = PlayerTimeIndex()
+        for day in range(1, 31):
+            date_str = f'2025-06-{day:02d}'
+            games = [g for g in self.games if g['date'] == date_str]
+            battles = [b for b in self.battles if b['date'] == date_str]
+            index.update(date_str, date_str, games, battles, KEYS, LABELS)
+
+        self.assertTrue(index.covers('2025-06-01', '2025-06-30'))
+        self.assertEqual(comparable(index.player_stats('2025-06-03', '2025-06-27')),
+                         self.expected('2025-06-03', '2025-06-27'))
+
+    def test_overlapping_update_replaces_days(self):
+        """测试：重新分析中间的周期只替换受影响的天"""
+        index = PlayerTimeIndex()
+        index.update('2025-06-01', '2025-06-30', self.games, self.battles, KEYS, LABELS)
+        index.update('2025-06-10', '2025-06-12', [], [], KEYS, LABELS)
+
+        totals = index.player_stats('2025-06-10', '2025-06-12')
+        self.assertEqual(totals, {})
+        self.assertEqual(comparable(index.player_stats('2025-06-13', '2025-06-30')),
+                         self.expected('2025-06-13', '2025-06-30'))
+
+    def test_save_and_load(self):
+        """测试：保存后加载结果不变"""
+        index = PlayerTimeIndex()
+        index.update('2025-06-01', '2025-06-30', self.games, self.battles, KEYS, LABELS)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'index.json')
+            index.save(path)
+            loaded = PlayerTimeIndex.load(path)
+
+        self.assertEqual(loaded.covered_ranges(), [('2025-06-01', '2025-06-30')])
+        self.assertEqual(comparable(loaded.player_stats('2025-06-07', '2025-06-20')),
+                         self.expected('2025-06-07', '2025-06-20'))
+
+        with self.assertRaises(ValueError):
+            PlayerTimeIndex.from_dict({key: value for key, value in index.to_dict().items() if key != 'names'})
+
+    def test_rename_keeps_one_history(self):
+        """测试：玩家在两个周期之间改名，历史仍按发送者ID合并，显示最近的名字；同名的不同玩家不合并"""
+        index = PlayerTimeIndex()
+        first = [g for g in self.games if g['date'] <= '2025-06-15']
+        second = [g for g in self.games if g['date'] > '2025-06-15']
+        index.update('2025-06-01', '2025-06-15', first, match_battles(first), KEYS, LABELS)
+        index.update('2025-06-16', '2025-06-30', second, match_battles(second), KEYS, ['小甲', '乙', '丙', '甲'])
+
+        stats = index.player_stats('2025-06-01', '2025-06-30')
+        self.assertEqual(sorted(stats), ['丙', '乙', '小甲', '甲'])
+        self.assertEqual(stats['小甲']['total_games'], sum(1 for g in self.games if g.player_id == 0))
+        self.assertEqual(stats['甲']['total_games'], sum(1 for g in self.games if g.player_id == 3))
+
+        # 同一显示名分属两个发送者时附加发送者ID后缀
+        index.update('2025-06-16', '2025-06-30', second, match_battles(second), KEYS, ['甲', '乙', '丙', '甲'])
+        self.assertEqual(sorted(index.players()), ['丙', '乙', '甲(_jia)', '甲(ding)'])
+
+
+
+class TestPairTimeIndex(unittest.TestCase):
+    """测试玩家对前缀和索引"""
+
+    def test_range_queries_match_head_to_head(self):
+        """测试：区间查询与head_to_head重新扫描一致，重叠更新替换受影响的天，保存后不变"""
+        battles = match_battles(synthetic_games(7))
+        index = PairTimeIndex()
+        index.update('2025-06-01', '2025-06-30', battles, KEYS)
+        index.update('2025-06-10', '2025-06-12', [b for b in battles if '2025-06-10' <= b.date <= '2025-06-12'], KEYS)
+        index = PairTimeIndex.from_dict(index.to_dict())
+        labels = dict(zip(KEYS, LABELS))
+
+        for start, end in [('2025-06-01', '2025-06-30'), ('2025-06-11', '2025-06-11'), ('2025-06-08', '2025-06-24')]:
+            with self.subTest(start=start, end=end):
+                expected = {}
+                for pair, _, r in head_to_head([b for b in battles if start <= b.date <= end]):
+                    a, b = pair.split(' vs ')
+                    expected[frozenset((a, b))] = {a: r['p1_wins'], b: r['p2_wins'], 'draws': r['draws']}
+                self.assertEqual({frozenset((labels[a], labels[b])): {labels[a]: w, labels[b]: l, 'draws': d}
+                                  for a, b, w, l, d in index.query(start, end)}, expected)
+
+        index.update('2025-06-10', '2025-06-12', [], KEYS)
+        self.assertEqual(index.query('2025-06-10', '2025-06-12'), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
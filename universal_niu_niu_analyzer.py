@@ -5,80 +5,472 @@ Supports any time period: daily/weekly/monthly/quarterly/half-yearly/yearly/cust
 """
 import json
 import csv
+import os
 import sys
 import argparse
-import re
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
-sys.path.append('src')
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 from niu_niu_engine import NiuNiuEngine
-from optimized_chatlog_importer import OptimizedChatlogImporter
+from niu_niu_analysis import (
+    calculate_score_points, parse_time_range, get_filename_suffix, time_range_bounds,
+    extract_dice_records, group_throws, evaluate_games, match_battles, build_player_stats,
+    rank_players, best_result, head_to_head, RESULT_ORDER,
+    AnalysisResult, analysis_parameters, ANALYSIS_MODULES
+)
+from player_registry import PlayerRegistry
+from records import json_default
+from time_index import PlayerTimeIndex
+from elo_ratings import RatingHistory, rating_table
+from player_form import attach_form, DEFAULT_FORM_WINDOW
+from dice_fairness import FairnessTracker
+from rule_sets import load_rule_sets, evaluate_rule_sets
+from analysis_cache import AnalysisCache, source_fingerprint, DEFAULT_CACHE_DIR
+from checkpoint import atomic_open, DEFAULT_CHECKPOINT_INTERVAL
+from stage_profiler import StageProfiler
+from stream_stats import summarize_games, summarize_players, first
 
-def calculate_score_points(result_type, result_value):
-    """Score system: Baozi=5, NiuNiu=3, Niu7/8/9=2, NoNiu=0, Others=1"""
-    if result_type == "豹子":
-        return 5
-    elif result_type == "牛牛":
-        return 3
-    elif result_type in ["牛7", "牛8", "牛9"]:
-        return 2
-    elif result_type == "没牛":
-        return 0
-    else:
-        return 1
+def output_unchanged(filename, outputs):
+    """Whether a CSV still matches the (size, mtime) recorded when it was written from a cached analysis"""
+    recorded = outputs.get(filename)
+    if not recorded or not os.path.exists(filename):
+        return False
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns] == recorded
+
+def record_output(filename, outputs):
+    """Remember the (size, mtime) of a freshly written CSV"""
+    stat = os.stat(filename)
+    outputs[filename] = [stat.st_size, stat.st_mtime_ns]
+
+def open_csv(filename, append=False):
+    """Open a CSV for writing: appends go to the file itself, full writes replace it atomically"""
+    if append:
+        return open(filename, 'a', newline='', encoding='utf-8')
+    return atomic_open(filename, 'w', newline='', encoding='utf-8')
+
+def write_dice_csv(dice_filename, dice_records, append=False):
+    """Write dice throws CSV (append=True adds rows to an existing file without a header)"""
+    with open_csv(dice_filename, append) as csvfile:
+        fieldnames = ['seq', 'date', 'time', 'timestamp', 'player_name', 'content_value', 'dice_value']
+        writer = csv.writer(csvfile)
+        if not append:
+            writer.writerow(fieldnames)
+        for record in dice_records:
+            writer.writerow((record.seq, record.date, record.time, record.timestamp,
+                             record.player_name, record.content_value, record.dice_value))
+
+def write_games_csv(games_filename, valid_games, append=False):
+    """Write valid games CSV (append=True adds rows to an existing file without a header)"""
+    with open_csv(games_filename, append) as csvfile:
+        fieldnames = ['player_name', 'date', 'start_time', 'dice_values', 'result_type', 'result_value', 'score_points']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        if not append:
+            writer.writeheader()
+        for game in valid_games:
+            writer.writerow({
+                'player_name': game.player_name,
+                'date': game.date,
+                'start_time': game.start_time,
+                'dice_values': ','.join(map(str, game.dice_values)),
+                'result_type': game.result_type,
+                'result_value': game.result_value,
+                'score_points': game.score_points
+            })
+
+def write_battles_csv(battles_filename, battles, append=False):
+    """Write battles CSV (append=True adds rows to an existing file without a header)"""
+    with open_csv(battles_filename, append) as csvfile:
+        fieldnames = ['player1', 'player2', 'player1_result', 'player2_result', 'player1_points', 'player2_points', 'winner', 'date']
+        writer = csv.writer(csvfile)
+        if not append:
+            writer.writerow(fieldnames)
+        for battle in battles:
+            writer.writerow((battle.player1, battle.player2, battle.player1_result, battle.player2_result,
+                             battle.player1_points, battle.player2_points, battle.winner, battle.date))
+
+def relabel_csv(filename, columns, labels):
+    """Rewrite the player name columns of an appended CSV row by row (labels yields the new names per row)"""
+    with open(filename, 'r', newline='', encoding='utf-8') as source, open_csv(filename) as csvfile:
+        reader = csv.reader(source)
+        writer = csv.writer(csvfile)
+        writer.writerow(next(reader))
+        for row, names in zip(reader, labels):
+            for column, name in zip(columns, names):
+                row[column] = name
+            writer.writerow(row)
+
+def write_ratings_csv(ratings_filename, rating_rows):
+    """Write Elo ratings CSV"""
+    with open_csv(ratings_filename) as csvfile:
+        fieldnames = ['player_name', 'rating', 'change', 'battles', 'wins', 'losses', 'draws']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rating_rows:
+            writer.writerow(row)
+
+def write_fairness_csv(fairness_filename, fairness_rows):
+    """Write per-player dice fairness CSV"""
+    with open_csv(fairness_filename) as csvfile:
+        fieldnames = ['player_name', 'throws', 'face_1', 'face_2', 'face_3', 'face_4', 'face_5', 'face_6',
+                      'face_chi2', 'face_p', 'transition_chi2', 'transition_p', 'runs', 'runs_z', 'runs_p',
+                      'serial_corr', 'serial_p', 'suspicious']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in fairness_rows:
+            writer.writerow({name: round(value, 6) if isinstance(value, float) else value
+                             for name, value in row.items()})
+
+def write_rule_sets_csv(rule_sets_filename, rule_set_results):
+    """Write per-rule-set player stats CSV"""
+    with open_csv(rule_sets_filename) as csvfile:
+        fieldnames = ['rule_set', 'player_name', 'total_games', 'total_points', 'avg_points',
+                      'battles_won', 'battles_lost', 'battles_draw', 'win_rate']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for name, players in rule_set_results.items():
+            for player, stats in sorted(players.items(), key=lambda x: -x[1]['avg_points']):
+                writer.writerow({
+                    'rule_set': name,
+                    'player_name': player,
+                    **stats,
+                    'avg_points': round(stats['avg_points'], 2),
+                    'win_rate': round(stats['win_rate'], 1)
+                })
+
+def write_sweep_csv(sweep_filename, sweep_rows):
+    """Write parameter sweep CSV"""
+    with open_csv(sweep_filename) as csvfile:
+        fieldnames = ['confidence_threshold', 'game_window', 'battle_window', 'dice_kept', 'games', 'battles',
+                      'draws', 'players', 'top_avg_player', 'top_win_rate_player',
+                      'avg_rank_tau', 'win_rate_rank_tau', 'is_baseline']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in sweep_rows:
+            writer.writerow({name: round(value, 3) if isinstance(value, float) else value
+                             for name, value in row.items()})
+
+def parse_grid(value, cast=int):
+    """Parse a comma-separated grid such as 20,30,45"""
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+def write_stats_csv(stats_filename, sorted_players):
+    """Write per-player stats CSV"""
+    with open_csv(stats_filename) as csvfile:
+        fieldnames = ['player_name', 'total_games', 'avg_points', 'win_rate', 'battles_won', 'battles_lost', 
+                     'niu_niu_count', 'baozi_count', 'no_niu_count',
+                     'longest_win_streak', 'longest_loss_streak', 'current_streak',
+                     'recent_avg_points', 'recent_win_rate', 'form']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        
+        for player, stats in sorted_players:
+            writer.writerow({
+                'player_name': player,
+                'total_games': stats['total_games'],
+                'avg_points': round(stats['avg_points'], 2),
+                'win_rate': round(stats['win_rate'], 1),
+                'battles_won': stats['battles_won'],
+                'battles_lost': stats['battles_lost'],
+                'niu_niu_count': stats['result_counts']['牛牛'],
+                'baozi_count': stats['result_counts']['豹子'],
+                'no_niu_count': stats['result_counts']['没牛'],
+                # 滚动指标需要按时间顺序的游戏记录，由时间索引回答时为空
+                'longest_win_streak': stats.get('longest_win_streak', ''),
+                'longest_loss_streak': stats.get('longest_loss_streak', ''),
+                'current_streak': stats.get('current_streak', ''),
+                'recent_avg_points': round(stats['recent_avg_points'], 2) if 'recent_avg_points' in stats else '',
+                'recent_win_rate': round(stats['recent_win_rate'], 1) if 'recent_win_rate' in stats else '',
+                'form': stats.get('form', '')
+            })
+
+def print_player_table(sorted_players):
+    """Print detailed per-player stats table"""
+    print(f'\n📋 详细玩家统计表:')
+    print('=' * 100)
+    print(f'{"玩家":12} {"游戏数":>6} {"平均分":>7} {"胜率":>6} {"牛牛":>4} {"豹子":>4} {"没牛":>4} {"最佳成绩":10}')
+    print('-' * 100)
+    
+    for player, stats in sorted_players:
+        wr_str = f"{stats['win_rate']:.1f}%" if stats['battles_won'] + stats['battles_lost'] > 0 else "N/A"
+        niu_niu_count = stats['result_counts']['牛牛']
+        baozi_count = stats['result_counts']['豹子']
+        no_niu_count = stats['result_counts']['没牛']
+        
+        # 找最佳成绩
+        best = best_result(stats['result_counts'])
+        
+        print(f'{player:12} {stats["total_games"]:6d} {stats["avg_points"]:7.2f} {wr_str:6} '
+              f'{niu_niu_count:4d} {baozi_count:4d} {no_niu_count:4d} {best:10}')
 
-def parse_time_range(time_param):
-    """Parse time parameter: 2025-06-23(day), 2025-06(month), 2025-Q2(quarter), 2025-H1(half), 2025(year), custom range"""
-    if ',' in time_param:
-        start_date, end_date = time_param.split(',')
-        return 'custom', start_date.strip(), end_date.strip()
+def print_result_distribution(game_summary):
+    """Print how often each hand result occurred"""
+    print(f'\n✨ 结果分布统计:')
+    print('=' * 40)
     
-    if len(time_param) == 4:
-        return 'year', time_param, time_param
+    all_results = game_summary.hist('result_type')
+    total_games = sum(all_results.values())
+    print(f'📊 各种结果出现次数:')
+    for result_type in RESULT_ORDER:
+        if result_type in all_results:
+            count = all_results[result_type]
+            percentage = count / total_games * 100
+            print(f'  {result_type:4}: {count:3d}次 ({percentage:4.1f}%)')
+
+def print_daily_games(game_summary):
+    """Print games per day when the period spans several days"""
+    daily_stats = game_summary.hist('date')
+    if len(daily_stats) > 1:
+        print(f'\n📅 每日游戏数量:')
+        for date in sorted(daily_stats.keys()):
+            print(f'  {date}: {daily_stats[date]}局')
+
+def run_chunked_analysis(args, profiler, raw_filename, file_suffix,
+                         dice_filename, games_filename, battles_filename, stats_filename, report_filename):
+    """Analyze the raw file chunk by chunk with bounded memory, appending rows to the CSVs.
+    The cross-chunk state is checkpointed periodically, so a rerun after a crash resumes from the last checkpoint"""
+    from chunked_analysis import ChunkedAnalysis, iter_chunks, MEMORY_EXPANSION
+    from checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint, truncate_outputs, file_signature
     
-    if len(time_param) == 7:
-        return 'month', time_param, time_param
+    spill_dir = os.path.join(args.cache_dir, 'chunks', file_suffix)
+    checkpoint_path = os.path.join(args.cache_dir, 'checkpoints', f'{file_suffix}.pkl')
+    max_chunk_bytes = args.max_memory_mb * 1024 * 1024 // MEMORY_EXPANSION
+    appended = [dice_filename, games_filename, battles_filename]
+    # 只有输入文件、分组、分块方式、分析参数和代码都未变化时才从检查点继续
+    # （检查点pickle了ChunkedAnalysis和对战矩阵，它们的模块也计入代码摘要）
+    run = {'raw': file_signature(raw_filename), 'group': args.group, 'unit': args.chunked,
+           'max_chunk_bytes': max_chunk_bytes, 'form_window': args.form_window, 'report': args.report,
+           'outputs': appended, 'params': analysis_parameters(),
+           'code': source_fingerprint(ANALYSIS_MODULES + ['chunked_analysis', 'matchup_matrix', 'stream_stats'])}
     
-    if len(time_param) == 10:
-        return 'day', time_param, time_param
+    resumed = None
+    if args.checkpoint_interval and os.path.isdir(spill_dir):
+        resumed = load_checkpoint(checkpoint_path, run)
+    if resumed is not None and not all(os.path.exists(filename) and os.path.getsize(filename) >= size
+                                       for filename, size in resumed['outputs'].items()):
+        resumed = None  # 输出文件在中断后被删除或改写，只能从头开始
     
-    if 'Q' in time_param:
-        year, quarter = time_param.split('-Q')
-        return 'quarter', time_param, time_param
+    if resumed is not None:
+        analysis, matrix = resumed['analysis'], resumed['matrix']
+        # 丢弃检查点之后写出的行和溢出文件，这些块会重新处理
+        analysis.rollback()
+        truncate_outputs(resumed['outputs'])
+        print(f'♻️  从检查点继续: 已完成{analysis.chunks}块 (最后seq {resumed["last_seq"]})')
+    else:
+        remove_checkpoint(checkpoint_path)
+        analysis = ChunkedAnalysis(spill_dir, form_window=args.form_window)
+        # HTML报告的热力图：对战矩阵逐块累加
+        matrix = None
+        if args.report == 'html':
+            try:
+                from matchup_matrix import MatchupMatrix
+            except ImportError:
+                pass
+            else:
+                matrix = MatchupMatrix([])
+        write_dice_csv(dice_filename, [])
+        write_games_csv(games_filename, [])
+        write_battles_csv(battles_filename, [])
     
-    if 'H' in time_param:
-        year, half = time_param.split('-H')
-        return 'half', time_param, time_param
+    export = None
+    if args.sqlite:
+        from sqlite_export import SqliteExport
+        export = SqliteExport(args.sqlite, args.group)
     
-    raise ValueError(f"Unsupported time format: {time_param}")
+    skip = analysis.chunks
+    last_checkpoint = time.monotonic()
+    for label, messages in iter_chunks(raw_filename, args.chunked, max_chunk_bytes):
+        if skip:
+            # 检查点之前的块已经处理并写出
+            skip -= 1
+            continue
+        with profiler.stage('chunk', items=len(messages)):
+            dice_records, games, battles = analysis.process_chunk(label, messages)
+        with profiler.stage('csv_write', items=len(dice_records) + len(games) + len(battles)):
+            write_dice_csv(dice_filename, dice_records, append=True)
+            write_games_csv(games_filename, games, append=True)
+            write_battles_csv(battles_filename, battles, append=True)
+        if matrix is not None:
+            matrix.resize(analysis.registry.labels())
+            matrix.update(battles)
+        if export is not None:
+            with profiler.stage('sqlite_export', items=len(dice_records) + len(games) + len(battles)):
+                export.write_dice(dice_records, analysis.registry)
+                export.write_games(games, analysis.registry)
+                export.write_battles(battles, analysis.registry)
+        print(f'  📦 {label}: {len(messages)}条消息, {len(games)}局, {len(battles)}轮')
+        if args.checkpoint_interval and time.monotonic() - last_checkpoint >= args.checkpoint_interval:
+            # 组局器中未成局的骰子、待定顺序的游戏、最后一局、累计统计和已写出的行数
+            with profiler.stage('checkpoint'):
+                save_checkpoint(checkpoint_path, run, {
+                    'analysis': analysis, 'matrix': matrix, 'last_seq': messages[-1].get('seq'),
+                    'outputs': {filename: os.path.getsize(filename) for filename in appended}})
+            last_checkpoint = time.monotonic()
+        del messages, dice_records, games, battles
+    
+    games, battles = analysis.finish()
+    if matrix is not None:
+        matrix.update(battles)
+    write_games_csv(games_filename, games, append=True)
+    write_battles_csv(battles_filename, battles, append=True)
+    if analysis.needs_relabel():
+        # 早先写出的行用的是当时的昵称：改名或后来出现重名的玩家统一改为最终显示名
+        with profiler.stage('relabel', items=analysis.game_count + analysis.battle_count):
+            relabel_csv(games_filename, [0], analysis.game_labels())
+            relabel_csv(battles_filename, [0, 1, 6], analysis.battle_labels())
+    if export is not None:
+        with profiler.stage('sqlite_export', items=len(games) + len(battles)):
+            export.write_games(games, analysis.registry)
+            export.write_battles(battles, analysis.registry)
+            export.write_players(analysis.registry)
+        export.close()
+    with profiler.stage('stats', items=analysis.chunks):
+        sorted_players = rank_players(analysis.merge_stats())
+    write_stats_csv(stats_filename, sorted_players)
+    analysis.cleanup()
+    remove_checkpoint(checkpoint_path)
+    
+    print(f'\n📊 分块分析: {analysis.chunks}块, {analysis.message_count}条消息 (内存上限 {args.max_memory_mb}MB)')
+    print(f'🎲 骰子数据: {analysis.dice_count}条 → {dice_filename}')
+    print(f'🎮 有效游戏: {analysis.game_count}局 → {games_filename}')
+    print(f'⚔️  对战记录: {analysis.battle_count}轮 → {battles_filename}')
+    print(f'📈 统计报告: {stats_filename}')
+    if export is not None:
+        print(f'🗄️  SQLite: {export.rows}行 → {args.sqlite}')
+    if sorted_players:
+        print_player_table(sorted_players)
+        print_result_distribution(analysis.summary)
+        print_daily_games(analysis.summary)
+    if args.report == 'html' and sorted_players:
+        from html_report import write_html_report
+        with profiler.stage('report', items=len(sorted_players)):
+            size = write_html_report(report_filename, f'{args.time} 牛牛游戏统计报告', {
+                '总消息数': analysis.message_count, '骰子投掷': analysis.dice_count,
+                '有效游戏': analysis.game_count, '对战轮次': analysis.battle_count},
+                sorted_players, analysis.summary, matrix)
+        print(f'\n🌐 HTML报告: {size // 1024}KB → {report_filename}')
 
-def get_filename_suffix(time_type, time_param):
-    """Generate filename suffix"""
-    if time_type == 'day':
-        return time_param.replace('-', '_')
-    elif time_type == 'month':
-        return time_param.replace('-', '_')
-    elif time_type == 'year':
-        return time_param
-    elif time_type == 'quarter':
-        return time_param.replace('-', '_')
-    elif time_type == 'half':
-        return time_param.replace('-', '_')
-    elif time_type == 'custom':
-        start, end = time_param.split(',')
-        return f"{start.strip().replace('-', '_')}_to_{end.strip().replace('-', '_')}"
-    else:
-        return time_param.replace('-', '_').replace(',', '_to_')
+def run_sweep_mode(args, profiler, raw_filename, sweep_filename):
+    """Evaluate a grid of game/battle windows and confidence thresholds over one raw data file"""
+    if not os.path.exists(raw_filename):
+        print(f"❌ Raw data not found: {raw_filename}")
+        print(f"Run with: --mode fetch")
+        return
+    
+    # 进程池和导入器只在扫描模式下加载
+    from parameter_sweep import prepare_sweep, run_sweep
+    
+    game_windows = parse_grid(args.game_windows)
+    battle_windows = parse_grid(args.battle_windows)
+    thresholds = parse_grid(args.confidence_thresholds, float)
+    
+    with profiler.stage('load_raw_json') as timer:
+        with open(raw_filename, 'r', encoding='utf-8') as f:
+            all_messages = json.load(f)
+        timer.add(len(all_messages))
+    with profiler.stage('sweep_prepare', items=len(all_messages)):
+        data = prepare_sweep(all_messages)
+    
+    settings = len(game_windows) * len(battle_windows) * len(thresholds)
+    print(f'🧪 参数扫描: {len(data.dice)}颗骰子 × {settings}组参数')
+    with profiler.stage('sweep', items=settings):
+        rows = run_sweep(data, game_windows, battle_windows, thresholds, args.workers)
+    write_sweep_csv(sweep_filename, rows)
+    
+    print(f'\n{"阈值":>5} {"组局窗口":>8} {"对战窗口":>8} {"游戏数":>6} {"对战数":>6} {"均分τ":>6} {"胜率τ":>6}  {"均分第一":10}')
+    print('-' * 80)
+    for row in rows:
+        marker = ' ← 当前参数' if row['is_baseline'] else ''
+        print(f'{row["confidence_threshold"]:5.2f} {row["game_window"]:8d} {row["battle_window"]:8d} '
+              f'{row["games"]:6d} {row["battles"]:6d} {row["avg_rank_tau"]:6.2f} {row["win_rate_rank_tau"]:6.2f}  '
+              f'{row["top_avg_player"]:10}{marker}')
+    print(f'\n📈 参数扫描结果: {sweep_filename}')
+
+def analyze_from_index(args, index, start_time, end_time, stats_filename):
+    """Answer a custom range from the prefix-sum index (two lookups per player, no rescan)"""
+    print(f'🗂️  Using time index: {args.index}')
+    
+    sorted_players = rank_players(index.player_stats(start_time, end_time))
+    write_stats_csv(stats_filename, sorted_players)
+    print(f'📈 统计报告: {stats_filename}')
+    
+    print(f'\n🏆 {args.time} 牛牛游戏统计报告（索引）')
+    print('=' * 80)
+    if not sorted_players:
+        print('\n❌ 没有找到有效的游戏数据')
+        return
+    
+    print(f'📊 数据概览:')
+    print(f'  有效游戏: {sum(s["total_games"] for _, s in sorted_players)}局')
+    print_player_table(sorted_players)
 
 def universal_niu_niu_analyzer():
     parser = argparse.ArgumentParser(description="Universal Niu Niu Data Analyzer")
     parser.add_argument("--time", required=True, help="Time range (2025-06-23, 2025-06, 2025-Q2, 2025-H1, 2025, 2025-06-01,2025-06-30)")
     parser.add_argument("--group", default="21998085218@chatroom", help="Group chat ID")
     parser.add_argument("--api-ip", default="127.0.0.1", help="Chatlog API IP address")
-    parser.add_argument("--mode", choices=['fetch', 'analyze', 'all'], default='all', help="Mode: fetch=data only, analyze=analysis only, all=both")
+    parser.add_argument("--mode", choices=['fetch', 'analyze', 'all', 'sweep'], default='all', help="Mode: fetch=data only, analyze=analysis only, all=both, sweep=window/threshold grid over saved data")
+    parser.add_argument("--index", help="Per-player daily prefix-sum index file (updated after analysis, answers covered custom ranges)")
+    parser.add_argument("--ratings", help="Elo checkpoint file (ratings resume from the last checkpoint before the period and are saved back)")
+    parser.add_argument("--form-window", type=int, default=DEFAULT_FORM_WINDOW, help="Rolling window (last N games/battles) for recent form stats")
+    parser.add_argument("--fairness", help="Dice fairness counter file (throws not yet counted for this group are added, seqs are tracked per group; report covers full history)")
+    parser.add_argument("--rules", help="JSON list of rule-sets (scoring table, baozi definition, tie-break order) to evaluate side by side")
+    parser.add_argument("--pipeline", action="store_true", help="With --mode all: analyze pages while later pages are still being fetched")
+    parser.add_argument("--queue-pages", type=int, default=4, help="Pipeline mode: fetched pages buffered ahead of the analysis (backpressure)")
+    parser.add_argument("--sqlite", help="SQLite database that accumulates dice, games and battles across periods (upserted by group and seq)")
+    parser.add_argument("--snapshot", help="Dashboard snapshot file (per-day player and head-to-head aggregates) updated after analysis; view with streamlit run src/dashboard.py")
+    parser.add_argument("--report", choices=['html'], help="Also write report_<suffix>.html: plotly.js leaderboards, result distribution, daily activity and head-to-head heatmap from the aggregated stats")
+    parser.add_argument("--shards", choices=['day', 'week'], help="Split wide ranges (quarter/half/year/custom) into day/week shards fetched concurrently; finished shards are cached")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Shard mode: shards fetched at the same time")
+    parser.add_argument("--chunked", choices=['day', 'week'], help="Bounded-memory analysis: stream the raw file in day/week chunks and merge spilled per-chunk stats")
+    parser.add_argument("--max-memory-mb", type=int, default=256, help="Chunked mode: memory cap (chunks are split early to stay under it)")
+    parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="Chunked mode: seconds between crash-safe checkpoints; a rerun resumes from the last one (0: off)")
+    parser.add_argument("--game-windows", default='20,30,45,60', help="Sweep mode: five-dice game windows in seconds")
+    parser.add_argument("--battle-windows", default='120,300,600', help="Sweep mode: battle pairing windows in seconds")
+    parser.add_argument("--confidence-thresholds", default='0,0.5,0.7', help="Sweep mode: smart-filter confidence thresholds (0 = no filtering, as in analyze)")
+    parser.add_argument("--workers", type=int, help="Sweep mode: parallel worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Analysis result cache directory (keyed by raw data content, parameters and code version)")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run the analysis and rewrite all CSVs")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timing/throughput/RSS high-water mark and write profile_<suffix>.json")
+    parser.add_argument("--profile-stage", help="Also dump a cProfile of one stage (e.g. game_assembly) to profile_<suffix>_<stage>.prof")
     
     args = parser.parse_args()
     
+    # 分块分析只输出骰子/游戏/对战/统计（流水线模式下--chunked不起作用），其余状态文件需要完整分析
+    if args.chunked and args.mode in ['analyze', 'all'] and not (args.pipeline and args.mode == 'all'):
+        unsupported = [flag for flag, value in [('--index', args.index), ('--ratings', args.ratings),
+                                                ('--fairness', args.fairness), ('--rules', args.rules),
+                                                ('--snapshot', args.snapshot)] if value]
+        if unsupported:
+            parser.error(f"--chunked only writes the dice, games, battles and stats CSVs; "
+                         f"{', '.join(unsupported)} need a normal run without --chunked")
+    
+    if args.mode == 'sweep':
+        for flag, value, cast in [('--game-windows', args.game_windows, int),
+                                  ('--battle-windows', args.battle_windows, int),
+                                  ('--confidence-thresholds', args.confidence_thresholds, float)]:
+            try:
+                grid = parse_grid(value, cast)
+            except ValueError:
+                grid = []
+            if not grid:
+                parser.error(f"{flag} needs a non-empty comma-separated list of numbers (got {value!r})")
+    
+    profiler = StageProfiler(enabled=args.profile or bool(args.profile_stage), cprofile_stage=args.profile_stage)
+    try:
+        run_analyzer(args, profiler)
+    finally:
+        if profiler.enabled:
+            file_suffix = get_filename_suffix(parse_time_range(args.time)[0], args.time)
+            profiler.print_summary()
+            profile_filename = f'profile_{file_suffix}.json'
+            profiler.write_json(profile_filename)
+            print(f'⏱️  性能数据: {profile_filename}')
+            if args.profile_stage:
+                prof_filename = f'profile_{file_suffix}_{args.profile_stage}.prof'
+                if profiler.dump_cprofile(prof_filename):
+                    print(f'⏱️  cProfile: {prof_filename}')
+
+def run_analyzer(args, profiler):
     time_type, start_time, end_time = parse_time_range(args.time)
     file_suffix = get_filename_suffix(time_type, args.time)
     
@@ -94,250 +486,259 @@ def universal_niu_niu_analyzer():
     games_filename = f'games_{file_suffix}.csv'
     battles_filename = f'battles_{file_suffix}.csv'
     stats_filename = f'stats_{file_suffix}.csv'
+    matrix_filename = f'h2h_{file_suffix}.csv'
+    ratings_filename = f'ratings_{file_suffix}.csv'
+    fairness_filename = f'fairness_{file_suffix}.csv'
+    rule_sets_filename = f'rulesets_{file_suffix}.csv'
+    sweep_filename = f'sweep_{file_suffix}.csv'
+    report_filename = f'report_{file_suffix}.html'
+    
+    # Custom range already covered by the time index: answer without rescanning raw data
+    if time_type == 'custom' and args.index and args.mode == 'analyze':
+        index = PlayerTimeIndex.load(args.index)
+        if index.covers(start_time, end_time):
+            analyze_from_index(args, index, start_time, end_time, stats_filename)
+            return
     
     # 1. Data fetching
+    pipelined = None
     if args.mode in ['fetch', 'all']:
         print(f'📡 Fetching data...')
         
-        api_url = f"http://{args.api_ip}:5030"
-        importer = OptimizedChatlogImporter(api_base_url=api_url)
-        all_messages = importer._fetch_raw_messages_optimized(args.group, args.time)
+        # Network dependencies (requests) load only in the modes that fetch
+        from optimized_chatlog_importer import OptimizedChatlogImporter
         
-        if not all_messages:
+        api_url = f"http://{args.api_ip}:5030"
+        importer = OptimizedChatlogImporter(api_base_url=api_url, profiler=profiler)
+        
+        if args.shards:
+            # 按天/按周分片并行获取，已完成的分片从分片缓存读取
+            from sharded_fetch import fetch_sharded, ShardCache
+            if not importer.test_connection():
+                print(f"❌ 无法连接到chatlog API")
+                return
+            cache = None if args.no_cache else ShardCache(os.path.join(args.cache_dir, 'shards'), args.group)
+            with profiler.stage('sharded_fetch') as timer:
+                all_messages, summary = fetch_sharded(
+                    lambda shard: importer.iter_message_pages(args.group, shard, check_connection=False, raise_errors=True),
+                    args.time, args.shards, args.fetch_workers, cache)
+                timer.add(len(all_messages))
+            print(f"✅ 分片获取: {summary['shards']}个分片 (缓存 {summary['cached']}, 新获取 {summary['fetched']}), "
+                  f"合并去重后 {len(all_messages)} 条消息")
+            tracker = summary['tracker']
+            if tracker.duplicates or tracker.missing:
+                print(f"  ⚠️ {tracker.describe()}")
+            if summary['failed']:
+                print(f"❌ {len(summary['failed'])}个分片获取失败，原始数据未保存；重新运行时已完成的分片将直接跳过")
+                return
+            message_count = len(all_messages)
+            if all_messages:
+                with profiler.stage('write_raw_json', items=message_count):
+                    with atomic_open(raw_filename, 'w', encoding='utf-8') as f:
+                        json.dump(all_messages, f, ensure_ascii=False, indent=2, default=json_default)
+            del all_messages
+        elif args.pipeline and args.mode == 'all':
+            # 边获取边分析：下一页的网络等待与当前页的骰子提取/组局/判定重叠
+            from fetch_pipeline import run_fetch_pipeline
+            spill_dir = os.path.join(args.cache_dir, 'chunks', file_suffix)
+            try:
+                with profiler.stage('pipeline') as timer:
+                    # 请求失败时抛出异常，流水线放弃写出，不会用不完整的数据覆盖已有的原始文件
+                    pipelined = run_fetch_pipeline(importer.iter_message_pages(args.group, args.time, raise_errors=True),
+                                                   raw_filename, spill_dir, args.form_window, args.queue_pages, profiler)
+                    timer.add(pipelined[0])
+            except Exception as e:
+                print(f"❌ 获取中断，原始数据未保存: {e}")
+                return
+            message_count = pipelined[0]
+        else:
+            all_messages = importer._fetch_raw_messages_optimized(args.group, args.time)
+            message_count = len(all_messages)
+            if all_messages:
+                with profiler.stage('write_raw_json', items=message_count):
+                    with atomic_open(raw_filename, 'w', encoding='utf-8') as f:
+                        json.dump(all_messages, f, ensure_ascii=False, indent=2, default=json_default)
+            del all_messages
+        
+        if not message_count:
             print("❌ No messages found")
             return
         
-        with open(raw_filename, 'w', encoding='utf-8') as f:
-            json.dump(all_messages, f, ensure_ascii=False, indent=2)
-        
-        print(f'📁 Raw data saved: {raw_filename} ({len(all_messages)} messages)')
+        print(f'📁 Raw data saved: {raw_filename} ({message_count} messages)')
+    
+    # 参数扫描（只读取已保存的原始数据）
+    if args.mode == 'sweep':
+        run_sweep_mode(args, profiler, raw_filename, sweep_filename)
+        return
     
     # 2. Data analysis
     if args.mode in ['analyze', 'all']:
         print(f'🔍 Analyzing data...')
         
-        try:
-            with open(raw_filename, 'r', encoding='utf-8') as f:
-                all_messages = json.load(f)
-        except FileNotFoundError:
+        if not os.path.exists(raw_filename):
             print(f"❌ Raw data not found: {raw_filename}")
             print(f"Run with: --mode fetch")
             return
         
-        print(f'📖 Processing {len(all_messages)} messages')
-        
-        niu_niu_engine = NiuNiuEngine()
-        importer = OptimizedChatlogImporter()
-        content_to_dice_map = {'4': 1, '5': 2, '6': 3, '7': 4, '8': 5, '9': 6}
-        
-        # 提取骰子数据
-        dice_records = []
-        for msg in all_messages:
-            if msg.get('msg_type') == 47:
-                content = msg.get('content', '')
-                if 'gameext' in content and 'type="2"' in content:
-                    # 提取content值
-                    pattern = r'<gameext[^>]*type="2"[^>]*content="([^"]*)"[^>]*></gameext>'
-                    matches = re.findall(pattern, content)
-                    
-                    if matches:
-                        content_value = matches[0]
-                        dice_value = content_to_dice_map.get(content_value)
-                        
-                        if dice_value:
-                            # 解析时间
-                            time_str = msg.get('time', '')
-                            try:
-                                dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                                date_only = dt.strftime('%Y-%m-%d')
-                                time_only = dt.strftime('%H:%M:%S')
-                                timestamp = int(dt.timestamp())
-                            except:
-                                date_only = ''
-                                time_only = time_str
-                                timestamp = 0
-                            
-                            dice_records.append({
-                                'seq': msg.get('seq', 0),
-                                'date': date_only,
-                                'time': time_only,
-                                'timestamp': timestamp,
-                                'player_name': msg.get('sender_name', '未知'),
-                                'content_value': content_value,
-                                'dice_value': dice_value
-                            })
-        
-        # 保存骰子数据
-        with open(dice_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['seq', 'date', 'time', 'timestamp', 'player_name', 'content_value', 'dice_value']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for record in dice_records:
-                writer.writerow(record)
-        
-        print(f'🎲 骰子数据: {len(dice_records)}条 → {dice_filename}')
+        # 分块模式：内存占用与时间范围长度无关，只输出骰子/游戏/对战/统计
+        if args.chunked and pipelined is None:
+            run_chunked_analysis(args, profiler, raw_filename, file_suffix,
+                                 dice_filename, games_filename, battles_filename, stats_filename,
+                                 report_filename)
+            return
         
-        # 组合有效游戏
-        def group_dice_to_games(records):
-            player_dice = defaultdict(list)
-            for record in records:
-                player_dice[record['player_name']].append(record)
+        # 分析缓存：原始数据内容、分析参数和代码都未变化时直接复用上次的结果
+        cache = None if args.no_cache else AnalysisCache(args.cache_dir)
+        cached = None
+        if cache is not None:
+            with profiler.stage('cache_lookup'):
+                params = {**analysis_parameters(), 'form_window': args.form_window,
+                          'code': source_fingerprint(ANALYSIS_MODULES)}
+                cache_key = cache.make_key(cache.fingerprint_file(raw_filename), params)
+                cached = cache.get(cache_key) if pipelined is None else None
+        
+        if pipelined is not None:
+            message_count, analysis = pipelined
+        elif cached is not None:
+            message_count, analysis = cached['message_count'], cached['analysis']
+            print(f'⚡ 分析缓存命中: {cache_key[:12]} ({message_count} messages)')
+        else:
+            with profiler.stage('load_raw_json') as timer:
+                with open(raw_filename, 'r', encoding='utf-8') as f:
+                    all_messages = json.load(f)
+                timer.add(len(all_messages))
+            message_count = len(all_messages)
             
-            valid_games = []
-            for player, dice_list in player_dice.items():
-                dice_list.sort(key=lambda x: x['seq'])
-                
-                i = 0
-                while i + 4 < len(dice_list):
-                    time_gap = dice_list[i + 4]['timestamp'] - dice_list[i]['timestamp']
-                    if time_gap <= 30:  # 30秒内
-                        dice_values = [dice_list[j]['dice_value'] for j in range(i, i + 5)]
-                        result = niu_niu_engine.calculate_result(dice_values)
-                        
-                        valid_games.append({
-                            'player_name': player,
-                            'date': dice_list[i]['date'],
-                            'start_time': dice_list[i]['time'],
-                            'end_time': dice_list[i + 4]['time'],
-                            'dice_values': dice_values,
-                            'result_type': result.type,
-                            'result_value': result.value,
-                            'score_points': calculate_score_points(result.type, result.value)
-                        })
-                        i += 5
-                    else:
-                        i += 1
+            print(f'📖 Processing {message_count} messages')
             
-            return valid_games
-        
-        valid_games = group_dice_to_games(dice_records)
-        valid_games.sort(key=lambda x: x['start_time'])
-        
-        # 保存游戏数据
-        with open(games_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['player_name', 'date', 'start_time', 'dice_values', 'result_type', 'result_value', 'score_points']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for game in valid_games:
-                writer.writerow({
-                    'player_name': game['player_name'],
-                    'date': game['date'],
-                    'start_time': game['start_time'],
-                    'dice_values': ','.join(map(str, game['dice_values'])),
-                    'result_type': game['result_type'],
-                    'result_value': game['result_value'],
-                    'score_points': game['score_points']
-                })
-        
-        print(f'🎮 有效游戏: {len(valid_games)}局 → {games_filename}')
-        
-        # 分析对战
-        battles = []
-        for i in range(len(valid_games) - 1):
-            current = valid_games[i]
-            next_game = valid_games[i + 1]
+            niu_niu_engine = NiuNiuEngine()
+            registry = PlayerRegistry()  # 按发送者ID识别玩家，改名不会拆分统计
             
-            if current['player_name'] != next_game['player_name']:
-                # 简单时间差计算
-                def time_to_seconds(time_str):
-                    try:
-                        h, m, s = map(int, time_str.split(':'))
-                        return h * 3600 + m * 60 + s
-                    except:
-                        return 0
-                
-                time_gap = time_to_seconds(next_game['start_time']) - time_to_seconds(current['start_time'])
-                
-                if 0 <= time_gap <= 300:  # 5分钟内
-                    winner = 'draw'
-                    if current['score_points'] > next_game['score_points']:
-                        winner = current['player_name']
-                    elif next_game['score_points'] > current['score_points']:
-                        winner = next_game['player_name']
-                    
-                    battles.append({
-                        'player1': current['player_name'],
-                        'player2': next_game['player_name'],
-                        'player1_result': current['result_type'],
-                        'player2_result': next_game['result_type'],
-                        'player1_points': current['score_points'],
-                        'player2_points': next_game['score_points'],
-                        'winner': winner,
-                        'date': current['date']
-                    })
-        
-        # 保存对战数据
-        with open(battles_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['player1', 'player2', 'player1_result', 'player2_result', 'player1_points', 'player2_points', 'winner', 'date']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for battle in battles:
-                writer.writerow(battle)
+            # 提取骰子数据
+            with profiler.stage('dice_extraction', items=message_count):
+                dice_records = extract_dice_records(all_messages, registry)
+            del all_messages
+            
+            # 组合有效游戏（按seq逐个投掷送入组局器）
+            with profiler.stage('game_assembly', items=len(dice_records)):
+                game_groups = group_throws(dice_records)
+            with profiler.stage('engine_evaluation', items=len(game_groups)):
+                valid_games = evaluate_games(game_groups, niu_niu_engine, registry)
+            
+            # 分析对战
+            with profiler.stage('battle_matching', items=len(valid_games)):
+                battles = match_battles(valid_games)
+            
+            with profiler.stage('stats', items=len(valid_games) + len(battles)):
+                player_stats = build_player_stats(valid_games, battles)
+                attach_form(player_stats, valid_games, battles, args.form_window)
+            
+            analysis = AnalysisResult(dice_records, valid_games, battles, player_stats, registry)
+        
+        dice_records, valid_games, battles = analysis.dice_records, analysis.valid_games, analysis.battles
+        registry = analysis.registry
+        sorted_players = rank_players(analysis.player_stats)
+        game_summary = summarize_games(valid_games)
+        
+        # 保存骰子、游戏、对战和统计数据（缓存命中且文件未被改动时跳过）
+        outputs = cached['outputs'] if cached is not None else {}
+        written = 0
+        for filename, write_csv, rows in [(dice_filename, write_dice_csv, dice_records),
+                                          (games_filename, write_games_csv, valid_games),
+                                          (battles_filename, write_battles_csv, battles),
+                                          (stats_filename, write_stats_csv, sorted_players)]:
+            if output_unchanged(filename, outputs):
+                continue
+            with profiler.stage('csv_write', items=len(rows)):
+                write_csv(filename, rows)
+            record_output(filename, outputs)
+            written += 1
+        if cache is not None and (cached is None or written):
+            cache.put(cache_key, {'message_count': message_count, 'analysis': analysis, 'outputs': outputs})
         
+        print(f'🎲 骰子数据: {len(dice_records)}条 → {dice_filename}')
+        print(f'🎮 有效游戏: {len(valid_games)}局 → {games_filename}')
         print(f'⚔️  对战记录: {len(battles)}轮 → {battles_filename}')
+        if cached is not None and not written:
+            print(f'   (输出文件未变化，跳过写入)')
+        
+        # 导出到跨时间段的SQLite库（按群和seq幂等更新）
+        if args.sqlite:
+            from sqlite_export import export_analysis
+            with profiler.stage('sqlite_export', items=len(dice_records) + len(valid_games) + len(battles)):
+                rows = export_analysis(args.sqlite, args.group, dice_records, valid_games, battles, registry)
+            print(f'🗄️  SQLite: {rows}行 → {args.sqlite}')
+        
+        # 骰子公平性（指定--fairness时在已保存的计数器上累加新的骰子）
+        with profiler.stage('fairness', items=len(dice_records)):
+            fairness = FairnessTracker.load(args.fairness)
+            added = fairness.update(dice_records, registry.keys(), registry.labels(), args.group)
+            fairness_rows = fairness.reports()
+        with profiler.stage('csv_write', items=len(fairness_rows)):
+            write_fairness_csv(fairness_filename, fairness_rows)
+        if args.fairness:
+            fairness.save(args.fairness)
+            print(f'📌 公平性计数器已更新: {args.fairness} (新增{added}颗, 跳过已计入{fairness.skipped}颗)')
+            if fairness.out_of_order:
+                print(f'⚠️ {fairness.out_of_order}颗骰子早于本群已计入的seq（先分析了较晚的时间段），'
+                      f'已计入，但与相邻时间段之间的转移和游程检验可能有偏差')
+        print(f'🔍 骰子公平性: {len(fairness_rows)}名玩家 → {fairness_filename}')
         
         # 3. 生成统计报告
         print(f'\n📊 生成统计报告...')
         
-        player_stats = defaultdict(lambda: {
-            'total_games': 0, 'total_points': 0, 'avg_points': 0,
-            'battles_won': 0, 'battles_lost': 0, 'battles_draw': 0,
-            'win_rate': 0, 'result_counts': Counter()
-        })
-        
-        # 游戏统计
-        for game in valid_games:
-            player = game['player_name']
-            player_stats[player]['total_games'] += 1
-            player_stats[player]['total_points'] += game['score_points']
-            player_stats[player]['result_counts'][game['result_type']] += 1
-        
-        # 对战统计
-        for battle in battles:
-            p1, p2 = battle['player1'], battle['player2']
-            winner = battle['winner']
-            
-            if winner == p1:
-                player_stats[p1]['battles_won'] += 1
-                player_stats[p2]['battles_lost'] += 1
-            elif winner == p2:
-                player_stats[p2]['battles_won'] += 1
-                player_stats[p1]['battles_lost'] += 1
-            else:
-                player_stats[p1]['battles_draw'] += 1
-                player_stats[p2]['battles_draw'] += 1
-        
-        # 计算统计值
-        for player, stats in player_stats.items():
-            if stats['total_games'] > 0:
-                stats['avg_points'] = stats['total_points'] / stats['total_games']
-            
-            total_decisive = stats['battles_won'] + stats['battles_lost']
-            if total_decisive > 0:
-                stats['win_rate'] = stats['battles_won'] / total_decisive * 100
-        
-        # 保存统计数据
-        with open(stats_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['player_name', 'total_games', 'avg_points', 'win_rate', 'battles_won', 'battles_lost', 
-                         'niu_niu_count', 'baozi_count', 'no_niu_count']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            # 按平均得分排序
-            sorted_players = sorted(player_stats.items(), key=lambda x: x[1]['avg_points'], reverse=True)
-            
-            for player, stats in sorted_players:
-                writer.writerow({
-                    'player_name': player,
-                    'total_games': stats['total_games'],
-                    'avg_points': round(stats['avg_points'], 2),
-                    'win_rate': round(stats['win_rate'], 1),
-                    'battles_won': stats['battles_won'],
-                    'battles_lost': stats['battles_lost'],
-                    'niu_niu_count': stats['result_counts']['牛牛'],
-                    'baozi_count': stats['result_counts']['豹子'],
-                    'no_niu_count': stats['result_counts']['没牛']
-                })
+        # 对战矩阵（numpy不可用时退回按组合名统计）
+        matrix = None
+        try:
+            from matchup_matrix import MatchupMatrix
+        except ImportError:
+            print(f'⚠️ numpy不可用，跳过对战矩阵: {matrix_filename}')
+        else:
+            with profiler.stage('head_to_head', items=len(battles)):
+                matrix = MatchupMatrix.from_battles(battles, registry.labels())
+            with profiler.stage('csv_write', items=matrix.size):
+                matrix.write_csv(matrix_filename)
+            print(f'🧮 对战矩阵: {matrix.size}×{matrix.size} → {matrix_filename}')
+        
+        # Elo等级分（指定--ratings时从周期开始前的检查点继续）
+        period_start, period_end = time_range_bounds(args.time)
+        with profiler.stage('ratings', items=len(battles)):
+            history = RatingHistory.load(args.ratings) if args.ratings else RatingHistory()
+            elo, start_state = history.run_period(period_start.isoformat(), period_end.isoformat(),
+                                                  battles, registry.keys(), registry.labels())
+            rating_rows = rating_table(elo, start_state, history.names)
+        with profiler.stage('csv_write', items=len(rating_rows)):
+            write_ratings_csv(ratings_filename, rating_rows)
+        if args.ratings:
+            history.save(args.ratings)
+            print(f'📌 等级分检查点已更新: {args.ratings}')
+        print(f'🎯 等级分: {len(rating_rows)}名玩家 → {ratings_filename}')
+        
+        # 规则变体对比（每个规则集编译为查找表，对战配对只算一次，每个规则集每局只查表）
+        rule_set_results = {}
+        if args.rules:
+            with profiler.stage('rule_sets', items=len(valid_games)):
+                compiled = [rule_set.compile() for rule_set in load_rule_sets(args.rules)]
+                rule_set_results = evaluate_rule_sets(valid_games, compiled, registry.labels())
+            with profiler.stage('csv_write', items=len(rule_set_results)):
+                write_rule_sets_csv(rule_sets_filename, rule_set_results)
+            print(f'📐 规则对比: {len(rule_set_results)}套规则 → {rule_sets_filename}')
+        
+        if args.index:
+            index = PlayerTimeIndex.load(args.index)
+            index.update(period_start.isoformat(), period_end.isoformat(), valid_games, battles,
+                         registry.keys(), registry.labels())
+            index.save(args.index)
+            print(f'🗂️  时间索引已更新: {args.index}')
+        
+        if args.snapshot:
+            from dashboard import DashboardSnapshot
+            with profiler.stage('snapshot', items=len(valid_games) + len(battles)):
+                snapshot = DashboardSnapshot.load(args.snapshot)
+                snapshot.update(period_start.isoformat(), period_end.isoformat(), valid_games, battles,
+                                registry.keys(), registry.labels())
+                snapshot.save(args.snapshot)
+            print(f'📸 面板快照已更新: {args.snapshot}')
         
         print(f'📈 统计报告: {stats_filename}')
         
@@ -347,7 +748,7 @@ def universal_niu_niu_analyzer():
         
         # 基础数据概览
         print(f'📊 数据概览:')
-        print(f'  总消息数: {len(all_messages)}')
+        print(f'  总消息数: {message_count}')
         print(f'  骰子投掷: {len(dice_records)}次')
         print(f'  有效游戏: {len(valid_games)}局')
         print(f'  对战轮次: {len(battles)}轮')
@@ -360,11 +761,13 @@ def universal_niu_niu_analyzer():
         print(f'\n🏆 排行榜统计:')
         print('=' * 50)
         
+        # 一次遍历玩家统计得到全部排行榜
+        leaders = summarize_players(sorted_players)
+        
         # 胜率最高（至少5场对战）
-        qualified = [(p, s) for p, s in sorted_players if s['battles_won'] + s['battles_lost'] >= 5]
-        if qualified:
-            highest_wr = max(qualified, key=lambda x: x[1]['win_rate'])
-            lowest_wr = min(qualified, key=lambda x: x[1]['win_rate'])
+        highest_wr = first(leaders, 'highest_win_rate')
+        if highest_wr:
+            lowest_wr = first(leaders, 'lowest_win_rate')
             print(f'🥇 胜率最高: {highest_wr[0]}')
             print(f'   胜率: {highest_wr[1]["win_rate"]:.1f}%')
             print(f'   战绩: {highest_wr[1]["battles_won"]}胜{highest_wr[1]["battles_lost"]}负{highest_wr[1]["battles_draw"]}平')
@@ -374,112 +777,99 @@ def universal_niu_niu_analyzer():
             print(f'   战绩: {lowest_wr[1]["battles_won"]}胜{lowest_wr[1]["battles_lost"]}负{lowest_wr[1]["battles_draw"]}平')
         
         # 牛牛最多
-        niu_niu_ranking = sorted(sorted_players, key=lambda x: x[1]['result_counts']['牛牛'], reverse=True)
-        if niu_niu_ranking[0][1]['result_counts']['牛牛'] > 0:
+        niu_niu_ranking = leaders.top('niu_niu').items()
+        if niu_niu_ranking:
             print(f'\n🎯 牛牛排行榜:')
-            for i, (player, stats) in enumerate(niu_niu_ranking[:3]):
-                count = stats['result_counts']['牛牛']
-                if count > 0:
-                    print(f'  {i+1}. {player}: {count}次牛牛')
+            for i, (player, stats) in enumerate(niu_niu_ranking):
+                print(f'  {i+1}. {player}: {stats["result_counts"]["牛牛"]}次牛牛')
         
         # 豹子统计
-        baozi_ranking = sorted(sorted_players, key=lambda x: x[1]['result_counts']['豹子'], reverse=True)
-        if baozi_ranking[0][1]['result_counts']['豹子'] > 0:
+        baozi_ranking = leaders.top('baozi').items()
+        if baozi_ranking:
             print(f'\n💎 豹子统计:')
             for player, stats in baozi_ranking:
-                count = stats['result_counts']['豹子']
-                if count > 0:
-                    print(f'  {player}: {count}次豹子')
+                print(f'  {player}: {stats["result_counts"]["豹子"]}次豹子')
         
         # 平均得分排行
-        avg_qualified = [(p, s) for p, s in sorted_players if s['total_games'] >= 10]
-        if avg_qualified:
-            print(f'\n📊 平均得分最高: {avg_qualified[0][0]} ({avg_qualified[0][1]["avg_points"]:.2f}分)')
-            print(f'   总游戏数: {avg_qualified[0][1]["total_games"]}局')
+        best_avg = first(leaders, 'avg_points')
+        if best_avg:
+            print(f'\n📊 平均得分最高: {best_avg[0]} ({best_avg[1]["avg_points"]:.2f}分)')
+            print(f'   总游戏数: {best_avg[1]["total_games"]}局')
+        
+        # 近期状态（最近N局/N场）
+        hot, cold = leaders.collect('hot'), leaders.collect('cold')
+        streak_leader = first(leaders, 'longest_win_streak')
+        print(f'\n🔥 近期状态 (最近{args.form_window}局/场):')
+        print(f'  手热: {", ".join(hot) if hot else "无"}')
+        print(f'  手冷: {", ".join(cold) if cold else "无"}')
+        if streak_leader[1]['longest_win_streak'] > 0:
+            print(f'  最长连胜: {streak_leader[0]} ({streak_leader[1]["longest_win_streak"]}连胜)')
+        
+        # 骰子公平性异常
+        suspicious = [row for row in fairness_rows if row['suspicious']]
+        if suspicious:
+            print(f'\n🚨 骰子分布异常 (p < 0.001):')
+            for row in suspicious:
+                print(f'  {row["player_name"]}: {row["suspicious"]} ({row["throws"]}颗)')
+        
+        # Elo等级分排行
+        if rating_rows:
+            print(f'\n🎯 Elo等级分排行:')
+            for i, row in enumerate(rating_rows[:5]):
+                print(f'  {i+1}. {row["player_name"]}: {row["rating"]:.0f} ({row["change"]:+.0f}, '
+                      f'{row["wins"]}胜{row["losses"]}负{row["draws"]}平)')
+        
+        # 不同规则下的排名
+        if rule_set_results:
+            print(f'\n📐 规则对比 (平均得分 / 胜率最高):')
+            for name, players in rule_set_results.items():
+                top_avg = max(players.items(), key=lambda x: x[1]['avg_points'])
+                top_wr = max(players.items(), key=lambda x: x[1]['win_rate'])
+                print(f'  {name}: {top_avg[0]} ({top_avg[1]["avg_points"]:.2f}分) / '
+                      f'{top_wr[0]} ({top_wr[1]["win_rate"]:.1f}%)')
         
         # 详细玩家统计表
-        print(f'\n📋 详细玩家统计表:')
-        print('=' * 100)
-        print(f'{"玩家":12} {"游戏数":>6} {"平均分":>7} {"胜率":>6} {"牛牛":>4} {"豹子":>4} {"没牛":>4} {"最佳成绩":10}')
-        print('-' * 100)
-        
-        for player, stats in sorted_players:
-            wr_str = f"{stats['win_rate']:.1f}%" if stats['battles_won'] + stats['battles_lost'] > 0 else "N/A"
-            niu_niu_count = stats['result_counts']['牛牛']
-            baozi_count = stats['result_counts']['豹子']
-            no_niu_count = stats['result_counts']['没牛']
-            
-            # 找最佳成绩
-            best_result = "没牛"
-            for result_type in ["豹子", "牛牛", "牛9", "牛8", "牛7", "牛6", "牛5", "牛3", "牛2", "牛1"]:
-                if stats['result_counts'][result_type] > 0:
-                    best_result = result_type
-                    break
-            
-            print(f'{player:12} {stats["total_games"]:6d} {stats["avg_points"]:7.2f} {wr_str:6} '
-                  f'{niu_niu_count:4d} {baozi_count:4d} {no_niu_count:4d} {best_result:10}')
+        print_player_table(sorted_players)
         
         # 结果分布统计
-        print(f'\n✨ 结果分布统计:')
-        print('=' * 40)
-        
-        all_results = Counter()
-        for game in valid_games:
-            all_results[game['result_type']] += 1
-        
-        total_games = len(valid_games)
-        print(f'📊 各种结果出现次数:')
-        for result_type in ['豹子', '牛牛', '牛9', '牛8', '牛7', '牛6', '牛5', '牛3', '牛2', '牛1', '没牛']:
-            if result_type in all_results:
-                count = all_results[result_type]
-                percentage = count / total_games * 100
-                print(f'  {result_type:4}: {count:3d}次 ({percentage:4.1f}%)')
+        print_result_distribution(game_summary)
         
         # 最激烈的对战组合
         print(f'\n⚔️  最激烈的对战组合:')
-        battle_pairs = defaultdict(int)
-        battle_results = defaultdict(lambda: {'p1_wins': 0, 'p2_wins': 0, 'draws': 0})
-        
-        for battle in battles:
-            p1, p2 = battle['player1'], battle['player2']
-            key = f"{min(p1, p2)} vs {max(p1, p2)}"
-            battle_pairs[key] += 1
-            
-            winner = battle['winner']
-            if winner == p1:
-                battle_results[key]['p1_wins'] += 1
-            elif winner == p2:
-                battle_results[key]['p2_wins'] += 1
-            else:
-                battle_results[key]['draws'] += 1
-        
-        top_pairs = sorted(battle_pairs.items(), key=lambda x: x[1], reverse=True)[:3]
-        for i, (pair, count) in enumerate(top_pairs):
-            results = battle_results[pair]
+        top_pairs = matrix.top_pairs(3) if matrix is not None else head_to_head(battles)[:3]
+        for i, (pair, count, results) in enumerate(top_pairs):
             print(f'  {i+1}. {pair}: {count}轮对战 ({results["p1_wins"]}-{results["p2_wins"]}-{results["draws"]})')
         
         # 按日期统计（如果跨越多天）
-        daily_stats = defaultdict(int)
-        for game in valid_games:
-            if game['date']:
-                daily_stats[game['date']] += 1
-        
-        if len(daily_stats) > 1:
-            print(f'\n📅 每日游戏数量:')
-            for date in sorted(daily_stats.keys()):
-                print(f'  {date}: {daily_stats[date]}局')
+        print_daily_games(game_summary)
         
         # 活跃度统计
         print(f'\n👥 玩家活跃度排行:')
-        activity_ranking = sorted(sorted_players, key=lambda x: x[1]['total_games'], reverse=True)
-        for i, (player, stats) in enumerate(activity_ranking):
+        for i, (player, stats) in enumerate(leaders.top('activity').items()):
             print(f'  {i+1}. {player}: {stats["total_games"]}局游戏')
         
+        if args.report == 'html':
+            from html_report import write_html_report
+            with profiler.stage('report', items=len(sorted_players)):
+                size = write_html_report(report_filename, f'{args.time} 牛牛游戏统计报告', {
+                    '总消息数': message_count, '骰子投掷': len(dice_records),
+                    '有效游戏': len(valid_games), '对战轮次': len(battles)},
+                    sorted_players, game_summary, matrix, leaders)
+            print(f'\n🌐 HTML报告: {size // 1024}KB → {report_filename}')
+        
         print(f'\n✅ 详细分析完成！所有数据文件已生成：')
         print(f'  📁 {dice_filename} - 骰子数据')
         print(f'  📁 {games_filename} - 游戏记录')
         print(f'  📁 {battles_filename} - 对战详情')
         print(f'  📁 {stats_filename} - 统计汇总')
+        print(f'  📁 {ratings_filename} - 等级分')
+        print(f'  📁 {fairness_filename} - 骰子公平性')
+        if matrix is not None:
+            print(f'  📁 {matrix_filename} - 对战矩阵')
+        if rule_set_results:
+            print(f'  📁 {rule_sets_filename} - 规则对比')
+        if args.report == 'html':
+            print(f'  📁 {report_filename} - HTML报告')
 
 if __name__ == "__main__":
     universal_niu_niu_analyzer()
\ No newline at end of file